@@ -0,0 +1,229 @@
+"""
+Benchmark: dashboard data path
+
+Times each stage the dashboard runs for a device on synthetic Firebase payloads of
+N devices x M readings, records the peak memory of each stage, and compares the
+results with a stored baseline to catch regressions. Runs offline. The stored baseline
+was recorded with the versions of requirements.txt; it is only compared with runs using
+the same Python, numpy, pandas and plotly versions.
+
+Stages:
+- fetch_parse: JSON response bodies to reading DataFrames (json.loads + decode_readings)
+- statistics: calculate_statistics
+- figures: chart data downsampling and figure construction
+- csv_export: CSV export of all devices
+
+Usage:
+    python benchmarks/bench_dashboard.py
+    python benchmarks/bench_dashboard.py --devices 5 --readings 100000 --output results.json
+    python benchmarks/bench_dashboard.py --update-baseline
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly
+
+# Make the dashboard modules importable when run from any directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from charts import build_combined_figure, build_parameter_figure, prepare_chart_data
+from data_processing import PARAMETERS, calculate_statistics, decode_readings, write_export
+
+# Stored baseline the results are compared with
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Versions that must match the baseline's for timings to be comparable
+ENVIRONMENT_KEYS = ('python', 'numpy', 'pandas', 'plotly')
+
+# Fractions of synthetic readings with legacy or incomplete data
+MILLISECOND_FRACTION = 0.1
+MISSING_READINGS_FRACTION = 0.01
+MISSING_TIMESTAMP_FRACTION = 0.005
+MISSING_PARAMETER_FRACTION = 0.02
+
+def build_device_payload(device_id, num_readings, end_timestamp, rng):
+    """Build the JSON body Firebase returns for one device, with one reading per minute.
+
+    Some readings use millisecond timestamps, lack their timestamp or readings, or
+    lack a single parameter, like payloads written by older firmware.
+    """
+    timestamps = end_timestamp - 60 * np.arange(num_readings)[::-1]
+    values = rng.uniform(0, 100, size=(num_readings, len(PARAMETERS))).round(1)
+    draws = rng.random((num_readings, 4))
+    missing_params = rng.integers(0, len(PARAMETERS), size=num_readings)
+
+    payload = {}
+    for i in range(num_readings):
+        reading = {'device_id': device_id}
+        if draws[i, 0] >= MISSING_TIMESTAMP_FRACTION:
+            milliseconds = draws[i, 1] < MILLISECOND_FRACTION
+            reading['timestamp'] = float(timestamps[i] * 1000 if milliseconds else timestamps[i])
+        if draws[i, 2] >= MISSING_READINGS_FRACTION:
+            reading['readings'] = {
+                param: float(values[i, j]) for j, param in enumerate(PARAMETERS)
+                if not (draws[i, 3] < MISSING_PARAMETER_FRACTION and missing_params[i] == j)
+            }
+        payload[f"-{device_id}-{i:08d}"] = reading
+    return json.dumps(payload)
+
+def build_payloads(num_devices, num_readings, seed=0):
+    """Build the JSON bodies of all devices; returns (bodies, start_timestamp, end_timestamp)."""
+    rng = np.random.default_rng(seed)
+    end_timestamp = float(int(time.time()))
+    start_timestamp = end_timestamp - 60 * num_readings
+    bodies = {
+        f"device_{i:03d}": build_device_payload(f"device_{i:03d}", num_readings, end_timestamp, rng)
+        for i in range(num_devices)
+    }
+    return bodies, start_timestamp, end_timestamp
+
+def stage_fetch_parse(bodies, start_timestamp, end_timestamp):
+    """Parse the JSON body of each device into a readings DataFrame."""
+    return {
+        device_id: decode_readings(json.loads(body), start_timestamp, end_timestamp)
+        for device_id, body in bodies.items()
+    }
+
+def stage_statistics(frames):
+    """Calculate the statistics of each device."""
+    return [calculate_statistics(df) for df in frames.values()]
+
+def stage_figures(frames):
+    """Build the individual and combined charts of each device."""
+    figures = []
+    for df in frames.values():
+        chart_data = prepare_chart_data(df)
+        figures.extend(build_parameter_figure(chart_data[param], param) for param in PARAMETERS)
+        figures.append(build_combined_figure(chart_data))
+    return figures
+
+def stage_csv_export(frames):
+    """Export the readings of all devices to one CSV file in memory."""
+    buffer = io.BytesIO()
+    chunks = (df.assign(device_id=device_id) for device_id, df in frames.items())
+    write_export(chunks, 'CSV', buffer)
+    return buffer.getbuffer().nbytes
+
+def measure(func, args, repeat):
+    """Return (best, median) wall time of several runs and the peak traced memory of one run."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+
+    # Memory is measured in a separate run, since tracing slows the code down
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), statistics.median(times), peak
+
+def run_benchmarks(num_devices, num_readings, repeat):
+    """Run all stages and return the results document."""
+    bodies, start_timestamp, end_timestamp = build_payloads(num_devices, num_readings)
+    frames = stage_fetch_parse(bodies, start_timestamp, end_timestamp)
+
+    stages = {
+        'fetch_parse': (stage_fetch_parse, (bodies, start_timestamp, end_timestamp)),
+        'statistics': (stage_statistics, (frames,)),
+        'figures': (stage_figures, (frames,)),
+        'csv_export': (stage_csv_export, (frames,)),
+    }
+
+    results = {}
+    for name, (func, args) in stages.items():
+        best, median, peak = measure(func, args, repeat)
+        results[name] = {'best_s': best, 'median_s': median, 'peak_bytes': peak}
+
+    return {
+        'workload': {'devices': num_devices, 'readings_per_device': num_readings},
+        'repeat': repeat,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'plotly': plotly.__version__,
+        },
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'results': results,
+    }
+
+def compare(current, baseline, tolerance):
+    """Print the change of each stage against the baseline; return the regressed stages."""
+    if current['workload'] != baseline['workload']:
+        print(f"Baseline workload {baseline['workload']} differs from {current['workload']}; not comparing")
+        return []
+    differences = [f"{key} {baseline['environment'].get(key)} vs {current['environment'][key]}"
+                   for key in ENVIRONMENT_KEYS
+                   if baseline['environment'].get(key) != current['environment'][key]]
+    if differences:
+        print(f"Baseline was recorded with other versions ({', '.join(differences)}); not comparing. "
+              f"Install requirements.txt or record a baseline with --update-baseline")
+        return []
+
+    regressions = []
+    print(f"\n{'stage':<12} {'time':>10} {'memory':>10}  (change vs baseline of {baseline['created']})")
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        base = baseline['results'][name]
+        time_ratio = result['best_s'] / base['best_s']
+        memory_ratio = result['peak_bytes'] / max(base['peak_bytes'], 1)
+        regressed = time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<12} {time_ratio - 1:>+10.1%} {memory_ratio - 1:>+10.1%}{flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+def main():
+    """Run the benchmarks, print a results table and compare with the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--devices', type=int, default=10, help="Number of devices")
+    parser.add_argument('--readings', type=int, default=20_000, help="Readings per device")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage (best is compared)")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline results to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help="Allowed slowdown or memory growth before a stage counts as regressed")
+    parser.add_argument('--update-baseline', action='store_true', help="Store the results as the new baseline")
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.devices, args.readings, args.repeat)
+
+    print(f"{args.devices} devices x {args.readings:,} readings")
+    print(f"{'stage':<12} {'best (s)':>10} {'median (s)':>11} {'peak (MB)':>10}")
+    for name, result in current['results'].items():
+        print(f"{name:<12} {result['best_s']:>10.3f} {result['median_s']:>11.3f} {result['peak_bytes'] / 1e6:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
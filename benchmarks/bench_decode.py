@@ -0,0 +1,106 @@
+"""
+Benchmark: Firebase payload to DataFrame conversion
+
+Compares the per-reading parse loop the dashboard used to run with the columnar
+decoder in data_processing.decode_readings on synthetic payloads.
+
+Usage:
+    python benchmarks/bench_decode.py
+    python benchmarks/bench_decode.py --sizes 10000 100000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Make the dashboard modules importable when run from any directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_processing import decode_readings
+
+def build_payload(num_readings, seed=0):
+    """Build a synthetic readings payload with one reading per minute ending now."""
+    rng = np.random.default_rng(seed)
+    end_timestamp = time.time()
+    timestamps = end_timestamp - 60 * np.arange(num_readings)[::-1]
+    values = rng.uniform(0, 100, size=(num_readings, 4)).round(1)
+
+    payload = {}
+    for i in range(num_readings):
+        payload[f"-reading{i:08d}"] = {
+            'device_id': 'esp32_env_monitor_01',
+            # Every tenth reading uses the legacy millisecond format
+            'timestamp': float(timestamps[i] * 1000 if i % 10 == 0 else timestamps[i]),
+            'readings': {
+                'temperature': float(values[i, 0]),
+                'humidity': float(values[i, 1]),
+                'light_level': float(values[i, 2]),
+                'soil_moisture': float(values[i, 3]),
+            },
+        }
+    return payload, float(timestamps[0]), end_timestamp
+
+def decode_readings_loop(all_readings, start_timestamp, end_timestamp):
+    """Reference implementation: the original per-reading parse loop."""
+    data_list = []
+    for timestamp, reading in all_readings.items():
+        if 'timestamp' not in reading or 'readings' not in reading:
+            continue
+
+        reading_timestamp = reading['timestamp']
+        if reading_timestamp > end_timestamp * 10:
+            reading_timestamp = reading_timestamp / 1000
+
+        if start_timestamp <= reading_timestamp <= end_timestamp:
+            readings = reading['readings']
+            data_list.append({
+                'timestamp': reading_timestamp,
+                'datetime': datetime.fromtimestamp(reading_timestamp),
+                'temperature': readings.get('temperature'),
+                'humidity': readings.get('humidity'),
+                'light_level': readings.get('light_level'),
+                'soil_moisture': readings.get('soil_moisture'),
+            })
+
+    df = pd.DataFrame(data_list)
+    return df.sort_values('timestamp')
+
+def best_time(func, args, repeat):
+    """Return the best wall time of several runs of func(*args)."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    """Run the benchmark and print a results table."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="Number of readings per payload")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'readings':>10} {'loop (s)':>10} {'columnar (s)':>13} {'speedup':>8}")
+    for size in args.sizes:
+        payload, start_timestamp, end_timestamp = build_payload(size)
+        bounds = (payload, start_timestamp, end_timestamp)
+
+        # Both implementations must agree before timing them
+        expected = decode_readings_loop(*bounds)
+        actual = decode_readings(*bounds)
+        assert len(expected) == len(actual) == size
+        assert np.allclose(expected['timestamp'].to_numpy(), actual['timestamp'].to_numpy())
+
+        loop_time = best_time(decode_readings_loop, bounds, args.repeat)
+        columnar_time = best_time(decode_readings, bounds, args.repeat)
+        print(f"{size:>10} {loop_time:>10.3f} {columnar_time:>13.3f} {loop_time / columnar_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
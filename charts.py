@@ -0,0 +1,261 @@
+"""
+ESP32 Environmental Monitoring Dashboard - Charts
+
+This module builds the Plotly figures shown by the dashboard. Like data_processing it
+has no dependency on Streamlit, so figure construction can be benchmarked on its own.
+
+Features:
+- Downsampled chart data per environmental parameter
+- One time series figure per parameter
+- Combined figure with all parameters on two y-axes
+- Minimum-maximum bands around series that have them (rollups, oversampled readings)
+- WebGL traces and compact arrays for large series
+- Budget on the serialized size of all charts of a page
+- Device health charts from the health records devices upload
+"""
+
+import importlib.metadata
+
+import numpy as np
+
+from data_processing import HEALTH_STAGES, PARAMETERS, downsample_frame, has_band
+from startup import lazy_import
+
+# Plotly is imported when the first chart is built
+go = lazy_import('plotly.graph_objects')
+plotly_subplots = lazy_import('plotly.subplots')
+
+# Approximate width of a chart in pixels. Charts get at most one point per pixel,
+# so larger series are downsampled before they are sent to the browser.
+CHART_WIDTH_PX = 1200
+
+# Traces with more points than this are drawn with WebGL (Scattergl) instead of SVG,
+# and as straight line segments instead of splines
+WEBGL_POINT_THRESHOLD = 1000
+
+# Default upper bound on the serialized size of all charts of a page (bytes)
+CHART_PAYLOAD_BUDGET = 2_000_000
+
+# Charts never get fewer points than this, whatever the budget
+MIN_CHART_POINTS = 100
+
+# Times the figures are rebuilt with fewer points to fit the budget
+BUDGET_ATTEMPTS = 3
+
+# Plotly 6 sends NumPy arrays as binary typed arrays, where float32 halves the size.
+# Older versions send JSON lists, where rounded float64 values are shorter.
+TYPED_ARRAYS = int(importlib.metadata.version('plotly').split('.')[0]) >= 6
+
+# Decimals kept in chart values when they are sent as JSON lists
+CHART_DECIMALS = 2
+
+# Display name, unit and line color of each parameter
+PARAMETER_STYLES = {
+    'temperature': ('Temperature', '°C', '#FF5733'),
+    'humidity': ('Humidity', '%', '#33A1FF'),
+    'light_level': ('Light Level', '%', '#FFC300'),
+    'soil_moisture': ('Soil Moisture', '%', '#8B4513'),
+}
+
+# Opacity of the minimum-maximum band around a series
+BAND_OPACITY = 0.2
+
+# Parameters plotted against the secondary y-axis of the combined chart
+SECONDARY_AXIS_PARAMETERS = ('light_level', 'soil_moisture')
+
+# Line colors of the device health charts
+HEALTH_COLORS = ('#33A1FF', '#FF5733', '#FFC300', '#8B4513', '#2ECC71')
+
+# Title, y-axis title and (column, name, color, dash) of the series of each device health
+# chart; columns are those of health_chart_frame, maximums are dotted
+HEALTH_CHARTS = [
+    ('Upload Latency', 'Latency (ms)', [
+        ('upload_p50_ms', 'Median', HEALTH_COLORS[0], None),
+        ('upload_p90_ms', '90th percentile', HEALTH_COLORS[1], None),
+        ('upload_max_ms', 'Maximum', HEALTH_COLORS[1], 'dot'),
+    ]),
+    ('Stage Durations', 'Duration (ms)', [
+        (f'{stage}_{stat}', f"{stage.replace('_', ' ').capitalize()} ({label})", color, dash)
+        for stage, color in zip(HEALTH_STAGES, HEALTH_COLORS)
+        for stat, label, dash in (('ms', 'mean', None), ('max_ms', 'max', 'dot'))
+    ]),
+    ('Free Heap', 'Free heap (KB)', [
+        ('mem_free_kb', 'After garbage collection', HEALTH_COLORS[0], None),
+        ('mem_min_free_kb', 'Lowest', HEALTH_COLORS[0], 'dot'),
+    ]),
+    ('Uploads', 'Count', [
+        ('uploads', 'Upload requests', HEALTH_COLORS[0], None),
+        ('upload_failures', 'Failed uploads', HEALTH_COLORS[1], None),
+        ('cache', 'Cached readings', HEALTH_COLORS[3], None),
+    ]),
+    ('WiFi Signal', 'RSSI (dBm)', [
+        ('rssi', 'Signal strength', HEALTH_COLORS[4], None),
+    ]),
+]
+
+def prepare_chart_data(df, max_points=CHART_WIDTH_PX):
+    """Return {parameter: downsampled frame} for charting a readings or rollup frame."""
+    return {param: downsample_frame(df, param, max_points) for param in PARAMETERS}
+
+def chart_x(chart_df):
+    """Return the times of a chart frame as milliseconds, which date axes plot like datetimes.
+
+    Numbers serialize much more compactly than ISO date strings. The naive local
+    datetimes are converted as if they were UTC, so the axis shows local wall-clock time.
+    """
+    return chart_df['datetime'].to_numpy().astype('datetime64[ms]').astype(np.float64)
+
+def chart_y(chart_df, param):
+    """Return the values of a parameter in the most compact form Plotly can send."""
+    values = chart_df[param].to_numpy(dtype=np.float64)
+    if TYPED_ARRAYS:
+        return values.astype(np.float32)
+    return values.round(CHART_DECIMALS)
+
+def line_trace(chart_df, param, name, color):
+    """Return a line trace of one parameter, using WebGL for large series."""
+    if len(chart_df) > WEBGL_POINT_THRESHOLD:
+        trace_type, shape = go.Scattergl, 'linear'
+    else:
+        trace_type, shape = go.Scatter, 'spline'
+    return trace_type(
+        x=chart_x(chart_df),
+        y=chart_y(chart_df, param),
+        name=name,
+        line=dict(color=color, width=2),
+        mode='lines',
+        **({'line_shape': shape} if trace_type is go.Scatter else {})
+    )
+
+def band_traces(chart_df, param, name, color):
+    """Return the traces of the band between the minimum and maximum of a parameter.
+
+    The maximum is drawn first as an invisible line; the minimum fills up to it.
+    """
+    trace_type = go.Scattergl if len(chart_df) > WEBGL_POINT_THRESHOLD else go.Scatter
+    red, green, blue = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+    x = chart_x(chart_df)
+    return [
+        trace_type(
+            x=x, y=chart_y(chart_df, f'{param}_{stat}'), name=f'{name} {stat}',
+            mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip',
+            **({'fill': 'tonexty', 'fillcolor': f'rgba({red},{green},{blue},{BAND_OPACITY})'} if stat == 'min' else {})
+        )
+        for stat in ('max', 'min')
+    ]
+
+def build_parameter_figure(chart_df, param):
+    """Build the time series figure of one parameter, with its minimum-maximum band if it has one."""
+    name, unit, color = PARAMETER_STYLES[param]
+    traces = band_traces(chart_df, param, name, color) if has_band(chart_df, param) else []
+    fig = go.Figure(traces + [line_trace(chart_df, param, name, color)])
+    fig.update_layout(
+        title=f'{name} Over Time',
+        xaxis_title='Time',
+        yaxis_title=f'{name} ({unit})',
+        xaxis_type='date',
+        height=300,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    return fig
+
+def build_combined_figure(chart_data):
+    """Build the combined figure of all parameters from prepare_chart_data output."""
+    fig = plotly_subplots.make_subplots(specs=[[{"secondary_y": True}]])
+
+    for param in PARAMETERS:
+        name, unit, color = PARAMETER_STYLES[param]
+        fig.add_trace(
+            line_trace(chart_data[param], param, f"{name} ({unit})", color),
+            secondary_y=param in SECONDARY_AXIS_PARAMETERS,
+        )
+
+    # Set titles
+    fig.update_layout(
+        title_text="Combined Environmental Data",
+        height=500,
+        xaxis_type='date',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+
+    # Set y-axes titles
+    fig.update_yaxes(title_text="Temperature (°C) / Humidity (%)", secondary_y=False)
+    fig.update_yaxes(title_text="Light Level (%) / Soil Moisture (%)", secondary_y=True)
+    return fig
+
+def build_figures(chart_data):
+    """Build all figures of a page: one per parameter plus 'combined'."""
+    figures = {param: build_parameter_figure(chart_data[param], param) for param in PARAMETERS}
+    figures['combined'] = build_combined_figure(chart_data)
+    return figures
+
+def payload_size(figures):
+    """Return the size of the figures serialized as JSON, as sent to the browser (bytes)."""
+    return sum(len(fig.to_json()) for fig in figures.values())
+
+def build_chart_figures(df, max_points=CHART_WIDTH_PX, budget=CHART_PAYLOAD_BUDGET):
+    """Build all figures of a page within a budget on their serialized size.
+
+    While the figures exceed the budget, the series are downsampled further in
+    proportion and the figures are rebuilt, at most BUDGET_ATTEMPTS times. Returns
+    (figures, points per series, payload size in bytes).
+    """
+    figures = build_figures(prepare_chart_data(df, max_points))
+    size = payload_size(figures)
+
+    for _ in range(BUDGET_ATTEMPTS):
+        if size <= budget or max_points <= MIN_CHART_POINTS:
+            break
+        # Payload grows about linearly with the points; aim a little below the budget
+        max_points = max(MIN_CHART_POINTS, int(max_points * budget / size * 0.9))
+        figures = build_figures(prepare_chart_data(df, max_points))
+        size = payload_size(figures)
+
+    return figures, max_points, size
+
+def health_chart_frame(df):
+    """Return a decode_health frame with durations in milliseconds and memory in kilobytes."""
+    chart_df = df.copy()
+    for stage in HEALTH_STAGES:
+        for stat in ('', 'max_'):
+            chart_df[f'{stage}_{stat}ms'] = chart_df.pop(f'{stage}_{stat}us') / 1000
+    for column in ('mem_free', 'mem_min_free'):
+        chart_df[f'{column}_kb'] = chart_df.pop(column) / 1024
+    return chart_df
+
+def build_health_figures(df, max_points=CHART_WIDTH_PX):
+    """Build the device health figures of a decode_health frame as {title: figure}.
+
+    Series without values and charts without series are left out.
+    """
+    chart_df = health_chart_frame(df)
+    figures = {}
+    for title, yaxis_title, series in HEALTH_CHARTS:
+        traces = []
+        for column, name, color, dash in series:
+            series_df = downsample_frame(chart_df, column, max_points)
+            if series_df.empty:
+                continue
+            trace = line_trace(series_df, column, name, color)
+            if dash:
+                trace.line.dash = dash
+            traces.append(trace)
+        if not traces:
+            continue
+        fig = go.Figure(traces)
+        fig.update_layout(
+            title=title,
+            xaxis_title='Time',
+            yaxis_title=yaxis_title,
+            xaxis_type='date',
+            height=300,
+            margin=dict(l=20, r=20, t=40, b=20)
+        )
+        figures[title] = fig
+    return figures
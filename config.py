@@ -12,6 +12,27 @@ WIFI_PASSWORD = "2916?Ajpq!"
 # Device Configuration
 DEVICE_ID = "esp32_env_monitor_01"
 READING_INTERVAL = 60  # seconds
+WIFI_CHECK_INTERVAL = 10  # seconds between checks of the WiFi connection
+
+# Oversampling
+# Between readings the analog sensors and the DHT11 are sampled repeatedly; each reading
+# reports the mean, minimum, maximum and number of the samples of its interval. Numbers
+# above 65534 (e.g. READING_INTERVAL above 6553 seconds at 100 ms) are reported as 65534.
+ADC_SAMPLE_INTERVAL_MS = 100    # analog sensors (light level, soil moisture)
+DHT_SAMPLE_INTERVAL_MS = 2000   # DHT11; it needs at least 1 second between measurements
+
+# Report by Exception
+# A reading is only uploaded when a value moved further than its deadband from the last
+# uploaded reading, or when it would otherwise be more than HEARTBEAT_INTERVAL seconds
+# since the last upload. The dashboard holds each value until the next reading.
+# Set DEADBAND = None to upload every reading.
+DEADBAND = {
+    "temperature": 0.5,     # °C
+    "humidity": 2,          # %
+    "light_level": 5,       # %
+    "soil_moisture": 1,     # %
+}
+HEARTBEAT_INTERVAL = 900    # seconds
 
 # Sensor Pins
 DHT_PIN = 4
@@ -20,6 +41,7 @@ SOIL_MOISTURE_PIN = 39
 
 # OLED Display Configuration
 DISPLAY_ENABLED = True
+DISPLAY_INTERVAL = 5  # seconds between display refreshes
 DISPLAY_SDA_PIN = 21
 DISPLAY_SCL_PIN = 22
 # EPLZON 0.96 inch OLED IIC Display Module 128x64 Pixel specifications:
@@ -35,6 +57,24 @@ DISPLAY_SCL_PIN = 22
 # Firebase Configuration
 FIREBASE_URL = "https://microlab-data-default-rtdb.firebaseio.com/"
 FIREBASE_SECRET = ""  # Leave empty when using anonymous access
+HTTP_TIMEOUT = 10     # Seconds a request may take, including reconnecting
+
+# Cached readings are uploaded in PATCH requests with bodies of at most this many bytes
+UPLOAD_BATCH_BYTES = 4096
+
+# Device Health
+# With the first upload after every TELEMETRY_INTERVAL seconds, the device also uploads a
+# health record (see telemetry.py) to /health/<DEVICE_ID>: how long reading the sensors,
+# the display and uploads took, upload latencies and failures, free heap, cached readings
+# and WiFi signal strength. Set to 0 to disable.
+TELEMETRY_INTERVAL = 300  # seconds
+
+# Offline Cache
+# Readings that could not be uploaded are kept in RAM (44 bytes each). When RAM is full,
+# and before the device resets, they are moved to a file in flash that survives resets.
+CACHE_CAPACITY = 1000               # readings in RAM (about 16 hours at one per minute)
+CACHE_SPILL_FILE = "cache.bin"      # Set to "" to keep readings in RAM only
+CACHE_SPILL_MAX_RECORDS = 10000     # readings in flash (440 KB); the oldest are dropped beyond that
 
 # Sensor Calibration
 # Adjust these values based on your specific sensors and environment
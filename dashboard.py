@@ -5,35 +5,68 @@ This Streamlit application visualizes environmental monitoring data from a Fireb
 It provides real-time data display, time-series charts, statistical analysis, and data export functionality.
 
 Features:
-- Authentication and connection to Firebase Realtime Database
+- Authentication and connection to Firebase Realtime Database, a local stand-in, SQLite or sample data
 - Device selector to choose which environmental monitor to display
-- Time range selector (Last Hour, Last Day, Last Week, Last Month)
-- Real-time data display showing current readings
+- Fleet overview with the latest readings and alerts of all devices
+- Time range selector (Last Hour, Last Day, Last Week, Last Month, Last Year, All Time)
+- Real-time data display showing current readings, pushed live as devices report
 - Time-series charts for each environmental parameter
 - Statistical analysis showing min, max, average, and trends
-- Data export functionality to download readings as CSV
+- Data export to CSV, gzip-compressed CSV, Parquet or Feather, with multi-device bulk export
 - Sample data generator for testing when no real data is available
+- Performance panel with per-stage timings and Firebase download volume, exportable to Prometheus
+- Device health panel with the stage timings, upload latency and heap usage devices report
 
 Author: Generated by Cline
 Date: March 25, 2025
 """
 
 import streamlit as st
-import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import firebase_admin
-from firebase_admin import credentials, db
+import atexit
+import collections
 import datetime
+import itertools
 import time
 import json
+import math
 import os
-import base64
-from io import StringIO
-import pytz
-from datetime import datetime, timedelta
+import shutil
+import threading
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from io import BytesIO, StringIO
+from datetime import date, datetime, timedelta
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from charts import CHART_PAYLOAD_BUDGET, CHART_WIDTH_PX, build_chart_figures, build_health_figures
+from data_processing import (
+    AGGREGATE_COLUMNS,
+    EXPORT_FORMATS,
+    HOLD_COLUMNS,
+    PARAMETERS,
+    READING_COLUMNS,
+    RollupPyramid,
+    available_export_formats,
+    calculate_statistics,
+    decode_health,
+    decode_readings,
+    empty_readings_frame,
+    expand_held_readings,
+    has_band,
+    is_rollup_frame,
+    out_of_range_parameters,
+    select_rollup_tier,
+    write_export,
+)
+from data_sources import DEMO_DEVICES, FirebaseSource, SyntheticSource, open_data_source
+from instrumentation import RerunProfile, StageMetrics, active_stages, bind_stages, install_byte_counter
+from shared_cache import DEFAULT_MAX_BYTES, SharedCache
+from startup import finish_startup, lazy_import, preload, startup_report, startup_step, startup_timings
+
+# Imported on first use to keep the cold start short; Plotly is imported likewise by charts
+pd = lazy_import('pandas')
+requests = lazy_import('requests')
 
 # Set page configuration
 st.set_page_config(
@@ -106,56 +139,102 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 #===============================================================================
-# FIREBASE CONNECTION
+# DATA SOURCE CONNECTION
 #===============================================================================
 
-@st.cache_resource(show_spinner=False)
-def initialize_firebase():
-    """Initialize Firebase connection with anonymous access."""
+# Data source setting, see open_data_source: empty for the Firebase database,
+# "http://127.0.0.1:9000/?ns=microlab-data" for a local stand-in (local_rtdb.py),
+# "sqlite:readings.db" for a SQLite file or "synthetic" for sample data
+DATA_SOURCE = os.environ.get('DASHBOARD_DATA_SOURCE', '')
+
+# Modules the first page needs, imported in the background while the connection is set up
+PRELOAD_MODULES = ('pandas', 'plotly.graph_objects', 'plotly.subplots')
+
+def connect_data_source(cache):
+    """Connect to the configured data source, falling back to sample data on failure.
+
+    Also lists the devices into the shared cache, which opens the connection to
+    Firebase, and imports PRELOAD_MODULES. Returns (source, connection status, error).
+    """
     try:
-        # Use a direct URL to your Firebase database
-        firebase_url = "https://microlab-data-default-rtdb.firebaseio.com/"
-        
-        # Initialize with anonymous access (no credentials needed)
-        if not firebase_admin._apps:
-            firebase_admin.initialize_app(None, {
-                'databaseURL': firebase_url
-            })
-            print("Firebase initialized")
-        else:
-            print("Using existing Firebase connection")
-        
-        # Get a database reference
-        ref = db.reference('/')
-        return ref, firebase_url, "connected"
+        with startup_step('connect data source'):
+            source = open_data_source(DATA_SOURCE)
     except Exception as e:
-        st.error(f"Failed to connect to Firebase: {e}")
-        return None, "https://microlab-data-default-rtdb.firebaseio.com/", "error"
+        return SyntheticSource(), "error", e
+    
+    if not source.synthetic:
+        # Count the bytes of every Firebase response for the performance panel
+        if isinstance(source, FirebaseSource):
+            try:
+                if source.session is None:
+                    raise RuntimeError("the Firebase SDK has no requests session")
+                install_byte_counter(source.session)
+            except Exception as e:
+                print(f"Firebase download volume unavailable: {e}")
+        try:
+            with startup_step('list devices'):
+                list_device_ids(source, cache)
+        except Exception as e:
+            # get_devices tries again and shows the error
+            print(f"Error listing devices: {e}")
+    
+    with startup_step('preload modules'):
+        preload(*PRELOAD_MODULES)
+    return source, "demo" if source.synthetic else "connected", None
+
+@st.cache_resource(show_spinner=False)
+def start_data_source():
+    """Start connecting to the data source in a background thread, once per process.
+
+    Returns a Future of connect_data_source's result, so the header and sidebar can
+    render while the connection is set up. A failed connection is not kept (see main).
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="connect")
+    future = executor.submit(connect_data_source, get_shared_cache())
+    executor.shutdown(wait=False)
+    return future
 
 #===============================================================================
 # DATA FUNCTIONS
 #===============================================================================
 
-def get_devices(ref):
-    """Get list of available devices from Firebase."""
-    if ref is None or st.session_state.connection_status == "demo":
+# Device discovery is refreshed at most this often (seconds)
+DEVICE_LIST_TTL = 300
+
+def list_device_ids(source, cache=None):
+    """List the IDs of the devices with readings.
+
+    Firebase sources use a shallow read, so only the child keys of the readings node are
+    downloaded instead of every reading of every device. The result is kept in the
+    shared cache, so sessions share it and wait for a listing already in progress.
+    """
+    if cache is None:
+        cache = get_shared_cache()
+    return cache.get(('device_list', None), source.list_devices, ttl=DEVICE_LIST_TTL)
+
+def get_devices(source):
+    """Get list of available devices from the data source."""
+    if is_demo_mode(source):
         # Return sample devices for demo mode
-        return ["esp32_env_monitor_01", "esp32_env_monitor_02", "classroom_monitor"]
+        return source.list_devices()
     
     try:
-        # Get readings node which contains device data
-        readings_ref = ref.child('readings')
-        devices = readings_ref.get()
-        if devices and isinstance(devices, dict) and len(list(devices.keys())) > 0:
-            return list(devices.keys())
-        return ["esp32_env_monitor_01", "esp32_env_monitor_02", "classroom_monitor"]
+        devices = list_device_ids(source)
+        if devices:
+            return devices
+        return DEMO_DEVICES
     except Exception as e:
         st.error(f"Error fetching devices: {e}")
         return []
 
+# Query windows end on a multiple of this many seconds (the device reading interval),
+# so reruns within the same interval share cache entries
+QUERY_BUCKET_SECONDS = 60
+
 def get_time_range_timestamps(time_range):
     """Convert time range selection to start and end timestamps."""
-    now = datetime.now()
+    # Round the end of the window up to the next query bucket boundary
+    now = datetime.fromtimestamp(math.ceil(time.time() / QUERY_BUCKET_SECONDS) * QUERY_BUCKET_SECONDS)
     
     if time_range == "Last Hour":
         start_time = now - timedelta(hours=1)
@@ -165,184 +244,756 @@ def get_time_range_timestamps(time_range):
         start_time = now - timedelta(weeks=1)
     elif time_range == "Last Month":
         start_time = now - timedelta(days=30)
+    elif time_range == "Last Year":
+        start_time = now - timedelta(days=365)
+    elif time_range == "All Time":
+        start_time = None
     else:
         start_time = now - timedelta(hours=1)  # Default to last hour
     
     # Convert to Unix timestamps
     end_timestamp = time.mktime(now.timetuple())
-    start_timestamp = time.mktime(start_time.timetuple())
+    start_timestamp = time.mktime(start_time.timetuple()) if start_time else 0
     
     return start_timestamp, end_timestamp
 
-def get_device_data(ref, device_id, start_timestamp, end_timestamp):
-    """Get device data from Firebase within the specified time range."""
-    if ref is None or st.session_state.connection_status == "demo":
-        # Generate sample data for demo mode
-        return generate_sample_data(device_id, start_timestamp, end_timestamp)
+class IncrementalDeviceCache:
+    """Base class for per-device caches that only fetch readings newer than a watermark.
+
+    New readings are taken from the device's live feed when one is connected, and
+    from an indexed Firebase query otherwise. While the feed is connected, an indexed
+    query still runs every LIVE_FEED_RECONCILE_INTERVAL seconds for the readings the
+    feed doesn't carry: millisecond timestamps of legacy firmware, and readings older
+    than the feed's start, such as those a device uploads after an outage.
+    """
     
-    try:
-        # Get readings for the selected device
-        device_ref = ref.child(f'readings/{device_id}')
-        all_readings = device_ref.get()
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.covered_from = None    # oldest timestamp the cache is complete from
+        self.watermark = None       # newest reading timestamp seen
+        self.feed_sequence = None   # live feed position the cache is up to date with
+        self.queried_through = None # newest reading timestamp of the last indexed query
+        self.queried_at = 0         # time of the last indexed query
+        self.feed_timestamps = set()  # timestamps taken from the live feed since that query
+    
+    def fetch_window(self, source, device_id, start_timestamp, end_timestamp, feed):
+        """Query all readings within a window and remember the matching live feed position."""
+        # Take the feed position first so readings arriving during the query aren't skipped
+        self.feed_sequence = feed.sequence if feed is not None else None
+        self.queried_at = time.time()
+        all_readings = source.query_readings(device_id, start_timestamp, end_timestamp)
+        df = decode_readings(all_readings, start_timestamp, end_timestamp)
         
-        if not all_readings:
-            return pd.DataFrame()
+        # Readings up to the newest one returned are complete; later queries start there
+        self.queried_through = df['timestamp'].iloc[-1] if not df.empty else start_timestamp
+        self.feed_timestamps = {t for t in self.feed_timestamps if t > self.queried_through}
+        return df
+    
+    def fetch_new(self, source, device_id, end_timestamp, feed):
+        """Return the readings that weren't fetched yet, and whether some are older than the watermark.
+
+        Readings older than the watermark were uploaded late and only come from indexed queries.
+        """
+        since = self.watermark if self.watermark is not None else self.covered_from
         
-        # Convert to DataFrame and filter by timestamp
-        data_list = []
-        for timestamp, reading in all_readings.items():
-            # Skip entries without timestamp or readings
-            if 'timestamp' not in reading or 'readings' not in reading:
-                continue
-                
-            reading_timestamp = reading['timestamp']
-            if reading_timestamp > end_timestamp * 10:
-                reading_timestamp = reading_timestamp / 1000
+        reconcile_due = time.time() - self.queried_at >= LIVE_FEED_RECONCILE_INTERVAL
+        if feed is not None and feed.connected and self.feed_sequence is not None and not reconcile_due:
+            readings, sequence, complete = feed.read_since(self.feed_sequence)
+            if complete:
+                self.feed_sequence = sequence
+                # Live readings can be newer than the window end; they are kept for later windows
+                new_df = decode_readings(readings, since, np.inf)
+                if self.watermark is not None:
+                    new_df = new_df[new_df['timestamp'] > self.watermark]
+                self.feed_timestamps.update(new_df['timestamp'])
+                return new_df, False
+        
+        # Query from the last query's newest reading, not the watermark, so readings that
+        # arrived late aren't skipped; those taken from the feed since are left out
+        queried_from = since if self.queried_through is None else max(self.queried_through, self.covered_from)
+        feed_timestamps = self.feed_timestamps
+        new_df = self.fetch_window(source, device_id, queried_from, end_timestamp, feed)
+        if self.watermark is not None:
+            new_df = new_df[(new_df['timestamp'] > queried_from) & ~new_df['timestamp'].isin(feed_timestamps)]
+        late = self.watermark is not None and bool((new_df['timestamp'] <= self.watermark).any())
+        return new_df, late
+
+class DeviceDataCache(IncrementalDeviceCache):
+    """Parsed readings of one device plus the newest timestamp fetched so far.
+
+    The cache covers the widest window requested for the device. Each refresh only
+    asks for readings newer than the watermark, appends them, and drops rows that have
+    slid out of the window.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.df = empty_readings_frame()
+        self.span = 0              # length of the widest window cached (seconds)
+    
+    def fetch(self, source, device_id, start_timestamp, end_timestamp, feed=None):
+        """Return the readings within the window, fetching only what is missing."""
+        with self.lock:
+            if self.covered_from is None or start_timestamp < self.covered_from:
+                # Nothing cached for this window yet: fetch it in full
+                self.df = self.fetch_window(source, device_id, start_timestamp, end_timestamp, feed)
+                self.covered_from = start_timestamp
+            else:
+                new_df, late = self.fetch_new(source, device_id, end_timestamp, feed)
+                if self.df.empty:
+                    self.df = new_df
+                elif not new_df.empty:
+                    self.df = pd.concat([self.df, new_df], ignore_index=True)
+                    if late:
+                        self.df = self.df.sort_values('timestamp', kind='stable', ignore_index=True)
             
-            # Check if timestamp is within range
-            if start_timestamp <= reading_timestamp <= end_timestamp:
-                # Extract readings
-                readings = reading['readings']
-                
-                # Create a row with all data
-                row = {
-                    'timestamp': reading_timestamp,
-                    'datetime': datetime.fromtimestamp(reading_timestamp),
-                    'temperature': readings.get('temperature'),
-                    'humidity': readings.get('humidity'),
-                    'light_level': readings.get('light_level'),
-                    'soil_moisture': readings.get('soil_moisture')
-                }
-                data_list.append(row)
+            # Slide the cached window forward and drop readings that fell out of it
+            self.span = max(self.span, end_timestamp - start_timestamp)
+            self.covered_from = max(self.covered_from, end_timestamp - self.span)
+            if not self.df.empty:
+                self.df = self.df[self.df['timestamp'] >= self.covered_from].reset_index(drop=True)
+                self.watermark = max(self.watermark or 0, self.df['timestamp'].iloc[-1])
+            
+            in_window = (self.df['timestamp'] >= start_timestamp) & (self.df['timestamp'] <= end_timestamp)
+            return self.df[in_window].reset_index(drop=True)
+
+class DeviceRollupCache(IncrementalDeviceCache):
+    """Rollup pyramid of one device, kept up to date as new readings arrive.
+
+    Raw readings are downloaded once for the oldest window requested and then only
+    from the watermark onward, and each reading is folded into the pyramid once.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.pyramid = RollupPyramid()
+        self.last_reading = None  # newest raw reading ingested, held until the next one
+    
+    def ingest_new(self, new_df):
+        """Fold readings newer than everything ingested into the pyramid.
         
-        # Create DataFrame
-        if data_list:
-            df = pd.DataFrame(data_list)
-            df = df.sort_values('timestamp')
-            return df
+        The readings held since the previous newest reading are only known once the
+        next reading arrives, so they are ingested together with it.
+        """
+        if new_df.empty:
+            return
+        if self.last_reading is not None:
+            expanded = expand_held_readings(pd.concat([self.last_reading, new_df], ignore_index=True)).iloc[1:]
         else:
-            return pd.DataFrame()
+            expanded = expand_held_readings(new_df)
+        self.pyramid.ingest(expanded)
+        self.last_reading = new_df.tail(1)
+    
+    def fetch(self, source, device_id, tier, start_timestamp, end_timestamp, feed=None):
+        """Return the rollup buckets of a tier within the window."""
+        with self.lock:
+            if self.covered_from is None:
+                # First request: ingest the whole window
+                self.ingest_new(self.fetch_window(source, device_id, start_timestamp, end_timestamp, feed))
+                self.covered_from = start_timestamp
+            else:
+                if start_timestamp < self.covered_from:
+                    # Backfill readings older than anything ingested so far
+                    older_readings = source.query_readings(device_id, start_timestamp, self.covered_from)
+                    older_df = decode_readings(older_readings, start_timestamp, self.covered_from)
+                    older_df = older_df[older_df['timestamp'] < self.covered_from]
+                    self.pyramid.ingest(expand_held_readings(older_df, self.covered_from))
+                    self.covered_from = start_timestamp
+                
+                new_df, late = self.fetch_new(source, device_id, end_timestamp, feed)
+                if late:
+                    # Readings uploaded late fall into buckets that are already rolled up,
+                    # and change the readings held before them; rebuild the pyramid
+                    self.pyramid = RollupPyramid()
+                    self.last_reading = None
+                    self.ingest_new(self.fetch_window(source, device_id, self.covered_from, end_timestamp, feed))
+                else:
+                    # Ingest readings that arrived after the watermark
+                    self.ingest_new(new_df)
             
+            if self.pyramid.newest is not None:
+                self.watermark = self.pyramid.newest
+            
+            return self.pyramid.frame(tier, start_timestamp, end_timestamp)
+
+@st.cache_resource(show_spinner=False)
+def get_device_caches():
+    """Return the process-wide per-device data caches and the lock guarding them."""
+    return {}, threading.Lock()
+
+def get_device_cache(device_id, cache_type=DeviceDataCache):
+    """Return a data cache of the given type for a device, creating it on first use."""
+    caches, lock = get_device_caches()
+    key = (cache_type.__name__, device_id)
+    with lock:
+        if key not in caches:
+            caches[key] = cache_type()
+        return caches[key]
+
+def reset_device_cache(device_id):
+    """Drop the cached data of a device so the next fetch reloads the full window."""
+    caches, lock = get_device_caches()
+    with lock:
+        for key in [key for key in caches if key[1] == device_id]:
+            del caches[key]
+    bump_cache_generation(device_id)
+    get_shared_cache().invalidate(lambda key: key[1] == device_id)
+
+def load_device_data(source, demo, device_id, start_timestamp, end_timestamp):
+    """Load device data within the specified time range, bypassing the query cache.
+
+    Long time ranges return rollup buckets (see select_rollup_tier) instead of raw readings.
+    Raw readings are returned as devices uploaded them; see held_readings_frame for the
+    readings that report-by-exception devices held in between.
+    """
+    tier = select_rollup_tier(start_timestamp, end_timestamp)
+    
+    if demo:
+        # Generate sample data for demo mode
+        start_timestamp = max(start_timestamp, end_timestamp - source.history)
+        df = source.frame(device_id, start_timestamp, end_timestamp)
+        if tier is None:
+            return df
+        pyramid = RollupPyramid()
+        pyramid.ingest(df)
+        return pyramid.frame(tier, start_timestamp, end_timestamp)
+    
+    feed = get_live_feed(device_id)
+    if tier is None:
+        df = get_device_cache(device_id).fetch(source, device_id, start_timestamp, end_timestamp, feed)
+    else:
+        df = get_device_cache(device_id, DeviceRollupCache).fetch(
+            source, device_id, tier, start_timestamp, end_timestamp, feed
+        )
+    if df.empty:
+        return pd.DataFrame()
+    return df
+
+def held_readings_frame(df, end_timestamp):
+    """Return raw readings with the readings report-by-exception devices held filled in.
+
+    Only charts and statistics use the held readings; the latest reading, counts and
+    exports use the readings devices uploaded. The newest reading holds until the current
+    time at most, since window ends are rounded up to the next query bucket.
+    """
+    if df.empty or is_rollup_frame(df):
+        return df
+    return expand_held_readings(df, min(end_timestamp, time.time()))
+
+def is_demo_mode(source):
+    """Return True if sample data is shown instead of device data."""
+    return source.synthetic
+
+def get_device_data(source, device_id, start_timestamp, end_timestamp):
+    """Get device data from Firebase within the specified time range."""
+    demo = is_demo_mode(source)
+    
+    try:
+        return cached_device_data(source, demo, device_id, start_timestamp, end_timestamp)
     except Exception as e:
         st.error(f"Error fetching data: {e}")
         return pd.DataFrame()
 
-def generate_sample_data(device_id, start_timestamp, end_timestamp):
-    """Generate sample data for demo purposes."""
-    # Calculate number of data points (one reading every 5 minutes)
-    duration = end_timestamp - start_timestamp
-    num_points = int(duration / 300) + 1  # 300 seconds = 5 minutes
-    
-    # Create timestamp range
-    timestamps = np.linspace(start_timestamp, end_timestamp, num_points)
-    
-    # Generate sample data with realistic patterns
-    hours = [(datetime.fromtimestamp(ts).hour + datetime.fromtimestamp(ts).minute/60) for ts in timestamps]
-    days = [(datetime.fromtimestamp(ts).weekday()) for ts in timestamps]
-    
-    # Temperature: daily cycle + random noise
-    temp_base = 22 + 5 * np.sin(np.array(hours) * np.pi / 12)  # Daily cycle
-    temperature = temp_base + np.random.normal(0, 1, num_points)  # Add noise
-    
-    # Humidity: inverse to temperature + random noise
-    humidity_base = 60 - 15 * np.sin(np.array(hours) * np.pi / 12)  # Inverse to temperature
-    humidity = humidity_base + np.random.normal(0, 5, num_points)
-    humidity = np.clip(humidity, 0, 100)  # Clip to valid range
-    
-    # Light level: daytime pattern
-    light_base = np.zeros(num_points)
-    for i, hour in enumerate(hours):
-        if 6 <= hour < 18:  # Daytime
-            # Peak at noon
-            light_base[i] = 90 * np.sin(np.pi * (hour - 6) / 12)
-        else:  # Nighttime
-            light_base[i] = 0
-    light_level = light_base + np.random.normal(0, 5, num_points)
-    light_level = np.clip(light_level, 0, 100)  # Clip to valid range
-    
-    # Soil moisture: decreasing over time with occasional watering
-    moisture_base = np.linspace(80, 30, num_points)  # Gradually decreasing
-    
-    # Add "watering events"
-    watering_days = [2, 5]  # Water on Tuesday and Friday
-    for i, day in enumerate(days):
-        if day in watering_days and hours[i] > 8 and hours[i] < 10:
-            # Reset moisture after watering
-            moisture_base[i:] = 80
-    
-    soil_moisture = moisture_base + np.random.normal(0, 3, num_points)
-    soil_moisture = np.clip(soil_moisture, 0, 100)  # Clip to valid range
-    
-    # Create DataFrame
-    data = {
-        'timestamp': timestamps,
-        'datetime': [datetime.fromtimestamp(ts) for ts in timestamps],
-        'temperature': temperature,
-        'humidity': humidity,
-        'light_level': light_level,
-        'soil_moisture': soil_moisture
-    }
-    
-    return pd.DataFrame(data)
+def load_device_health(source, device_id, start_timestamp, end_timestamp):
+    """Load the health records of a device within the time range through the shared cache."""
+    return get_shared_cache().get(
+        cache_key('device_health', device_id, is_demo_mode(source), start_timestamp, end_timestamp),
+        lambda: decode_health(
+            source.query_health(device_id, start_timestamp, end_timestamp), start_timestamp, end_timestamp
+        ),
+        ttl=QUERY_BUCKET_SECONDS,
+    )
 
-def get_download_link(df):
-    """Generate a download link for the data as CSV."""
-    if df.empty:
-        return ""
+def get_device_health(source, device_id, start_timestamp, end_timestamp):
+    """Get the health records a device uploaded within the time range (see telemetry.py)."""
+    try:
+        return load_device_health(source, device_id, start_timestamp, end_timestamp)
+    except Exception as e:
+        st.error(f"Error fetching device health: {e}")
+        return decode_health({}, start_timestamp, end_timestamp)
+
+# Bulk exports are fetched one window of this many seconds at a time
+EXPORT_CHUNK_SECONDS = 86400
+
+def iter_export_chunks(source, device_ids, start_timestamp, end_timestamp):
+    """Yield the raw readings of several devices in time-window chunks.
+
+    Each chunk is a DataFrame with a device_id column followed by the reading columns,
+    so a bulk export never holds more than one window of readings in memory.
+    """
+    for device_id in device_ids:
+        if is_demo_mode(source):
+            yield from source.iter_frames([device_id], start_timestamp, end_timestamp)
+            continue
+        
+        window_start = start_timestamp
+        while True:
+            window_end = min(window_start + EXPORT_CHUNK_SECONDS, end_timestamp)
+            readings = source.query_readings(device_id, window_start, window_end)
+            chunk = decode_readings(readings, window_start, window_end)
+            
+            # Window ends are shared with the next window, which owns them
+            if window_end < end_timestamp:
+                chunk = chunk[chunk['timestamp'] < window_end]
+            if not chunk.empty:
+                # Every chunk of a file needs the same columns, whatever fields its readings have
+                chunk = chunk.reindex(columns=READING_COLUMNS + AGGREGATE_COLUMNS + HOLD_COLUMNS)
+                chunk.insert(0, 'device_id', device_id)
+                yield chunk
+            
+            if window_end >= end_timestamp:
+                break
+            window_start = window_end
+
+#===============================================================================
+# DATA CACHE
+#===============================================================================
+
+# Memory budget of the query results shared by all sessions (bytes)
+CACHE_MAX_BYTES = int(os.environ.get('DASHBOARD_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+@st.cache_resource(show_spinner=False)
+def get_shared_cache():
+    """Return the process-wide query cache shared by all sessions."""
+    return SharedCache(CACHE_MAX_BYTES)
+
+@st.cache_resource(show_spinner=False)
+def get_cache_generations():
+    """Return the process-wide per-device cache generations and the lock guarding them."""
+    return {}, threading.Lock()
+
+def get_cache_generation(device_id):
+    """Return the cache generation of a device, part of every query cache key."""
+    generations, lock = get_cache_generations()
+    with lock:
+        return generations.get(device_id, 0)
+
+def bump_cache_generation(device_id):
+    """Make all cached query results for a device unreachable."""
+    generations, lock = get_cache_generations()
+    with lock:
+        generations[device_id] = generations.get(device_id, 0) + 1
+
+def cache_key(kind, device_id, demo, start_timestamp, end_timestamp):
+    """Return the shared cache key of a result for a device and time window.
+
+    The key includes the device's cache generation and live feed position, so results
+    are recomputed after a manual refresh and when new live readings arrive.
+    """
+    return (
+        kind, device_id, demo, start_timestamp, end_timestamp,
+        get_cache_generation(device_id), get_live_sequence(device_id),
+    )
+
+def cached_device_data(source, demo, device_id, start_timestamp, end_timestamp):
+    """Load device data through the shared cache.
+
+    Windows from get_time_range_timestamps are aligned to query buckets, so all sessions
+    showing a device within the same bucket share a single load, even when they ask
+    for it at the same moment. The returned frame is shared and must not be modified.
+    """
+    return get_shared_cache().get(
+        cache_key('device_data', device_id, demo, start_timestamp, end_timestamp),
+        lambda: load_device_data(source, demo, device_id, start_timestamp, end_timestamp),
+        ttl=QUERY_BUCKET_SECONDS,
+    )
+
+def get_statistics(source, df, device_id, start_timestamp, end_timestamp):
+    """Get statistics for the data of a device, cached under the same key as the data they describe.
+
+    Held readings (see held_readings_frame) weigh values by the time they held, but the
+    counts are those of the readings devices uploaded.
+    """
+    def compute():
+        stats = calculate_statistics(held_readings_frame(df, end_timestamp))
+        if not df.empty and not is_rollup_frame(df):
+            for param in PARAMETERS:
+                stats[param]['count'] = int(df[param].notna().sum())
+        return stats
     
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="environmental_data.csv">Download CSV File</a>'
-    return href
+    return get_shared_cache().get(
+        cache_key('statistics', device_id, is_demo_mode(source), start_timestamp, end_timestamp),
+        compute,
+        ttl=QUERY_BUCKET_SECONDS,
+    )
 
-def calculate_statistics(df):
-    """Calculate statistics for each environmental parameter."""
-    if df.empty:
-        return {
-            'temperature': {'min': None, 'max': None, 'avg': None, 'trend': 0},
-            'humidity': {'min': None, 'max': None, 'avg': None, 'trend': 0},
-            'light_level': {'min': None, 'max': None, 'avg': None, 'trend': 0},
-            'soil_moisture': {'min': None, 'max': None, 'avg': None, 'trend': 0}
-        }
+#===============================================================================
+# INSTRUMENTATION
+#===============================================================================
+
+# If set, the stage metrics are written to this file in Prometheus text format after every rerun
+METRICS_FILE = os.environ.get('DASHBOARD_METRICS_FILE')
+
+# If set, the import and initialization costs of the first run are printed and shown
+# in the performance panel
+PROFILE_STARTUP = bool(os.environ.get('DASHBOARD_PROFILE_STARTUP'))
+
+@st.cache_resource(show_spinner=False)
+def get_stage_metrics():
+    """Return the process-wide rolling stage metrics."""
+    return StageMetrics()
+
+def record_rerun(profile):
+    """Add the stages of a finished rerun to the metrics and update the metrics file."""
+    metrics = get_stage_metrics()
+    metrics.observe(profile)
+    if METRICS_FILE:
+        try:
+            metrics.write_prometheus(METRICS_FILE, extra=get_shared_cache().to_prometheus())
+        except OSError as e:
+            print(f"Could not write metrics to {METRICS_FILE}: {e}")
+
+#===============================================================================
+# LIVE UPDATES
+#===============================================================================
+
+# Live feeds close after this long without a session watching them (seconds)
+LIVE_FEED_IDLE_TIMEOUT = 300
+
+# Number of live readings kept for caches that haven't caught up yet
+LIVE_FEED_BUFFER_SIZE = 10000
+
+# Refresh interval when no live feed is connected (seconds)
+POLL_INTERVAL = 30
+
+# Interval of the indexed queries for readings a connected live feed doesn't carry (seconds)
+LIVE_FEED_RECONCILE_INTERVAL = 120
+
+def iter_sse_events(response):
+    """Yield (event, data) pairs from a server-sent events HTTP response."""
+    event, data = None, []
+    # chunk_size=None yields each chunk as it arrives instead of waiting for a full buffer
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if line:
+            field, _, value = line.partition(':')
+            if field == 'event':
+                event = value.strip()
+            elif field == 'data':
+                data.append(value.strip())
+        elif event is not None:
+            yield event, '\n'.join(data)
+            event, data = None, []
+
+class LiveFeed:
+    """Streams new readings of one device from the Firebase REST API in the background.
+
+    Works with any source that provides a REST event stream (see DataSource.stream_request).
+
+    The stream is filtered to readings from ``since`` onward, so connecting doesn't
+    download the device's history. Incoming readings are appended to a bounded buffer
+    numbered by sequence, and sessions waiting on the feed are woken up. The bytes
+    received are counted in ``metrics``, a StageMetrics.
+    """
     
-    stats = {}
-    for param in ['temperature', 'humidity', 'light_level', 'soil_moisture']:
-        if param in df.columns:
-            # Filter out None values
-            param_data = df[param].dropna()
-            
-            if len(param_data) > 0:
-                # Calculate basic statistics
-                min_val = param_data.min()
-                max_val = param_data.max()
-                avg_val = param_data.mean()
-                
-                # Calculate trend (positive or negative)
-                if len(param_data) >= 2:
-                    # Use simple linear regression for trend
-                    x = np.arange(len(param_data))
-                    y = param_data.values
-                    
-                    # Calculate slope using least squares
-                    slope = np.polyfit(x, y, 1)[0]
-                    
-                    # Normalize trend to be between -1 and 1
-                    trend = np.tanh(slope * 10)  # Scale and bound the trend
-                else:
-                    trend = 0
-                
-                stats[param] = {
-                    'min': min_val,
-                    'max': max_val,
-                    'avg': avg_val,
-                    'trend': trend
+    def __init__(self, url, params, device_id, since, metrics):
+        self.url = url
+        self.params = params
+        self.since = since
+        self.metrics = metrics
+        self.condition = threading.Condition()
+        self.buffer = collections.deque(maxlen=LIVE_FEED_BUFFER_SIZE)
+        self.sequence = 0          # sequence number of the newest buffered reading
+        self.connected = False
+        self.closed = False
+        self.last_used = time.time()
+        self.thread = threading.Thread(target=self._run, name=f"live-feed-{device_id}", daemon=True)
+        self.thread.start()
+    
+    def touch(self):
+        """Mark the feed as watched so it isn't closed for being idle."""
+        self.last_used = time.time()
+    
+    def _idle(self):
+        return time.time() - self.last_used > LIVE_FEED_IDLE_TIMEOUT
+    
+    def _run(self):
+        """Keep the event stream open, reconnecting with backoff, until the feed goes idle."""
+        backoff = 1
+        while not self._idle():
+            try:
+                # Millisecond timestamps (legacy firmware) sort above since * 10 and are left out
+                params = {
+                    **self.params,
+                    'orderBy': '"timestamp"',
+                    'startAt': json.dumps(self.since),
+                    'endAt': json.dumps(self.since * 10),
                 }
+                headers = {'Accept': 'text/event-stream'}
+                with requests.get(self.url, params=params, headers=headers, stream=True, timeout=(10, 90)) as response:
+                    response.raise_for_status()
+                    self._set_connected(True)
+                    backoff = 1
+                    for event, data in iter_sse_events(response):
+                        self.metrics.add_bytes('live_feed', len(data))
+                        if event in ('put', 'patch'):
+                            self._handle(json.loads(data))
+                        elif event in ('cancel', 'auth_revoked'):
+                            print(f"Live feed {self.url} stopped by server: {event}")
+                            break
+                        if self._idle():
+                            break
+            except (requests.RequestException, ValueError) as e:
+                print(f"Live feed {self.url} disconnected: {e}")
+            
+            self._set_connected(False)
+            if not self._idle():
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+        
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+    
+    def _set_connected(self, connected):
+        with self.condition:
+            self.connected = connected
+    
+    def _handle(self, message):
+        """Buffer the readings carried by a put or patch event."""
+        path, data = message.get('path'), message.get('data')
+        if path == '/':
+            # Initial snapshot or multi-path update
+            readings = data if isinstance(data, dict) else {}
+        elif path.count('/') == 1 and isinstance(data, dict):
+            # A single new reading
+            readings = {path[1:]: data}
+        else:
+            # Partial updates of existing readings are not tracked
+            return
+        
+        readings = {key: reading for key, reading in readings.items() if isinstance(reading, dict)}
+        if not readings:
+            return
+        
+        with self.condition:
+            for key, reading in readings.items():
+                self.buffer.append((key, reading))
+                self.sequence += 1
+                if isinstance(reading.get('timestamp'), (int, float)):
+                    self.since = max(self.since, reading['timestamp'])
+            self.condition.notify_all()
+    
+    def read_since(self, sequence):
+        """Return the readings buffered after a sequence number.
+
+        Returns (readings, newest sequence, complete), where complete is False if some
+        readings after the given sequence have already been dropped from the buffer.
+        """
+        with self.condition:
+            oldest = self.sequence - len(self.buffer)
+            complete = sequence >= oldest
+            readings = dict(itertools.islice(self.buffer, max(sequence - oldest, 0), None))
+            return readings, self.sequence, complete
+    
+    def wait_for_update(self, sequence, timeout):
+        """Wait until readings newer than a sequence number arrive; return the newest sequence."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence != sequence or self.closed, timeout)
+            return self.sequence
+
+@st.cache_resource(show_spinner=False)
+def get_live_feeds():
+    """Return the process-wide per-device live feeds and the lock guarding them."""
+    return {}, threading.Lock()
+
+def get_live_feed(device_id):
+    """Return the running live feed of a device, or None."""
+    feeds, lock = get_live_feeds()
+    with lock:
+        feed = feeds.get(device_id)
+        return feed if feed is not None and not feed.closed else None
+
+def start_live_feed(source, device_id):
+    """Return the live feed of a device, starting it if it isn't running.
+
+    Returns None if the data source has no event stream.
+    """
+    stream = source.stream_request(device_id)
+    if stream is None:
+        return None
+    
+    feeds, lock = get_live_feeds()
+    with lock:
+        feed = feeds.get(device_id)
+        if feed is None or feed.closed:
+            # Readings already in the caches are filtered out by their watermarks
+            feed = LiveFeed(*stream, device_id, since=time.time() - POLL_INTERVAL,
+                            metrics=get_stage_metrics())  # not callable from the feed's thread
+            feeds[device_id] = feed
+        feed.touch()
+        return feed
+
+def get_live_sequence(device_id):
+    """Return the live feed position of a device, part of every query cache key."""
+    feed = get_live_feed(device_id)
+    return feed.sequence if feed is not None else 0
+
+def wait_for_new_readings(feed):
+    """Block until new readings arrive on the live feed, then rerun the dashboard.
+
+    Without a connected feed (demo mode or connection problems) the dashboard is
+    rerun every POLL_INTERVAL seconds instead, and with one every
+    LIVE_FEED_RECONCILE_INTERVAL seconds, to query the readings the feed doesn't carry
+    (see IncrementalDeviceCache). The status line is updated every second, which also
+    lets Streamlit interrupt the wait when a widget changes.
+    """
+    status = st.empty()
+    sequence = feed.sequence if feed is not None else None
+    started = last_connected = time.time()
+    poll_deadline = started + POLL_INTERVAL
+    
+    while True:
+        if feed is not None and not feed.closed:
+            feed.touch()
+            if feed.wait_for_update(sequence, timeout=1) != sequence:
+                break
+            if feed.connected:
+                status.caption("🟢 Live: waiting for new readings")
+                last_connected = time.time()
             else:
-                stats[param] = {'min': None, 'max': None, 'avg': None, 'trend': 0}
+                status.caption("🟡 Live feed reconnecting...")
+            poll_deadline = min(started + LIVE_FEED_RECONCILE_INTERVAL, last_connected + POLL_INTERVAL)
+        else:
+            time.sleep(1)
+            status.caption(f"Next refresh in {max(0, int(poll_deadline - time.time()))}s")
+        
+        if time.time() >= poll_deadline:
+            break
+    
+    st.rerun()
+
+#===============================================================================
+# FLEET OVERVIEW
+#===============================================================================
+
+# Each device is summarized over this many recent seconds
+FLEET_WINDOW = 3600
+
+# Devices fetched at the same time
+FLEET_MAX_WORKERS = 8
+
+# The fleet table is complete after at most this many seconds; slower devices are left out
+FLEET_DEADLINE = 20
+
+# Devices without a reading for this long are shown as offline (seconds)
+FLEET_OFFLINE_AFTER = 900
+
+def param_label(param, unit=True):
+    """Return the display name of a parameter, e.g. 'Soil Moisture (%)'."""
+    label = param.replace('_', ' ').title()
+    if unit:
+        label += " (°C)" if param == 'temperature' else " (%)"
+    return label
+
+def summarize_device(source, demo, device_id, end_timestamp):
+    """Summarize the latest reading of a device and its readings of the last FLEET_WINDOW seconds.
+
+    Returns a dict with 'last_seen' (timestamp or None), 'latest' ({parameter: value})
+    and 'count' (number of readings in the window).
+    """
+    df = load_device_data(source, demo, device_id, end_timestamp - FLEET_WINDOW, end_timestamp)
+    count = len(df)
+    
+    # Quiet devices: look up their last reading only
+    if df.empty and not demo:
+        df = decode_readings(source.query_latest_reading(device_id, end_timestamp), 0, end_timestamp)
+    if df.empty:
+        return {'last_seen': None, 'latest': {}, 'count': 0}
+    
+    latest = df.iloc[-1]
+    return {
+        'last_seen': float(latest['timestamp']),
+        'latest': {param: float(latest[param]) for param in PARAMETERS},
+        'count': count,
+    }
+
+def cached_device_summary(source, demo, device_id, end_timestamp):
+    """Summarize a device through the shared cache, so concurrent fleet views share the fetch."""
+    return get_shared_cache().get(
+        cache_key('fleet_summary', device_id, demo, end_timestamp - FLEET_WINDOW, end_timestamp),
+        lambda: summarize_device(source, demo, device_id, end_timestamp),
+        ttl=QUERY_BUCKET_SECONDS,
+    )
+
+def iter_fleet_summaries(source, demo, device_ids, end_timestamp):
+    """Summarize devices in parallel, yielding (device_id, summary or exception) as each finishes.
+
+    At most FLEET_MAX_WORKERS devices are fetched at a time, and devices that haven't
+    finished after FLEET_DEADLINE seconds are not waited for. Their fetches carry on in
+    the background and warm the device caches for the next refresh.
+    """
+    deadline = time.monotonic() + FLEET_DEADLINE
+    
+    # Worker threads share the session's script context so they can use the Streamlit caches,
+    # and their downloads count towards the calling thread's stages
+    ctx = get_script_run_ctx()
+    stages = list(active_stages())
+    
+    def init_worker():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        bind_stages(stages)
+    
+    executor = ThreadPoolExecutor(
+        max_workers=FLEET_MAX_WORKERS,
+        thread_name_prefix="fleet",
+        initializer=init_worker,
+    )
+    futures = {
+        executor.submit(cached_device_summary, source, demo, device_id, end_timestamp): device_id
+        for device_id in device_ids
+    }
+    
+    try:
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                yield futures[future], error if error is not None else future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def build_fleet_table(device_ids, results, finished):
+    """Build the fleet overview table, with problem devices first.
+
+    results maps device IDs to summaries or exceptions; devices without a result are
+    shown as loading, or as timed out once finished is True.
+    """
+    now = time.time()
+    rows = []
+    for device_id in device_ids:
+        result = results.get(device_id)
+        row = {'Device': device_id, 'Status': None, 'Last Seen': None}
+        row.update({param_label(param): None for param in PARAMETERS})
+        row.update({'Readings (1h)': None, 'Alerts': ""})
+        
+        if result is None:
+            row['Status'] = "⌛ Timed out" if finished else "⏳ Loading"
+        elif isinstance(result, Exception):
+            row['Status'] = "⚠️ Error"
+            row['Alerts'] = str(result)
+        elif result['last_seen'] is None:
+            row['Status'] = "⚪ No data"
         else:
-            stats[param] = {'min': None, 'max': None, 'avg': None, 'trend': 0}
+            flags = out_of_range_parameters(result['latest'])
+            row['Last Seen'] = datetime.fromtimestamp(result['last_seen'])
+            row.update({param_label(param): value for param, value in result['latest'].items()})
+            row['Readings (1h)'] = result['count']
+            row['Alerts'] = ", ".join(f"{param_label(param, unit=False)} {flag}" for param, flag in flags.items())
+            if now - result['last_seen'] > FLEET_OFFLINE_AFTER:
+                row['Status'] = "🔴 Offline"
+            elif flags:
+                row['Status'] = "🟠 Alert"
+            else:
+                row['Status'] = "🟢 OK"
+        rows.append(row)
     
-    return stats
+    status_order = ["⚠️ Error", "🔴 Offline", "🟠 Alert", "⌛ Timed out", "⚪ No data", "⏳ Loading", "🟢 OK"]
+    rows.sort(key=lambda row: (status_order.index(row['Status']), row['Device']))
+    return pd.DataFrame(rows)
 
 #===============================================================================
 # UI COMPONENTS
@@ -362,48 +1013,48 @@ def render_header():
         Select a device and time range to view real-time data, trends, and statistics.
         """)
 
-def render_sidebar(ref):
-    """Render the sidebar with controls."""
+def render_sidebar():
+    """Render the sidebar with controls.
+    
+    The connection status and device selector depend on the data source, so the sidebar
+    only reserves their places; render_connection_status and render_device_selector fill
+    them in once the data source is connected.
+    """
     st.sidebar.header("Dashboard Controls")
     
     # Connection status indicator
-    if st.session_state.connection_status == "connected":
-        st.sidebar.success("✅ Connected to Firebase")
-    elif st.session_state.connection_status == "error":
-        st.sidebar.error("❌ Firebase Connection Error")
-        st.sidebar.info("Using sample data for demonstration")
-    else:  # Demo mode
-        st.sidebar.info("ℹ️ Demo Mode: Using sample data")
-    
-    # Device selector
-    devices = get_devices(ref)
-    if not devices:
-        st.sidebar.warning("No devices found")
-        selected_device = None
-    else:
-        selected_device = st.sidebar.selectbox(
-            "Select Device",
-            devices,
-            index=0,
-            help="Choose which environmental monitor to display"
-        )
+    status_slot = st.sidebar.empty()
     
-    # Time range selector
-    time_range = st.sidebar.radio(
-        "Select Time Range",
-        ["Last Hour", "Last Day", "Last Week", "Last Month"],
-        index=0,  # Default to Last Hour
-        help="Choose the time period for data visualization"
+    # View selector
+    view = st.sidebar.radio(
+        "View",
+        ["Device Details", "Fleet Overview"],
+        index=0,
+        help="Show one device in detail, or the latest readings of all devices"
     )
     
+    device_slot = None
+    time_range = None
+    if view == "Device Details":
+        # Device selector
+        device_slot = st.sidebar.empty()
+        
+        # Time range selector
+        time_range = st.sidebar.radio(
+            "Select Time Range",
+            ["Last Hour", "Last Day", "Last Week", "Last Month", "Last Year", "All Time"],
+            index=0,  # Default to Last Hour
+            help="Choose the time period for data visualization"
+        )
+    
     # Data refresh button
     refresh = st.sidebar.button("Refresh Data")
     
-    # Auto-refresh toggle
-    auto_refresh = st.sidebar.checkbox(
-        "Auto-refresh (30s)",
+    # Live updates toggle
+    live_updates = st.sidebar.checkbox(
+        "Live updates",
         value=True,  # Set to True by default
-        help="Automatically refresh data every 30 seconds"
+        help="Show new readings as soon as devices send them (refreshes every 30 seconds if no live connection is available)"
     )
     
     # Educational information
@@ -424,7 +1075,30 @@ def render_sidebar(ref):
     st.sidebar.markdown("---")
     st.sidebar.markdown("Created for educational purposes | 2025")
     
-    return selected_device, time_range, refresh, auto_refresh
+    return status_slot, device_slot, view, time_range, refresh, live_updates
+
+def render_connection_status(slot, source):
+    """Render the connection status indicator into its place in the sidebar."""
+    with slot.container():
+        if st.session_state.connection_status == "connected":
+            st.success(f"✅ Connected to {source.name}")
+        elif st.session_state.connection_status == "error":
+            st.error("❌ Firebase Connection Error")
+            st.info("Using sample data for demonstration")
+        else:  # Demo mode
+            st.info("ℹ️ Demo Mode: Using sample data")
+
+def render_device_selector(slot, devices):
+    """Render the device selector into its place in the sidebar; returns the selected device."""
+    if not devices:
+        slot.warning("No devices found")
+        return None
+    return slot.selectbox(
+        "Select Device",
+        devices,
+        index=0,
+        help="Choose which environmental monitor to display"
+    )
 
 def render_current_readings(df, device_id):
     """Render the current readings section."""
@@ -495,140 +1169,39 @@ def render_current_readings(df, device_id):
     # Last updated time
     st.markdown(f"Last updated: {latest['datetime'].strftime('%Y-%m-%d %H:%M:%S')}")
 
+# Upper bound on the serialized size of the charts of a page (bytes)
+CHART_BUDGET = int(os.environ.get('DASHBOARD_CHART_BUDGET', CHART_PAYLOAD_BUDGET))
+
 def render_time_series_charts(df, time_range):
-    """Render time series charts for each parameter."""
+    """Render time series charts for each parameter; returns the bytes of chart data sent."""
     st.subheader("Time Series Data")
     
     if df.empty:
         st.info("No data available for the selected time range")
-        return
+        return 0
+    
+    # Downsample each parameter for display; statistics and export use the full data
+    figures, max_points, payload_bytes = build_chart_figures(df, CHART_WIDTH_PX, CHART_BUDGET)
+    if is_rollup_frame(df):
+        st.caption("Long time ranges show averages over time buckets, shaded between the minimum and maximum of each bucket; statistics combine the minimum, maximum and average of each bucket.")
+    else:
+        if any(has_band(df, param) for param in PARAMETERS):
+            st.caption("Readings are averages of the samples a device took during each reading interval, shaded between their minimum and maximum.")
+        if 'heartbeat' in df.columns:
+            st.caption("The device only uploads readings that changed; each one is drawn until its next reading, or for one heartbeat at most.")
+        if len(df) > max_points:
+            st.caption(f"Charts show {max_points:,} of {len(df):,} readings per parameter; peaks and troughs are preserved.")
     
     # Create tabs for different visualization options
     tab1, tab2 = st.tabs(["Individual Charts", "Combined Chart"])
     
     with tab1:
-        # Temperature chart
-        fig_temp = px.line(
-            df,
-            x='datetime',
-            y='temperature',
-            title='Temperature Over Time',
-            labels={'temperature': 'Temperature (°C)', 'datetime': 'Time'},
-            line_shape='spline',
-            color_discrete_sequence=['#FF5733']
-        )
-        fig_temp.update_layout(height=300, margin=dict(l=20, r=20, t=40, b=20))
-        st.plotly_chart(fig_temp, use_container_width=True)
-        
-        # Humidity chart
-        fig_humid = px.line(
-            df,
-            x='datetime',
-            y='humidity',
-            title='Humidity Over Time',
-            labels={'humidity': 'Humidity (%)', 'datetime': 'Time'},
-            line_shape='spline',
-            color_discrete_sequence=['#33A1FF']
-        )
-        fig_humid.update_layout(height=300, margin=dict(l=20, r=20, t=40, b=20))
-        st.plotly_chart(fig_humid, use_container_width=True)
-        
-        # Light level chart
-        fig_light = px.line(
-            df,
-            x='datetime',
-            y='light_level',
-            title='Light Level Over Time',
-            labels={'light_level': 'Light Level (%)', 'datetime': 'Time'},
-            line_shape='spline',
-            color_discrete_sequence=['#FFC300']
-        )
-        fig_light.update_layout(height=300, margin=dict(l=20, r=20, t=40, b=20))
-        st.plotly_chart(fig_light, use_container_width=True)
-        
-        # Soil moisture chart
-        fig_soil = px.line(
-            df,
-            x='datetime',
-            y='soil_moisture',
-            title='Soil Moisture Over Time',
-            labels={'soil_moisture': 'Soil Moisture (%)', 'datetime': 'Time'},
-            line_shape='spline',
-            color_discrete_sequence=['#8B4513']
-        )
-        fig_soil.update_layout(height=300, margin=dict(l=20, r=20, t=40, b=20))
-        st.plotly_chart(fig_soil, use_container_width=True)
+        for param in PARAMETERS:
+            st.plotly_chart(figures[param], use_container_width=True)
     
     with tab2:
         # Create a combined chart with all parameters
-        fig = make_subplots(specs=[[{"secondary_y": True}]])
-        
-        # Add temperature trace
-        fig.add_trace(
-            go.Scatter(
-                x=df['datetime'],
-                y=df['temperature'],
-                name="Temperature (°C)",
-                line=dict(color='#FF5733', width=2),
-                mode='lines'
-            ),
-            secondary_y=False,
-        )
-        
-        # Add humidity trace
-        fig.add_trace(
-            go.Scatter(
-                x=df['datetime'],
-                y=df['humidity'],
-                name="Humidity (%)",
-                line=dict(color='#33A1FF', width=2),
-                mode='lines'
-            ),
-            secondary_y=False,
-        )
-        
-        # Add light level trace
-        fig.add_trace(
-            go.Scatter(
-                x=df['datetime'],
-                y=df['light_level'],
-                name="Light Level (%)",
-                line=dict(color='#FFC300', width=2),
-                mode='lines'
-            ),
-            secondary_y=True,
-        )
-        
-        # Add soil moisture trace
-        fig.add_trace(
-            go.Scatter(
-                x=df['datetime'],
-                y=df['soil_moisture'],
-                name="Soil Moisture (%)",
-                line=dict(color='#8B4513', width=2),
-                mode='lines'
-            ),
-            secondary_y=True,
-        )
-        
-        # Set titles
-        fig.update_layout(
-            title_text="Combined Environmental Data",
-            height=500,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            )
-        )
-        
-        # Set y-axes titles
-        fig.update_yaxes(title_text="Temperature (°C) / Humidity (%)", secondary_y=False)
-        fig.update_yaxes(title_text="Light Level (%) / Soil Moisture (%)", secondary_y=True)
-        
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figures['combined'], use_container_width=True)
         
         # Add explanation
         st.markdown("""
@@ -647,8 +1220,10 @@ def render_time_series_charts(df, time_range):
         </ul>
         </div>
         """, unsafe_allow_html=True)
+    
+    return payload_bytes
 
-def render_statistics(df):
+def render_statistics(df, stats):
     """Render statistical analysis section."""
     st.subheader("Statistical Analysis")
     
@@ -656,9 +1231,6 @@ def render_statistics(df):
         st.info("No data available for the selected time range")
         return
     
-    # Calculate statistics
-    stats = calculate_statistics(df)
-    
     # Create columns for each parameter
     col1, col2, col3, col4 = st.columns(4)
     
@@ -752,20 +1324,337 @@ def render_statistics(df):
     </div>
     """, unsafe_allow_html=True)
 
-def render_data_export(df):
-    """Render data export section."""
+# Rows per page in the data preview
+PREVIEW_PAGE_SIZE = 100
+
+# Largest export file offered for download (bytes); Streamlit holds the file in memory
+# while its download button is shown
+EXPORT_MAX_BYTES = int(os.environ.get('DASHBOARD_EXPORT_MAX_BYTES', 100_000_000))
+
+# Export files not shown for this long are deleted (seconds), e.g. those of ended sessions
+EXPORT_MAX_AGE = int(os.environ.get('DASHBOARD_EXPORT_MAX_AGE', 3600))
+
+@st.cache_resource(show_spinner=False)
+def get_export_directory():
+    """Return the process-wide directory of export files, removed when the process exits."""
+    directory = tempfile.mkdtemp(prefix="dashboard-exports-")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    return directory
+
+def prune_exports():
+    """Delete export files that haven't been shown for EXPORT_MAX_AGE.
+
+    Streamlit doesn't report the end of a session, so this is how the exports of ended
+    sessions are cleaned up.
+    """
+    cutoff = time.time() - EXPORT_MAX_AGE
+    for entry in os.scandir(get_export_directory()):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        except FileNotFoundError:
+            pass  # pruned by another session
+
+def discard_export(state_key):
+    """Delete the file of an export kept in the session state, if any."""
+    export = st.session_state.pop(state_key, None)
+    if export:
+        try:
+            os.unlink(export['path'])
+        except FileNotFoundError:
+            pass
+
+def prepare_export(state_key, export_key, chunks, export_format):
+    """Write DataFrame chunks to an export file kept in the session state under state_key.
+
+    The file stays on disk between reruns until it is discarded, replaced or pruned (see
+    prune_exports). Files larger than EXPORT_MAX_BYTES are refused.
+    """
+    discard_export(state_key)
+    prune_exports()
+    extension, _ = EXPORT_FORMATS[export_format]
+    fd, path = tempfile.mkstemp(suffix=f".{extension}", dir=get_export_directory())
+    try:
+        with open(fd, 'wb') as file, st.spinner("Exporting readings..."):
+            rows = write_export(chunks, export_format, file)
+            size = file.tell()
+    except Exception as e:
+        os.unlink(path)
+        st.error(f"Error exporting data: {e}")
+        return
+    
+    if size > EXPORT_MAX_BYTES:
+        os.unlink(path)
+        st.error(f"The export is {size / 1e6:,.0f} MB, more than the limit of "
+                 f"{EXPORT_MAX_BYTES / 1e6:,.0f} MB; select fewer devices or a shorter time range")
+        return
+    st.session_state[state_key] = {'key': export_key, 'path': path, 'rows': rows}
+
+def render_export_download(state_key, export_key, file_name, mime):
+    """Render the download button of the session's export if it is the one selected.
+
+    An export of a different selection is discarded, so its file isn't kept around.
+    """
+    export = st.session_state.get(state_key)
+    if export and export['key'] != export_key:
+        discard_export(state_key)
+        return
+    if not export:
+        return
+    try:
+        # Showing the file marks it as in use for prune_exports
+        os.utime(export['path'])
+        with open(export['path'], 'rb') as data:
+            st.download_button(f"Download {export['rows']:,} Readings", data, file_name=file_name, mime=mime)
+    except FileNotFoundError:
+        st.session_state.pop(state_key, None)
+        st.info("The prepared download has expired; prepare it again")
+
+def render_data_export(source, df, device_id, start_timestamp, end_timestamp):
+    """Render data export section.
+
+    Long time ranges show rollup buckets; their export contains the raw readings of the
+    time range, fetched one window at a time (see iter_export_chunks).
+    """
     st.subheader("Data Export")
     
     if df.empty:
         st.info("No data available to export")
         return
     
-    # Create download link
-    st.markdown(get_download_link(df), unsafe_allow_html=True)
+    export_format = st.selectbox("Export Format", available_export_formats(), key="export_format")
+    extension, mime = EXPORT_FORMATS[export_format]
     
-    # Show data preview
+    # The file is only generated when requested, not on every rerun
+    export_key = (device_id, df['timestamp'].iloc[0], df['timestamp'].iloc[-1], len(df), export_format)
+    if st.button("Prepare Download"):
+        if is_rollup_frame(df):
+            chunks = (
+                chunk.drop(columns='device_id')
+                for chunk in iter_export_chunks(source, [device_id], start_timestamp, end_timestamp)
+            )
+        else:
+            chunks = [df]
+        prepare_export('export', export_key, chunks, export_format)
+    render_export_download('export', export_key, f"environmental_data.{extension}", mime)
+    
+    # Show data preview one page at a time
     with st.expander("Preview Data"):
-        st.dataframe(df)
+        if is_rollup_frame(df):
+            st.caption("The rows are averages over time buckets, as in the charts; the download contains the raw readings.")
+        num_pages = max(1, math.ceil(len(df) / PREVIEW_PAGE_SIZE))
+        page = st.number_input("Page", min_value=1, max_value=num_pages, value=1, key="preview_page")
+        first_row = (page - 1) * PREVIEW_PAGE_SIZE
+        st.dataframe(df.iloc[first_row:first_row + PREVIEW_PAGE_SIZE])
+        st.caption(f"Rows {first_row + 1:,}-{min(first_row + PREVIEW_PAGE_SIZE, len(df)):,} of {len(df):,}")
+
+def render_bulk_export(source, devices):
+    """Render the bulk export of raw readings for several devices and a date range."""
+    with st.expander("Bulk Export"):
+        selected_devices = st.multiselect("Devices", devices, default=devices[:1], key="bulk_export_devices")
+        today = date.today()
+        dates = st.date_input("Date Range", (today - timedelta(days=7), today), key="bulk_export_dates")
+        export_format = st.selectbox("Format", available_export_formats(), index=1, key="bulk_export_format")
+        extension, mime = EXPORT_FORMATS[export_format]
+        
+        if not selected_devices or len(dates) != 2:
+            st.info("Select at least one device and a start and end date")
+            return
+        
+        # Whole days from the start of the first date to the end of the last one
+        start_timestamp = time.mktime(dates[0].timetuple())
+        end_timestamp = time.mktime((dates[1] + timedelta(days=1)).timetuple()) - 1
+        
+        export_key = (tuple(selected_devices), start_timestamp, end_timestamp, export_format)
+        if st.button("Export Readings"):
+            chunks = iter_export_chunks(source, selected_devices, start_timestamp, end_timestamp)
+            prepare_export('bulk_export', export_key, chunks, export_format)
+        render_export_download('bulk_export', export_key, f"environmental_data_bulk.{extension}", mime)
+
+def render_cache_statistics():
+    """Render the shared query cache's request counts, evictions and memory use."""
+    cache = get_shared_cache()
+    counts, entries, used_bytes, flights = cache.summary()
+    rows = []
+    for kind, events in sorted(counts.items()):
+        # Coalesced requests waited for another session's fetch instead of fetching themselves
+        requests = events['hits'] + events['coalesced'] + events['misses']
+        rows.append({
+            'Cache': kind.replace('_', ' ').title(),
+            'Hits': events['hits'],
+            'Coalesced': events['coalesced'],
+            'Misses': events['misses'],
+            'Hit Rate': f"{(requests - events['misses']) / requests:.0%}" if requests else "-",
+            'Evictions': events['evictions'],
+            'Evicted (MB)': f"{events['evicted_bytes'] / 1e6:.1f}",
+        })
+    
+    with st.expander("Cache Statistics"):
+        if rows:
+            st.table(pd.DataFrame(rows).set_index('Cache'))
+        st.caption(
+            f"Shared by all sessions: {entries:,} results using {used_bytes / 1e6:.1f} of "
+            f"{cache.max_bytes / 1e6:.0f} MB, {flights} being fetched"
+        )
+
+def counts_firebase_bytes(source):
+    """Return False if the source is a Firebase database whose downloads can't be counted."""
+    return not isinstance(source, FirebaseSource) or source.session is not None
+
+def render_performance_panel(profile, source):
+    """Render the timings and Firebase downloads of this rerun and of recent reruns."""
+    metrics = get_stage_metrics()
+    bytes_counted = counts_firebase_bytes(source)
+    
+    with st.expander("Performance"):
+        st.markdown("**This rerun**")
+        st.table(pd.DataFrame([
+            {
+                'Stage': "\u2003" * stage.depth + stage.name,
+                'Time (ms)': f"{stage.seconds * 1000:.1f}",
+                'Rows': f"{stage.rows:,}" if stage.rows is not None else "-",
+                'Firebase Bytes': f"{stage.bytes:,}" if bytes_counted else "-",
+            }
+            for stage in profile.stages
+        ]).set_index('Stage'))
+        for stage in profile.stages:
+            if stage.sent_bytes is not None:
+                st.caption(f"The {stage.name} stage sent {stage.sent_bytes:,} bytes of data to the browser "
+                           f"(chart budget {CHART_BUDGET:,} bytes)")
+        
+        st.markdown("**Recent reruns**")
+        st.table(pd.DataFrame([
+            {
+                'Stage': name,
+                'Reruns': count,
+                'Median (ms)': f"{median * 1000:.1f}",
+                '95th Percentile (ms)': f"{p95 * 1000:.1f}",
+                'Avg Firebase Bytes': f"{mean_bytes:,.0f}" if bytes_counted else "-",
+            }
+            for name, (count, median, p95, mean_bytes) in metrics.summary().items()
+        ]).set_index('Stage'))
+        
+        totals = metrics.bytes_total
+        if bytes_counted:
+            st.caption(
+                f"Downloaded from Firebase since startup: {totals['queries']:,} bytes by queries, "
+                f"{totals['live_feed']:,} bytes by live feeds"
+            )
+        else:
+            st.caption(
+                "Firebase download volume unavailable: the installed firebase-admin doesn't "
+                f"expose its requests session. Live feeds downloaded {totals['live_feed']:,} bytes since startup."
+            )
+        
+        if PROFILE_STARTUP:
+            st.markdown("**Startup of this process**")
+            st.table(pd.DataFrame([
+                {
+                    'Step': name,
+                    'Thread': thread,
+                    'Start (ms)': f"{start * 1000:.0f}",
+                    'Time (ms)': f"{seconds * 1000:.1f}",
+                }
+                for name, thread, start, seconds in startup_timings()
+            ]).set_index('Step'))
+        
+        st.download_button(
+            "Download Prometheus Metrics",
+            data=metrics.to_prometheus() + get_shared_cache().to_prometheus(),
+            file_name="dashboard_metrics.prom",
+            mime="text/plain",
+        )
+
+def format_health_value(value, unit="", scale=1, decimals=0):
+    """Format a value of a health record for the device health table; "-" if missing."""
+    if value is None or pd.isna(value):
+        return "-"
+    return f"{value / scale:,.{decimals}f}{unit}"
+
+def render_device_health(health_df):
+    """Render the health records of the selected device: its latest record and charts over time."""
+    with st.expander("Device Health"):
+        if health_df.empty:
+            st.info(
+                "No health records for the selected time range. Devices upload them every "
+                "TELEMETRY_INTERVAL seconds (see config.py) with their readings."
+            )
+            return
+        
+        latest = health_df.iloc[-1]
+        st.markdown(f"**Latest record** ({latest['datetime'].strftime('%Y-%m-%d %H:%M:%S')})")
+        st.table(pd.DataFrame([
+            ('Uptime', format_health_value(latest['uptime'], " h", 3600, 1)),
+            ('Free heap', format_health_value(latest['mem_free'], " KB", 1024, 1)),
+            ('Lowest free heap', format_health_value(latest['mem_min_free'], " KB", 1024, 1)),
+            ('Cached readings', format_health_value(latest['cache'])),
+            ('WiFi signal', format_health_value(latest['rssi'], " dBm")),
+            ('Upload latency (median / 90th percentile)',
+             f"{format_health_value(latest['upload_p50_ms'], ' ms')} / {format_health_value(latest['upload_p90_ms'], ' ms')}"),
+            ('Failed uploads', f"{format_health_value(latest['upload_failures'])} of {format_health_value(latest['uploads'])}"),
+            ('Reading the sensors (mean / max)',
+             f"{format_health_value(latest['read_sensors_us'], ' ms', 1000, 1)} / {format_health_value(latest['read_sensors_max_us'], ' ms', 1000, 1)}"),
+            ('Event loop lag (mean / max)',
+             f"{format_health_value(latest['loop_lag_us'], ' ms', 1000, 1)} / {format_health_value(latest['loop_lag_max_us'], ' ms', 1000, 1)}"),
+        ], columns=['Metric', 'Value']).set_index('Metric'))
+        st.caption(
+            f"Counts and timings cover the {format_health_value(latest['period'] / 60, ' minutes')} "
+            "before each record; upload latencies the device's most recent uploads."
+        )
+        
+        for fig in build_health_figures(health_df, CHART_WIDTH_PX).values():
+            st.plotly_chart(fig, use_container_width=True)
+
+# The fleet table is redrawn at most this often while devices are loading (seconds)
+FLEET_REDRAW_INTERVAL = 0.25
+
+def render_fleet_overview(source, devices):
+    """Render the latest readings and alerts of all devices, filling in rows as they load."""
+    st.subheader("Fleet Overview")
+    
+    if not devices:
+        st.info("No devices found")
+        return
+    
+    # Same bucket-aligned window as "Last Hour", so the device caches are shared
+    _, end_timestamp = get_time_range_timestamps("Last Hour")
+    
+    column_config = {
+        'Last Seen': st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm:ss"),
+        'Readings (1h)': st.column_config.NumberColumn(format="%d"),
+    }
+    column_config.update({
+        param_label(param): st.column_config.NumberColumn(format="%.1f") for param in PARAMETERS
+    })
+    
+    status = st.empty()
+    table = st.empty()
+    
+    def draw(results, finished=False):
+        table.dataframe(
+            build_fleet_table(devices, results, finished),
+            column_config=column_config,
+            hide_index=True,
+            use_container_width=True,
+        )
+    
+    results = {}
+    started = time.monotonic()
+    last_draw = started
+    draw(results)
+    for device_id, result in iter_fleet_summaries(source, is_demo_mode(source), devices, end_timestamp):
+        results[device_id] = result
+        if time.monotonic() - last_draw >= FLEET_REDRAW_INTERVAL:
+            status.caption(f"Loaded {len(results)} of {len(devices)} devices...")
+            draw(results)
+            last_draw = time.monotonic()
+    draw(results, finished=True)
+    
+    missing = len(devices) - len(results)
+    if missing:
+        status.warning(f"{missing} of {len(devices)} devices did not respond within {FLEET_DEADLINE} seconds")
+    else:
+        status.caption(f"Loaded {len(devices)} devices in {time.monotonic() - started:.1f}s")
 
 #===============================================================================
 # MAIN APPLICATION
@@ -773,44 +1662,96 @@ def render_data_export(df):
 
 def main():
     """Main application function."""
-    # Initialize session state for auto-refresh
-    if 'last_refresh' not in st.session_state:
-        st.session_state.last_refresh = time.time()
+    # Timings, rows and Firebase downloads of each stage of this rerun
+    profile = RerunProfile()
     
     if 'connection_status' not in st.session_state:
         st.session_state.connection_status = "unknown"
     
-    # Initialize Firebase
-    ref, firebase_url, connection_status = initialize_firebase()
+    # Connect to Firebase in the background while the header and sidebar render
+    connection = start_data_source()
+    
+    # Render header and sidebar and get user selections
+    with startup_step('render header and sidebar'):
+        render_header()
+        status_slot, device_slot, view, time_range, refresh, live_updates = render_sidebar()
+    
+    # Wait for the connection
+    with profile.stage('connect'):
+        try:
+            source, connection_status, error = connection.result()
+        except Exception as e:
+            source, connection_status, error = SyntheticSource(), "error", e
     st.session_state.connection_status = connection_status
+    if error is not None:
+        st.error(f"Failed to connect to the data source: {error}")
+        # Connect again on the next rerun instead of showing sample data until a restart
+        start_data_source.clear()
+    render_connection_status(status_slot, source)
     
-    # Render header
-    render_header()
+    with profile.stage('devices') as stage:
+        devices = get_devices(source)
+        stage.rows = len(devices)
+    selected_device = render_device_selector(device_slot, devices) if device_slot else None
     
-    # Render sidebar and get user selections
-    selected_device, time_range, refresh, auto_refresh = render_sidebar(ref)
+    # A manual refresh reloads the whole window instead of only new readings
+    if refresh and selected_device:
+        reset_device_cache(selected_device)
     
-    # Check if we should auto-refresh
-    current_time = time.time()
-    if auto_refresh and (current_time - st.session_state.last_refresh) > 30:
-        refresh = True
-        st.session_state.last_refresh = current_time
+    # Subscribe to new readings of the selected device
+    feed = None
+    if live_updates and selected_device:
+        feed = start_live_feed(source, selected_device)
     
-    # Get data for selected device and time range
-    if selected_device:
+    if view == "Fleet Overview":
+        with profile.stage('fleet') as stage:
+            render_fleet_overview(source, devices)
+            stage.rows = len(devices)
+    elif selected_device:
+        # Get data for selected device and time range
         # Get time range timestamps
         start_timestamp, end_timestamp = get_time_range_timestamps(time_range)
         
         # Get device data
-        df = get_device_data(ref, selected_device, start_timestamp, end_timestamp)
+        with profile.stage('device_data') as stage:
+            df = get_device_data(source, selected_device, start_timestamp, end_timestamp)
+            stage.rows = len(df)
+        
+        # Rollup views hold bucket averages, so current readings come from the last hour of raw data
+        if is_rollup_frame(df):
+            with profile.stage('latest_readings') as stage:
+                latest_df = get_device_data(source, selected_device, end_timestamp - 3600, end_timestamp)
+                stage.rows = len(latest_df)
+        else:
+            latest_df = df
         
         # Render dashboard components
-        render_current_readings(df, selected_device)
-        render_time_series_charts(df, time_range)
-        render_statistics(df)
-        render_data_export(df)
+        render_current_readings(latest_df, selected_device)
+        with profile.stage('charts') as stage:
+            stage.sent_bytes = render_time_series_charts(held_readings_frame(df, end_timestamp), time_range)
+            stage.rows = len(df)
+        with profile.stage('statistics') as stage:
+            stats = get_statistics(source, df, selected_device, start_timestamp, end_timestamp)
+            stage.rows = len(df)
+        render_statistics(df, stats)
+        with profile.stage('device_health') as stage:
+            health_df = get_device_health(source, selected_device, start_timestamp, end_timestamp)
+            render_device_health(health_df)
+            stage.rows = len(health_df)
+        render_data_export(source, df, selected_device, start_timestamp, end_timestamp)
+        render_bulk_export(source, devices)
+        render_cache_statistics()
     else:
         st.warning("Please select a device to view data")
+    
+    record_rerun(profile)
+    if finish_startup() and PROFILE_STARTUP:
+        print(f"Dashboard startup:\n{startup_report()}")
+    render_performance_panel(profile, source)
+    
+    # Rerun as soon as new readings arrive; the fleet view is polled since live feeds are per device
+    if live_updates and (view == "Fleet Overview" or selected_device):
+        wait_for_new_readings(feed)
 
 # Run the application
 if __name__ == "__main__":
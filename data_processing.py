@@ -0,0 +1,787 @@
+"""
+ESP32 Environmental Monitoring Dashboard - Data Processing
+
+This module contains the data processing functions used by the dashboard. They work on
+plain Python objects, NumPy arrays and pandas DataFrames and have no dependency on
+Streamlit or Firebase, so they can also be used from scripts and benchmarks.
+
+Features:
+- Columnar decoding of Firebase reading payloads into DataFrames, including the
+  per-interval minimum, maximum and sample count of oversampling devices
+- Reconstruction of the readings held by report-by-exception devices
+- Decoding of the health records devices upload about themselves
+- Largest-Triangle-Three-Buckets downsampling for charts
+- Multi-resolution min/max/mean/count rollups for long time ranges
+- Seeded, vectorized sample data generator for demos and benchmarks
+- Chunked export to CSV, gzip-compressed CSV, Parquet and Feather
+- Single-pass, incremental statistics with a time-based trend
+- Out-of-range checks of the latest readings
+"""
+
+import gzip
+import importlib.util
+import io
+import math
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+from startup import lazy_import
+
+# pandas takes longer to import than the rest of the dashboard's modules together, so it
+# is imported on first use (see startup.py)
+pd = lazy_import('pandas')
+
+# Environmental parameters reported by the ESP32 devices
+PARAMETERS = ['temperature', 'humidity', 'light_level', 'soil_moisture']
+
+# Columns of the DataFrame returned by decode_readings
+READING_COLUMNS = ['timestamp', 'datetime'] + PARAMETERS
+
+# Devices that oversample their sensors report each parameter as the mean of the samples
+# of a reading interval, plus these statistics of the samples (e.g. temperature_min)
+AGGREGATE_STATS = ('min', 'max', 'count')
+AGGREGATE_COLUMNS = [f'{param}_{stat}' for param in PARAMETERS for stat in AGGREGATE_STATS]
+
+# Devices that report by exception only upload a reading when a value changed noticeably,
+# and at least once per heartbeat. Their readings carry the device's reading interval and
+# heartbeat in seconds (see expand_held_readings).
+HOLD_COLUMNS = ['interval', 'heartbeat']
+
+# Stages of the firmware that health records time (see telemetry.py), each as its mean
+# and maximum duration in microseconds
+HEALTH_STAGES = ['read_sensors', 'sample_dht', 'display', 'upload', 'loop_lag']
+
+# Columns of the DataFrame returned by decode_health
+HEALTH_COLUMNS = [
+    'timestamp', 'datetime', 'uptime', 'period', 'mem_free', 'mem_min_free', 'cache', 'rssi',
+    'uploads', 'upload_failures', 'upload_p50_ms', 'upload_p90_ms', 'upload_max_ms',
+] + [f'{stage}_{stat}' for stage in HEALTH_STAGES for stat in ('us', 'max_us')]
+
+# Rollup tiers: (name, bucket size in seconds, retention in seconds or None to keep all)
+ROLLUP_TIERS = [
+    ('1min', 60, 14 * 86400),
+    ('1hour', 3600, 400 * 86400),
+    ('1day', 86400, None),
+]
+
+# A rollup tier is only used if the time range spans at least this many of its buckets
+ROLLUP_MIN_POINTS = 150
+
+# Seconds between generated sample readings
+SAMPLE_INTERVAL = 300
+
+# Sample plants are watered at 9:00 on Tuesday and Friday and dry out at SOIL_DRYING_RATE %/hour
+WATERING_WEEKDAYS = (1, 4)
+WATERING_HOUR = 9
+SOIL_DRYING_RATE = 0.6
+
+# Trend indicator: tanh(TREND_SCALE * slope), with the slope in units per hour. This
+# matches the sensitivity of the old per-reading trend at one reading per minute.
+TREND_SCALE = 10 / 60
+
+# Readings outside these (low, high) limits are flagged; None means no limit. They are
+# wider than the optimal ranges so only readings that need attention are flagged.
+ALERT_RANGES = {
+    'temperature': (10, 35),
+    'humidity': (20, 80),
+    'soil_moisture': (30, None),
+}
+
+# Export formats: name -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Feather': ('feather', 'application/vnd.apache.arrow.file'),
+}
+
+# Sample noise is drawn in blocks of this many readings, seeded by block number, so a
+# reading's value depends only on its timestamp and not on the window it was generated in
+NOISE_BLOCK_SIZE = 4096
+
+#===============================================================================
+# PAYLOAD DECODING
+#===============================================================================
+
+def empty_readings_frame():
+    """Return an empty readings DataFrame with the standard columns."""
+    return pd.DataFrame(columns=READING_COLUMNS)
+
+def to_float_array(values):
+    """Convert a list of values to a float array, mapping None and invalid values to NaN."""
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        # Mixed types (e.g. strings written by hand): coerce value by value
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+
+def local_utc_offset(timestamp):
+    """Return the local UTC offset at a Unix timestamp as a timedelta."""
+    return datetime.fromtimestamp(timestamp) - datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+def utc_offset_changes(start_timestamp, end_timestamp):
+    """Return the local UTC offsets within a time range and the timestamps they start at.
+
+    The offset is looked up once a day and at the end of the range, and every change
+    (e.g. to or from daylight saving time) is located to the second by bisection.
+    Returns (starts, offsets); the first offset applies from start_timestamp.
+    """
+    starts = [start_timestamp]
+    offsets = [local_utc_offset(start_timestamp)]
+    previous = start_timestamp
+    for probe in list(np.arange(start_timestamp + 86400, end_timestamp, 86400)) + [end_timestamp]:
+        offset = local_utc_offset(probe)
+        if offset != offsets[-1]:
+            # The offset changes after low and at or before high
+            low, high = math.floor(previous), math.ceil(probe)
+            while high - low > 1:
+                middle = (low + high) // 2
+                if local_utc_offset(middle) == offsets[-1]:
+                    low = middle
+                else:
+                    high = middle
+            starts.append(high)
+            offsets.append(offset)
+        previous = probe
+    return np.array(starts, dtype=float), offsets
+
+def to_local_datetime(timestamps):
+    """Convert Unix timestamps to naive local datetimes, like datetime.fromtimestamp."""
+    # Integer microseconds convert to datetime64 without a per-value Python call
+    utc = np.round(timestamps * 1e6).astype('int64').astype('datetime64[us]').astype('datetime64[ns]')
+    if len(timestamps) == 0:
+        return utc
+
+    # Apply the local UTC offset of each stretch between DST changes in one step
+    starts, offsets = utc_offset_changes(float(timestamps.min()), float(timestamps.max()))
+    if len(offsets) == 1:
+        return utc + np.timedelta64(offsets[0])
+    deltas = np.array([np.timedelta64(offset) for offset in offsets]).astype('timedelta64[ns]')
+    return utc + deltas[np.searchsorted(starts, timestamps, side='right') - 1]
+
+def decode_readings(all_readings, start_timestamp, end_timestamp):
+    """Convert raw Firebase readings into a DataFrame sorted by timestamp.
+
+    Timestamps and the four sensor fields are pulled straight into NumPy arrays, and unit
+    normalization and range filtering are done with vectorized masks instead of a
+    per-reading loop. Entries without a timestamp or readings are skipped. The
+    AGGREGATE_COLUMNS of a parameter, and the HOLD_COLUMNS, are included if any reading
+    in the range has them.
+    """
+    # Keep only well-formed entries
+    records = [
+        reading for reading in all_readings.values()
+        if type(reading) is dict and 'timestamp' in reading and type(reading.get('readings')) is dict
+    ]
+    if not records:
+        return empty_readings_frame()
+
+    # Older firmware wrote millisecond timestamps
+    timestamps = to_float_array([reading['timestamp'] for reading in records])
+    timestamps = np.where(timestamps > end_timestamp * 10, timestamps / 1000, timestamps)
+
+    # Keep readings within the time range, sorted by timestamp
+    selected = np.flatnonzero((timestamps >= start_timestamp) & (timestamps <= end_timestamp))
+    if len(selected) == 0:
+        return empty_readings_frame()
+    selected = selected[np.argsort(timestamps[selected], kind='stable')]
+    timestamps = timestamps[selected]
+    records = [records[i] for i in selected]
+    readings = [record['readings'] for record in records]
+
+    data = {
+        'timestamp': timestamps,
+        'datetime': to_local_datetime(timestamps),
+    }
+    columns = list(READING_COLUMNS)
+    for param in PARAMETERS:
+        data[param] = to_float_array([reading.get(param) for reading in readings])
+
+    # Only readings with more fields than the parameters can have aggregates
+    extended = [reading for reading in readings if len(reading) > len(PARAMETERS)]
+    for param in PARAMETERS:
+        count_key = f'{param}_count'
+        if extended and any(count_key in reading for reading in extended):
+            for stat in AGGREGATE_STATS:
+                key = f'{param}_{stat}'
+                data[key] = to_float_array([reading.get(key) for reading in readings])
+                columns.append(key)
+
+    if any('heartbeat' in record for record in records):
+        for key in HOLD_COLUMNS:
+            data[key] = to_float_array([record.get(key) for record in records])
+            columns.append(key)
+
+    return pd.DataFrame(data, columns=columns)
+
+def expand_held_readings(df, until=None):
+    """Reconstruct the readings that report-by-exception devices left out.
+
+    Each reading of such a device holds until its next reading, for at most its
+    heartbeat. The held values are repeated at the device's reading interval, so charts,
+    statistics and rollups weight them by the time they held, as for regularly reported
+    readings. The last reading holds until the until timestamp (not at all if None).
+    Readings without a heartbeat are left as they are.
+    """
+    if df.empty or 'heartbeat' not in df.columns:
+        return df
+
+    timestamps = df['timestamp'].to_numpy(dtype=float)
+    intervals = df['interval'].to_numpy(dtype=float)
+    heartbeats = df['heartbeat'].to_numpy(dtype=float)
+    next_timestamps = np.append(timestamps[1:], until if until is not None else timestamps[-1])
+    hold_ends = np.minimum(next_timestamps, timestamps + heartbeats)
+
+    # Number of held copies of each reading, at multiples of the interval before the hold ends
+    with np.errstate(invalid='ignore', divide='ignore'):
+        copies = np.ceil((hold_ends - timestamps) / intervals) - 1
+    copies = np.where(intervals > 0, np.nan_to_num(copies), 0).clip(min=0).astype(np.int64)
+    if not copies.any():
+        return df
+
+    repeats = copies + 1
+    rows = np.repeat(np.arange(len(df)), repeats)
+    # 0 for the reading itself, k for its k-th held copy
+    steps = np.arange(len(rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    expanded_timestamps = timestamps[rows] + steps * np.nan_to_num(intervals[rows])
+
+    expanded = df.iloc[rows].reset_index(drop=True)
+    expanded['timestamp'] = expanded_timestamps
+    expanded['datetime'] = to_local_datetime(expanded_timestamps)
+    return expanded
+
+def decode_health(all_records, start_timestamp, end_timestamp):
+    """Convert the health records of a device into a DataFrame sorted by timestamp.
+
+    Every record gets the HEALTH_COLUMNS; fields a record lacks (e.g. stages that didn't
+    run during its period) are NaN.
+    """
+    records = [
+        record for record in all_records.values()
+        if type(record) is dict and 'timestamp' in record
+    ]
+    timestamps = to_float_array([record['timestamp'] for record in records])
+    selected = np.flatnonzero((timestamps >= start_timestamp) & (timestamps <= end_timestamp))
+    selected = selected[np.argsort(timestamps[selected], kind='stable')]
+    timestamps = timestamps[selected]
+    records = [records[i] for i in selected]
+
+    data = {
+        'timestamp': timestamps,
+        'datetime': to_local_datetime(timestamps),
+    }
+    for column in HEALTH_COLUMNS[2:]:
+        data[column] = to_float_array([record.get(column) for record in records])
+    return pd.DataFrame(data, columns=HEALTH_COLUMNS)
+
+def has_band(df, param):
+    """Return True if df has the minimum and maximum of param around each value."""
+    return f'{param}_min' in df.columns and f'{param}_max' in df.columns
+
+def value_extremes(df):
+    """Return (lows, highs) arrays with one column per parameter.
+
+    Rollup buckets and the readings of oversampling devices contribute their minimum
+    and maximum; other readings contribute their value.
+    """
+    values = df[PARAMETERS].to_numpy(dtype=float)
+    if not any(has_band(df, param) for param in PARAMETERS):
+        return values, values
+
+    lows = values.copy()
+    highs = values.copy()
+    for i, param in enumerate(PARAMETERS):
+        if has_band(df, param):
+            lows[:, i] = np.fmin(lows[:, i], df[f'{param}_min'].to_numpy(dtype=float))
+            highs[:, i] = np.fmax(highs[:, i], df[f'{param}_max'].to_numpy(dtype=float))
+    return lows, highs
+
+#===============================================================================
+# DOWNSAMPLING
+#===============================================================================
+
+def lttb_indices(x, y, max_points):
+    """Select up to max_points indices of a series with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The points in between are split into
+    equal buckets, and from each bucket the point forming the largest triangle with the
+    previously selected point and the average of the next bucket is kept, which
+    preserves peaks and troughs.
+    """
+    num_points = len(x)
+    if max_points >= num_points or max_points < 3:
+        return np.arange(num_points)
+
+    # Bucket boundaries for the points between the first and the last one
+    edges = np.linspace(1, num_points - 1, max_points - 1).astype(np.int64)
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = num_points - 1
+
+    selected = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else num_points
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        # Twice the triangle area for every candidate in the current bucket
+        areas = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(np.argmax(areas))
+        indices[i + 1] = selected
+
+    return indices
+
+def downsample_frame(df, column, max_points):
+    """Return the timestamp, datetime and column values of df reduced to max_points rows.
+
+    The column's minimum and maximum come along if df has them. Missing values of the
+    column are dropped before downsampling.
+    """
+    band = [f'{column}_min', f'{column}_max'] if has_band(df, column) else []
+    series = df[['timestamp', 'datetime', column] + band].dropna(subset=[column])
+    indices = lttb_indices(
+        series['timestamp'].to_numpy(dtype=float),
+        series[column].to_numpy(dtype=float),
+        max_points,
+    )
+    return series.iloc[indices]
+
+#===============================================================================
+# ROLLUPS
+#===============================================================================
+
+def aggregate_buckets(df, bucket_seconds):
+    """Aggregate readings into fixed-size time buckets.
+
+    Returns a DataFrame indexed by bucket start time with sum, sum of squares, count,
+    min and max columns for each parameter (e.g. temperature_sum, temperature_count).
+    """
+    buckets = (df['timestamp'].to_numpy() // bucket_seconds * bucket_seconds).astype(np.int64)
+    grouped = df[PARAMETERS].groupby(buckets)
+    lows, highs = value_extremes(df)
+    stats = {
+        'sum': grouped.sum(),
+        'sumsq': (df[PARAMETERS] ** 2).groupby(buckets).sum(),
+        'count': grouped.count(),
+        'min': pd.DataFrame(lows, columns=PARAMETERS).groupby(buckets).min(),
+        'max': pd.DataFrame(highs, columns=PARAMETERS).groupby(buckets).max(),
+    }
+    return pd.concat(
+        [frame.add_suffix(f'_{stat}') for stat, frame in stats.items()],
+        axis=1,
+    )
+
+def merge_buckets(existing, delta):
+    """Merge newly aggregated buckets into existing ones, combining shared buckets."""
+    if existing is None or existing.empty:
+        return delta
+    if delta.empty:
+        return existing
+
+    overlap = delta.index.intersection(existing.index)
+    if len(overlap) > 0:
+        old = existing.loc[overlap]
+        new = delta.loc[overlap]
+        for param in PARAMETERS:
+            existing.loc[overlap, f'{param}_sum'] = old[f'{param}_sum'] + new[f'{param}_sum']
+            existing.loc[overlap, f'{param}_sumsq'] = old[f'{param}_sumsq'] + new[f'{param}_sumsq']
+            existing.loc[overlap, f'{param}_count'] = old[f'{param}_count'] + new[f'{param}_count']
+            existing.loc[overlap, f'{param}_min'] = np.fmin(old[f'{param}_min'], new[f'{param}_min'])
+            existing.loc[overlap, f'{param}_max'] = np.fmax(old[f'{param}_max'], new[f'{param}_max'])
+        delta = delta.drop(overlap)
+
+    if delta.empty:
+        return existing
+    merged = pd.concat([existing, delta])
+    if delta.index.min() < existing.index.max():
+        merged = merged.sort_index()
+    return merged
+
+def select_rollup_tier(start_timestamp, end_timestamp, tiers=ROLLUP_TIERS, min_points=ROLLUP_MIN_POINTS):
+    """Return the coarsest rollup tier that still gives enough points, or None for raw data."""
+    duration = end_timestamp - start_timestamp
+    for name, bucket_seconds, retention in reversed(tiers):
+        if retention is not None and duration > retention:
+            continue
+        if duration / bucket_seconds >= min_points:
+            return name
+    return None
+
+def is_rollup_frame(df):
+    """Return True if df holds rollup buckets rather than raw readings."""
+    return f'{PARAMETERS[0]}_std' in df.columns
+
+class RollupPyramid:
+    """Min/max/mean/count rollups of one device's readings at several resolutions.
+
+    Readings are added with ingest() as they arrive and are folded into every tier.
+    Each tier drops buckets older than its retention period.
+    """
+
+    def __init__(self, tiers=ROLLUP_TIERS):
+        self.tiers = tiers
+        self.rollups = {name: None for name, _, _ in tiers}
+        self.newest = None  # newest reading timestamp ingested
+
+    def ingest(self, df):
+        """Fold new readings into all rollup tiers.
+
+        Every reading must be ingested exactly once, otherwise it is counted twice.
+        """
+        if df.empty:
+            return
+
+        self.newest = max(self.newest or 0, df['timestamp'].max())
+        for name, bucket_seconds, retention in self.tiers:
+            rollup = merge_buckets(self.rollups[name], aggregate_buckets(df, bucket_seconds))
+            if retention is not None:
+                rollup = rollup[rollup.index >= self.newest - retention]
+            self.rollups[name] = rollup
+
+    def frame(self, tier, start_timestamp, end_timestamp):
+        """Return the buckets of a tier within a time range as a chartable DataFrame.
+
+        Each parameter column holds the bucket mean, alongside its _min, _max, _std and
+        _count columns. The timestamp is the start of the bucket.
+        """
+        bucket_seconds = dict((name, size) for name, size, _ in self.tiers)[tier]
+        rollup = self.rollups[tier]
+        if rollup is None or rollup.empty:
+            return empty_readings_frame()
+
+        first_bucket = start_timestamp // bucket_seconds * bucket_seconds
+        rollup = rollup[(rollup.index >= first_bucket) & (rollup.index <= end_timestamp)]
+        if rollup.empty:
+            return empty_readings_frame()
+
+        timestamps = rollup.index.to_numpy(dtype=float)
+        data = {
+            'timestamp': timestamps,
+            'datetime': to_local_datetime(timestamps),
+        }
+        stds = {}
+        for param in PARAMETERS:
+            counts = rollup[f'{param}_count'].to_numpy(dtype=float)
+            sums = rollup[f'{param}_sum'].to_numpy(dtype=float)
+            sums_sq = rollup[f'{param}_sumsq'].to_numpy(dtype=float)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                data[param] = np.where(counts > 0, sums / counts, np.nan)
+                variance = (sums_sq - counts * data[param] ** 2) / (counts - 1)
+            stds[param] = np.where(counts > 1, np.sqrt(np.maximum(variance, 0)), np.nan)
+        for param in PARAMETERS:
+            data[f'{param}_min'] = rollup[f'{param}_min'].to_numpy(dtype=float)
+            data[f'{param}_max'] = rollup[f'{param}_max'].to_numpy(dtype=float)
+            data[f'{param}_std'] = stds[param]
+            data[f'{param}_count'] = rollup[f'{param}_count'].to_numpy(dtype=np.int64)
+
+        return pd.DataFrame(data)
+
+#===============================================================================
+# STATISTICS
+#===============================================================================
+
+class StatisticsAccumulator:
+    """Running sums for the statistics of every parameter.
+
+    Keeps count, sum, sum of squares, min and max, plus the sums needed for the
+    closed-form least-squares slope against time, as arrays with one entry per
+    parameter. update() folds in new rows without rescanning earlier ones. Times are
+    measured in hours from the first timestamp seen to keep the sums well conditioned.
+    """
+
+    def __init__(self):
+        size = len(PARAMETERS)
+        self.origin = None
+        self.count = np.zeros(size)
+        self.sum = np.zeros(size)
+        self.sum_sq = np.zeros(size)
+        self.sum_t = np.zeros(size)
+        self.sum_tt = np.zeros(size)
+        self.sum_ty = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    def update(self, df):
+        """Fold the rows of a readings or rollup DataFrame into the sums."""
+        if df.empty:
+            return
+
+        timestamps = df['timestamp'].to_numpy(dtype=float)
+        if self.origin is None:
+            self.origin = timestamps[0]
+        hours = ((timestamps - self.origin) / 3600)[:, np.newaxis]
+
+        if is_rollup_frame(df):
+            # Each bucket contributes its count, sum and sum of squares at its start time
+            counts = df[[f'{p}_count' for p in PARAMETERS]].to_numpy(dtype=float)
+            means = np.nan_to_num(df[PARAMETERS].to_numpy(dtype=float))
+            stds = np.nan_to_num(df[[f'{p}_std' for p in PARAMETERS]].to_numpy(dtype=float))
+            sums = means * counts
+            sums_sq = stds ** 2 * np.maximum(counts - 1, 0) + means ** 2 * counts
+            mins = df[[f'{p}_min' for p in PARAMETERS]].to_numpy(dtype=float)
+            maxs = df[[f'{p}_max' for p in PARAMETERS]].to_numpy(dtype=float)
+        else:
+            values = df[PARAMETERS].to_numpy(dtype=float)
+            present = ~np.isnan(values)
+            counts = present.astype(float)
+            sums = np.where(present, values, 0)
+            sums_sq = sums ** 2
+            mins, maxs = value_extremes(df)
+
+        self.count += counts.sum(axis=0)
+        self.sum += sums.sum(axis=0)
+        self.sum_sq += sums_sq.sum(axis=0)
+        self.sum_t += (counts * hours).sum(axis=0)
+        self.sum_tt += (counts * hours ** 2).sum(axis=0)
+        self.sum_ty += (sums * hours).sum(axis=0)
+        self.min = np.fmin(self.min, np.where(np.isnan(mins), np.inf, mins).min(axis=0))
+        self.max = np.fmax(self.max, np.where(np.isnan(maxs), -np.inf, maxs).max(axis=0))
+
+    def result(self):
+        """Return min, max, avg, std, count, slope (units per hour) and trend per parameter."""
+        count = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.sum / count
+            std = np.sqrt(np.maximum((self.sum_sq - count * mean ** 2) / (count - 1), 0))
+            denominator = count * self.sum_tt - self.sum_t ** 2
+            slope = (count * self.sum_ty - self.sum_t * self.sum) / denominator
+
+        stats = {}
+        for i, param in enumerate(PARAMETERS):
+            if count[i] == 0:
+                stats[param] = {'min': None, 'max': None, 'avg': None, 'std': None,
+                                'count': 0, 'slope': 0.0, 'trend': 0}
+                continue
+            has_slope = count[i] >= 2 and denominator[i] > 1e-12
+            param_slope = float(slope[i]) if has_slope else 0.0
+            stats[param] = {
+                'min': float(self.min[i]),
+                'max': float(self.max[i]),
+                'avg': float(mean[i]),
+                'std': float(std[i]) if count[i] >= 2 else None,
+                'count': int(count[i]),
+                'slope': param_slope,
+                'trend': float(np.tanh(param_slope * TREND_SCALE)),
+            }
+        return stats
+
+def calculate_statistics(df, percentiles=None):
+    """Calculate statistics for each environmental parameter in one vectorized pass.
+
+    Works on raw readings and on rollup buckets. The trend is the least-squares slope
+    against the actual timestamps, so uneven sampling doesn't distort it. With
+    percentiles (e.g. [25, 50, 75]) each parameter of a raw readings frame also gets a
+    'percentiles' dict.
+    """
+    accumulator = StatisticsAccumulator()
+    accumulator.update(df)
+    stats = accumulator.result()
+
+    if percentiles and not df.empty and not is_rollup_frame(df):
+        values = df[PARAMETERS].to_numpy(dtype=float)
+        for i, param in enumerate(PARAMETERS):
+            if stats[param]['count'] > 0:
+                column = values[:, i]
+                points = np.percentile(column[~np.isnan(column)], percentiles)
+                stats[param]['percentiles'] = dict(zip(percentiles, points.tolist()))
+    return stats
+
+def out_of_range_parameters(reading, ranges=ALERT_RANGES):
+    """Return {parameter: 'low' or 'high'} for the values of a reading outside their alert range."""
+    flags = {}
+    for param, (low, high) in ranges.items():
+        value = reading.get(param)
+        if value is None or np.isnan(value):
+            continue
+        if low is not None and value < low:
+            flags[param] = 'low'
+        elif high is not None and value > high:
+            flags[param] = 'high'
+    return flags
+
+#===============================================================================
+# SAMPLE DATA
+#===============================================================================
+
+def sample_timestamps(start_timestamp, end_timestamp, interval=SAMPLE_INTERVAL):
+    """Return the sample reading times within a window, on a fixed grid of the interval."""
+    first = np.ceil(start_timestamp / interval)
+    last = np.floor(end_timestamp / interval)
+    return np.arange(first, last + 1) * float(interval)
+
+def sample_noise(timestamps, interval, seed, device_key):
+    """Return standard normal noise for each parameter, one row per parameter.
+
+    The noise of a reading is determined by the seed, the device and the reading's
+    position on the sampling grid.
+    """
+    positions = np.round(timestamps / interval).astype(np.int64)
+    blocks = positions // NOISE_BLOCK_SIZE
+    noise = np.empty((len(PARAMETERS), len(timestamps)))
+    for block in np.unique(blocks):
+        in_block = blocks == block
+        rng = np.random.default_rng([seed, device_key, int(interval), int(block) & 0xFFFFFFFF])
+        noise[:, in_block] = rng.standard_normal((len(PARAMETERS), NOISE_BLOCK_SIZE))[
+            :, positions[in_block] % NOISE_BLOCK_SIZE
+        ]
+    return noise
+
+def sample_readings(device_id, timestamps, interval=SAMPLE_INTERVAL, seed=0):
+    """Generate realistic sample values for each parameter at the given timestamps."""
+    device_key = zlib.crc32(device_id.encode())
+    noise = sample_noise(timestamps, interval, seed, device_key)
+
+    # Small per-device offsets so several sample devices don't look identical
+    temp_offset, humidity_offset = np.random.default_rng([seed, device_key]).normal(0, 1.5, 2)
+
+    # Local time of day and day of week
+    local = timestamps + local_utc_offset(timestamps[0]).total_seconds() if len(timestamps) else timestamps
+    hours = (local % 86400) / 3600
+    day_start = local - local % 86400
+    weekdays = (local // 86400 + 3) % 7  # 1970-01-01 was a Thursday
+
+    # Temperature: daily cycle + random noise
+    temperature = 22 + temp_offset + 5 * np.sin(hours * np.pi / 12) + noise[0]
+
+    # Humidity: inverse to temperature + random noise
+    humidity = 60 + humidity_offset - 15 * np.sin(hours * np.pi / 12) + 5 * noise[1]
+    humidity = np.clip(humidity, 0, 100)
+
+    # Light level: daytime pattern peaking at noon
+    daytime = (hours >= 6) & (hours < 18)
+    light_level = np.where(daytime, 90 * np.sin(np.pi * (hours - 6) / 12), 0) + 5 * noise[2]
+    light_level = np.clip(light_level, 0, 100)
+
+    # Soil moisture: back to 80% at each watering, then drying out
+    last_watering = np.full(len(timestamps), -np.inf)
+    for weekday in WATERING_WEEKDAYS:
+        watering = day_start - ((weekdays - weekday) % 7) * 86400 + WATERING_HOUR * 3600
+        watering = np.where(watering > local, watering - 7 * 86400, watering)
+        last_watering = np.maximum(last_watering, watering)
+    soil_moisture = 80 - SOIL_DRYING_RATE * (local - last_watering) / 3600 + 3 * noise[3]
+    soil_moisture = np.clip(soil_moisture, 0, 100)
+
+    return {
+        'temperature': temperature,
+        'humidity': humidity,
+        'light_level': light_level,
+        'soil_moisture': soil_moisture,
+    }
+
+def generate_sample_data(device_id, start_timestamp, end_timestamp, interval=SAMPLE_INTERVAL, seed=None):
+    """Generate sample data for demo purposes.
+
+    Readings are placed every interval seconds. With a seed the same timestamp always
+    gets the same values, whatever window it is generated in.
+    """
+    if seed is None:
+        seed = int(np.random.default_rng().integers(2**32))
+
+    timestamps = sample_timestamps(start_timestamp, end_timestamp, interval)
+    data = {
+        'timestamp': timestamps,
+        'datetime': to_local_datetime(timestamps),
+    }
+    data.update(sample_readings(device_id, timestamps, interval, seed))
+    return pd.DataFrame(data, columns=READING_COLUMNS)
+
+def iter_sample_data(device_ids, start_timestamp, end_timestamp, interval=SAMPLE_INTERVAL,
+                     seed=None, chunk_size=100_000):
+    """Yield sample data for several devices in chunks of at most chunk_size readings.
+
+    Each chunk is a DataFrame with a device_id column followed by the standard reading
+    columns. Only one chunk is held in memory at a time, so millions of readings can be
+    streamed into a file or a benchmark.
+    """
+    if seed is None:
+        seed = int(np.random.default_rng().integers(2**32))
+
+    for device_id in device_ids:
+        first = np.ceil(start_timestamp / interval) * interval
+        while first <= end_timestamp:
+            last = min(end_timestamp, first + (chunk_size - 1) * interval)
+            chunk = generate_sample_data(device_id, first, last, interval, seed)
+            chunk.insert(0, 'device_id', device_id)
+            yield chunk
+            first = last + interval
+
+#===============================================================================
+# EXPORT
+#===============================================================================
+
+def available_export_formats():
+    """Return the export formats that can be written in this environment.
+
+    Parquet and Feather need pyarrow, which is installed together with Streamlit.
+    """
+    formats = ['CSV', 'CSV (gzip)']
+    if importlib.util.find_spec('pyarrow') is not None:
+        formats += ['Parquet', 'Feather']
+    return formats
+
+def write_export(chunks, export_format, fileobj):
+    """Write DataFrame chunks to a binary file object in one of the EXPORT_FORMATS.
+
+    Chunks are written as they arrive, so only one chunk has to be in memory at a time.
+    All chunks must have the same columns. Returns the number of rows written.
+    """
+    if export_format in ('CSV', 'CSV (gzip)'):
+        return _write_csv(chunks, fileobj, compress=export_format == 'CSV (gzip)')
+    if export_format in ('Parquet', 'Feather'):
+        return _write_arrow(chunks, fileobj, export_format)
+    raise ValueError(f"Unknown export format: {export_format}")
+
+def _write_csv(chunks, fileobj, compress):
+    """Write chunks as CSV with a single header row, optionally gzip-compressed."""
+    stream = gzip.GzipFile(fileobj=fileobj, mode='wb') if compress else fileobj
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+
+    rows = 0
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(text, index=False, header=header)
+        header = False
+        rows += len(chunk)
+    if header:
+        # Nothing was written: still produce a header row
+        empty_readings_frame().to_csv(text, index=False)
+
+    # Detach so closing the wrappers doesn't close the caller's file object
+    text.flush()
+    text.detach()
+    if compress:
+        stream.close()
+    return rows
+
+def _write_arrow(chunks, fileobj, export_format):
+    """Write chunks as Parquet row groups or Feather (Arrow IPC) record batches."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    schema = None
+    rows = 0
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            schema = table.schema
+            if export_format == 'Parquet':
+                writer = pq.ParquetWriter(fileobj, schema)
+            else:
+                writer = pa.ipc.new_file(fileobj, schema)
+        writer.write_table(table.cast(schema))
+        rows += len(chunk)
+
+    if writer is None:
+        # Nothing was written: still produce a valid file with the standard columns
+        return _write_arrow([empty_readings_frame().astype({'timestamp': float})], fileobj, export_format)
+    writer.close()
+    return rows
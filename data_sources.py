@@ -0,0 +1,323 @@
+"""
+ESP32 Environmental Monitoring Dashboard - Data Sources
+
+This module contains the sources the dashboard reads device readings from. Every source
+returns readings in the Firebase payload format ({push_id: {'timestamp': ...,
+'readings': {...}}}), so the dashboard decodes and caches them the same way whichever
+source is used. Health records that devices upload about themselves (see telemetry.py)
+are returned in the same format. It has no dependency on Streamlit.
+
+Features:
+- Firebase Realtime Database, or a local stand-in such as local_rtdb.py
+- SQLite database file
+- Synthetic sample data
+- Source selection from a single setting (see open_data_source)
+"""
+
+import json
+import sqlite3
+import threading
+from urllib.parse import parse_qs, urlparse
+
+from data_processing import (
+    PARAMETERS,
+    SAMPLE_INTERVAL,
+    generate_sample_data,
+    iter_sample_data,
+)
+
+# Database used when no data source is configured
+DEFAULT_DATABASE_URL = "https://microlab-data-default-rtdb.firebaseio.com/"
+
+# Devices of the synthetic source
+DEMO_DEVICES = ["esp32_env_monitor_01", "esp32_env_monitor_02", "classroom_monitor"]
+
+# Synthetic readings never go back further than this (seconds)
+DEMO_HISTORY = 365 * 86400
+
+# Fixed seed so synthetic readings stay the same across reruns and time ranges
+DEMO_SEED = 0
+
+def timestamp_windows(start_timestamp, end_timestamp):
+    """Return the (start, end) timestamp ranges a time window is stored in.
+
+    Older firmware wrote millisecond timestamps, so every window is also looked up in
+    milliseconds. Values above end_timestamp * 10 are read as milliseconds (see
+    decode_readings), so the millisecond range never overlaps the range of second
+    timestamps.
+    """
+    return [
+        (start_timestamp, end_timestamp),
+        (max(start_timestamp * 1000, end_timestamp * 10), end_timestamp * 1000),
+    ]
+
+class DataSource:
+    """Interface of a source of device readings."""
+
+    # Shown in the dashboard's connection status
+    name = "Data source"
+
+    # True if the source generates sample data instead of reading real devices
+    synthetic = False
+
+    def list_devices(self):
+        """Return the sorted IDs of all devices with readings."""
+        raise NotImplementedError
+
+    def query_readings(self, device_id, start_timestamp, end_timestamp):
+        """Return the readings of a device within a time window."""
+        raise NotImplementedError
+
+    def query_latest_reading(self, device_id, end_timestamp):
+        """Return the newest reading of a device at or before end_timestamp."""
+        raise NotImplementedError
+
+    def query_health(self, device_id, start_timestamp, end_timestamp):
+        """Return the health records of a device within a time window; none by default."""
+        return {}
+
+    def stream_request(self, device_id):
+        """Return (url, params) of the REST event stream of a device's readings, or None."""
+        return None
+
+class FirebaseSource(DataSource):
+    """Firebase Realtime Database, accessed through the Firebase Admin SDK.
+
+    An http:// URL with a namespace, like ``http://127.0.0.1:9000/?ns=microlab-data``,
+    connects to a local stand-in (local_rtdb.py or the Firebase emulator) without
+    credentials.
+    """
+
+    def __init__(self, database_url=DEFAULT_DATABASE_URL):
+        # The Firebase SDK is only imported when a Firebase source is opened
+        import firebase_admin
+        from firebase_admin import db
+
+        self.database_url = database_url
+        self.name = "Firebase" if urlparse(database_url).scheme == 'https' else f"Firebase ({database_url})"
+
+        # Initialize with anonymous access (no credentials needed)
+        if not firebase_admin._apps:
+            firebase_admin.initialize_app(None, {
+                'databaseURL': database_url
+            })
+            print("Firebase initialized")
+        else:
+            print("Using existing Firebase connection")
+
+        # Get a database reference
+        self.ref = db.reference('/')
+
+    @property
+    def session(self):
+        """The requests session of the SDK, e.g. for counting downloaded bytes; None if unavailable.
+
+        The SDK doesn't expose its session publicly; this relies on the private _client
+        attribute of database references (firebase-admin 6.x), which may change.
+        """
+        client = getattr(self.ref, '_client', None)
+        return getattr(client, 'session', None)
+
+    def list_devices(self):
+        """List the device IDs under the readings node.
+
+        Uses a shallow read so Firebase returns only the child keys instead of every
+        reading of every device.
+        """
+        devices = self.ref.child('readings').get(shallow=True)
+        if devices and isinstance(devices, dict):
+            return sorted(devices.keys())
+        return []
+
+    def query_readings(self, device_id, start_timestamp, end_timestamp):
+        """Fetch the raw readings of a device that fall within a time window.
+
+        Uses an indexed ``order_by_child('timestamp')`` range query per timestamp range
+        (see timestamp_windows) so only the requested window is downloaded.
+        """
+        device_ref = self.ref.child(f'readings/{device_id}')
+
+        try:
+            readings = {}
+            for window_start, window_end in timestamp_windows(start_timestamp, end_timestamp):
+                result = (device_ref.order_by_child('timestamp')
+                          .start_at(window_start)
+                          .end_at(window_end)
+                          .get())
+                if result:
+                    readings.update(result)
+            return readings
+        except Exception as e:
+            # Without the ".indexOn" rule Firebase rejects ordered queries,
+            # so fall back to downloading the whole device node
+            if 'index' not in str(e).lower():
+                raise
+            print(f"Timestamp index missing for {device_id}, downloading all readings: {e}")
+            return device_ref.get() or {}
+
+    def query_latest_reading(self, device_id, end_timestamp):
+        """Fetch the newest reading of a device at or before end_timestamp."""
+        device_ref = self.ref.child(f'readings/{device_id}')
+
+        readings = {}
+        for window_start, window_end in timestamp_windows(0, end_timestamp):
+            result = (device_ref.order_by_child('timestamp')
+                      .start_at(window_start)
+                      .end_at(window_end)
+                      .limit_to_last(1)
+                      .get())
+            if result:
+                readings.update(result)
+        return readings
+
+    def query_health(self, device_id, start_timestamp, end_timestamp):
+        """Fetch the health records of a device that fall within a time window.
+
+        Health records have always had second timestamps, so a single range query is enough.
+        """
+        health_ref = self.ref.child(f'health/{device_id}')
+
+        try:
+            return (health_ref.order_by_child('timestamp')
+                    .start_at(start_timestamp)
+                    .end_at(end_timestamp)
+                    .get()) or {}
+        except Exception as e:
+            if 'index' not in str(e).lower():
+                raise
+            print(f"Timestamp index missing for the health records of {device_id}, downloading all: {e}")
+            return health_ref.get() or {}
+
+    def stream_request(self, device_id):
+        """Return the REST URL and parameters of a device's readings."""
+        parsed = urlparse(self.database_url)
+        if parsed.scheme == 'https':
+            return f"https://{parsed.netloc}/readings/{device_id}.json", {}
+        namespace = parse_qs(parsed.query).get('ns', [''])[0]
+        return f"{parsed.scheme}://{parsed.netloc}/readings/{device_id}.json", {'ns': namespace}
+
+class SQLiteSource(DataSource):
+    """Readings stored in a SQLite database file, one row per reading.
+
+    Each reading is stored as its original JSON next to an indexed timestamp column,
+    so payloads come back exactly as devices wrote them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = f"SQLite ({path})"
+        self.local = threading.local()
+        with self.connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS readings ("
+                " device_id TEXT NOT NULL, key TEXT NOT NULL, timestamp REAL, data TEXT NOT NULL,"
+                " PRIMARY KEY (device_id, key))"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS readings_device_timestamp ON readings (device_id, timestamp)"
+            )
+
+    def connection(self):
+        """Return the connection of the calling thread."""
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = sqlite3.connect(self.path)
+        return self.local.connection
+
+    def insert_readings(self, device_id, readings):
+        """Store readings given as {push_id: reading}, replacing readings with the same key."""
+        rows = [
+            (device_id, key, reading.get('timestamp'), json.dumps(reading))
+            for key, reading in readings.items() if isinstance(reading, dict)
+        ]
+        with self.connection() as connection:
+            connection.executemany("INSERT OR REPLACE INTO readings VALUES (?, ?, ?, ?)", rows)
+
+    def load_export(self, export):
+        """Store all readings of a Firebase JSON export ({'readings': {device_id: {...}}})."""
+        for device_id, readings in (export.get('readings') or {}).items():
+            if isinstance(readings, dict):
+                self.insert_readings(device_id, readings)
+
+    def list_devices(self):
+        rows = self.connection().execute("SELECT DISTINCT device_id FROM readings ORDER BY device_id")
+        return [device_id for device_id, in rows]
+
+    def _select(self, device_id, windows, limit=None):
+        readings = {}
+        for window_start, window_end in windows:
+            query = ("SELECT key, data FROM readings WHERE device_id = ? AND timestamp BETWEEN ? AND ?"
+                     " ORDER BY timestamp DESC")
+            if limit:
+                query += f" LIMIT {int(limit)}"
+            rows = self.connection().execute(query, (device_id, window_start, window_end))
+            readings.update((key, json.loads(data)) for key, data in rows)
+        return readings
+
+    def query_readings(self, device_id, start_timestamp, end_timestamp):
+        return self._select(device_id, timestamp_windows(start_timestamp, end_timestamp))
+
+    def query_latest_reading(self, device_id, end_timestamp):
+        return self._select(device_id, timestamp_windows(0, end_timestamp), limit=1)
+
+class SyntheticSource(DataSource):
+    """Sample readings generated on the fly (see generate_sample_data)."""
+
+    name = "Sample data"
+    synthetic = True
+
+    def __init__(self, devices=DEMO_DEVICES, history=DEMO_HISTORY, seed=DEMO_SEED, interval=SAMPLE_INTERVAL):
+        self.devices = list(devices)
+        self.history = history
+        self.seed = seed
+        self.interval = interval
+
+    def list_devices(self):
+        return list(self.devices)
+
+    def frame(self, device_id, start_timestamp, end_timestamp):
+        """Return the sample readings of a device as a DataFrame, as decode_readings would."""
+        start_timestamp = max(start_timestamp, end_timestamp - self.history)
+        return generate_sample_data(device_id, start_timestamp, end_timestamp, self.interval, self.seed)
+
+    def iter_frames(self, device_ids, start_timestamp, end_timestamp):
+        """Yield the sample readings of several devices in chunks with a device_id column."""
+        start_timestamp = max(start_timestamp, end_timestamp - self.history)
+        return iter_sample_data(device_ids, start_timestamp, end_timestamp, self.interval, self.seed)
+
+    def query_readings(self, device_id, start_timestamp, end_timestamp):
+        return frame_to_payload(self.frame(device_id, start_timestamp, end_timestamp), device_id)
+
+    def query_latest_reading(self, device_id, end_timestamp):
+        df = self.frame(device_id, end_timestamp - self.interval, end_timestamp)
+        return frame_to_payload(df.tail(1), device_id)
+
+def frame_to_payload(df, device_id):
+    """Convert a readings DataFrame back to the Firebase payload format."""
+    timestamps = df['timestamp'].tolist()
+    values = df[PARAMETERS].to_numpy().tolist()
+    return {
+        f"-{device_id}-{int(timestamp)}": {
+            'device_id': device_id,
+            'timestamp': timestamp,
+            'readings': dict(zip(PARAMETERS, row)),
+        }
+        for timestamp, row in zip(timestamps, values)
+    }
+
+def open_data_source(spec=None):
+    """Open the data source described by a setting such as DASHBOARD_DATA_SOURCE.
+
+    - empty: the dashboard's Firebase database
+    - ``https://...`` or ``http://host:port/?ns=name``: a Firebase database or local stand-in
+    - ``sqlite:PATH``: a SQLite database file
+    - ``synthetic``: generated sample data
+    """
+    if not spec:
+        return FirebaseSource()
+    if spec.startswith(('https://', 'http://')):
+        return FirebaseSource(spec)
+    if spec.startswith('sqlite:'):
+        return SQLiteSource(spec[len('sqlite:'):])
+    if spec == 'synthetic':
+        return SyntheticSource()
+    raise ValueError(f"Unknown data source: {spec}")
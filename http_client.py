@@ -0,0 +1,290 @@
+"""
+ESP32 Environmental Monitoring System - HTTP Client
+
+This module contains a small asyncio HTTP/1.1 client that keeps one connection to a
+server open across requests, so uploads don't pay for a TCP connect and a TLS handshake
+every time. The request line and headers are written into a buffer that is allocated
+once. When the server has closed an idle connection, the request is sent again on a new
+connection, and every request must finish within its timeout. Waiting for the network
+never blocks the other tasks of the firmware; the server's name, whose lookup does, is
+only looked up for the first connection.
+
+The module runs on MicroPython (uasyncio) and on a regular Python interpreter (asyncio),
+so it can be tested on a computer, e.g. against local_rtdb.py.
+"""
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+try:
+    import socket
+except ImportError:
+    import usocket as socket
+
+try:
+    import ssl
+except ImportError:
+    import ussl as ssl
+
+# Size of the preallocated request header buffer; requests with longer headers use a
+# temporary buffer
+HEADER_BUFFER_SIZE = 512
+
+class HTTPError(OSError):
+    """The server's response could not be read."""
+
+class ConnectionClosed(HTTPError):
+    """The server closed the connection before it sent a response."""
+
+class Response:
+    """Status code and body of a response."""
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+    @property
+    def text(self):
+        return self.body.decode()
+
+def tls_context():
+    """Return the ssl argument of open_connection for https connections."""
+    if hasattr(ssl, "create_default_context"):
+        # Regular Python
+        return ssl.create_default_context()
+    if hasattr(ssl, "SSLContext"):
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        # Like urequests: the ESP32 has no certificate store to verify the server with
+        context.verify_mode = ssl.CERT_NONE
+        return context
+    return True
+
+class HTTPClient:
+    """Keep-alive HTTP/1.1 client for one server, e.g. ``HTTPClient("https://host/")``.
+
+    Paths passed to request are appended to the path of the base URL, and query, if
+    given, is appended to every request (e.g. "auth=..."). Requests must not be made
+    by several tasks at the same time.
+    """
+
+    def __init__(self, base_url, query="", timeout=10):
+        scheme, _, rest = base_url.partition("://")
+        host, _, path = rest.partition("/")
+        self.tls = scheme == "https"
+        self.host, _, port = host.partition(":")
+        self.port = int(port) if port else (443 if self.tls else 80)
+        self.base_path = "/" + path.rstrip("/") if path.strip("/") else ""
+        self.query = query
+        self.timeout = timeout
+
+        self.reader = None
+        self.writer = None
+        self.ip = None  # address of the server, looked up once
+
+        # Headers that are the same for every request, and the buffer requests are built in
+        self.common_headers = (
+            f"Host: {host}\r\nConnection: keep-alive\r\n"
+            "Content-Type: application/json\r\nContent-Length: "
+        ).encode()
+        self.header_buffer = bytearray(HEADER_BUFFER_SIZE)
+
+        # Number of connections opened, e.g. to check that connections are reused
+        self.connections = 0
+
+    #===========================================================================
+    # CONNECTION
+    #===========================================================================
+    async def connect(self):
+        """Open a connection to the server.
+
+        The server's name is looked up on the first connection only: getaddrinfo blocks
+        every task until it returns, while connecting to an address doesn't.
+        """
+        self.close()
+        if self.ip is None:
+            self.ip = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_STREAM)[0][-1][0]
+        try:
+            if self.tls:
+                self.reader, self.writer = await asyncio.open_connection(
+                    self.ip, self.port, ssl=tls_context(), server_hostname=self.host
+                )
+            else:
+                self.reader, self.writer = await asyncio.open_connection(self.ip, self.port)
+        except Exception:
+            # Look the server up again next time, in case its address changed
+            self.ip = None
+            raise
+        self.connections += 1
+
+    def close(self):
+        """Close the connection, if one is open."""
+        if self.writer is not None:
+            try:
+                self.writer.close()
+            except OSError:
+                pass
+        self.reader = None
+        self.writer = None
+
+    #===========================================================================
+    # REQUESTS
+    #===========================================================================
+    async def request(self, method, path, body=b"", timeout=None):
+        """Send a request and return its Response.
+
+        If the server has closed the kept-alive connection, the request is sent again
+        on a new connection. Raises OSError on network errors and if the request takes
+        longer than timeout seconds.
+        """
+        if isinstance(body, str):
+            body = body.encode()
+        try:
+            return await asyncio.wait_for(
+                self._request(method, path, body),
+                timeout if timeout is not None else self.timeout,
+            )
+        except asyncio.TimeoutError:
+            # The state of the connection is unknown
+            self.close()
+            raise OSError("HTTP request timed out")
+
+    async def _request(self, method, path, body):
+        reused = self.writer is not None
+        if not reused:
+            await self.connect()
+        try:
+            return await self._exchange(method, path, body)
+        except ConnectionClosed:
+            self.close()
+            if not reused:
+                raise
+        except HTTPError:
+            self.close()
+            raise
+        except OSError:
+            # e.g. ECONNRESET when writing to the closed connection
+            self.close()
+            if not reused:
+                raise
+
+        # The idle connection was closed by the server before it answered
+        await self.connect()
+        try:
+            return await self._exchange(method, path, body)
+        except OSError:
+            self.close()
+            raise
+
+    async def _exchange(self, method, path, body):
+        """Write a request on the open connection and read the response."""
+        # The connection may be closed by another task (e.g. when WiFi is lost) meanwhile
+        reader, writer = self.reader, self.writer
+        header_length = self._build_headers(method, path, len(body))
+        if header_length > len(self.header_buffer):
+            headers = self._headers(method, path, len(body))
+        else:
+            headers = memoryview(self.header_buffer)[:header_length]
+        writer.write(headers)
+        if body:
+            writer.write(body)
+        await writer.drain()
+
+        status_code, length, chunked, keep_alive = await self._read_head(reader)
+        try:
+            if chunked:
+                body = await self._read_chunked(reader)
+            elif length is not None:
+                body = await reader.readexactly(length)
+            elif method == "HEAD" or status_code in (204, 304):
+                body = b""
+            else:
+                body = await reader.read(-1)
+                keep_alive = False
+        except EOFError:
+            raise HTTPError("truncated response")
+
+        if not keep_alive and writer is self.writer:
+            self.close()
+        return Response(status_code, body)
+
+    def _request_target(self, path):
+        target = self.base_path + path
+        if self.query:
+            target += ("&" if "?" in target else "?") + self.query
+        return target
+
+    def _headers(self, method, path, content_length):
+        return (
+            f"{method} {self._request_target(path)} HTTP/1.1\r\n".encode()
+            + self.common_headers + f"{content_length}\r\n\r\n".encode()
+        )
+
+    def _build_headers(self, method, path, content_length):
+        """Write the request line and headers into the header buffer; returns their length.
+
+        If they don't fit, nothing is written and the returned length is larger than the buffer.
+        """
+        parts = (
+            method.encode(), b" ", self._request_target(path).encode(), b" HTTP/1.1\r\n",
+            self.common_headers, str(content_length).encode(), b"\r\n\r\n",
+        )
+        length = sum(len(part) for part in parts)
+        if length <= len(self.header_buffer):
+            position = 0
+            for part in parts:
+                self.header_buffer[position:position + len(part)] = part
+                position += len(part)
+        return length
+
+    #===========================================================================
+    # RESPONSES
+    #===========================================================================
+    async def _readline(self, reader):
+        """Read a line ending in CRLF, without the line ending."""
+        line = await reader.readline()
+        if not line.endswith(b"\n"):
+            raise HTTPError("truncated response")
+        return line.rstrip(b"\r\n")
+
+    async def _read_head(self, reader):
+        """Read the status line and headers; returns (status code, content length, chunked, keep alive)."""
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionClosed("connection closed by server")
+        try:
+            version, status_code = status_line.split(None, 2)[:2]
+            status_code = int(status_code)
+        except ValueError:
+            raise HTTPError(f"invalid status line: {status_line}")
+
+        length = None
+        chunked = False
+        keep_alive = version == b"HTTP/1.1"
+        while True:
+            line = await self._readline(reader)
+            if not line:
+                break
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            value = value.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"transfer-encoding":
+                chunked = value == b"chunked"
+            elif name == b"connection":
+                keep_alive = value == b"keep-alive" or (keep_alive and value != b"close")
+        return status_code, length, chunked, keep_alive
+
+    async def _read_chunked(self, reader):
+        body = b""
+        while True:
+            size = int((await self._readline(reader)).split(b";")[0], 16)
+            if size == 0:
+                # Skip trailers
+                while await self._readline(reader):
+                    pass
+                return body
+            body += await reader.readexactly(size)
+            await self._readline(reader)
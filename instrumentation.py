@@ -0,0 +1,210 @@
+"""
+ESP32 Environmental Monitoring Dashboard - Instrumentation
+
+This module measures where the time of a dashboard rerun goes. Each stage of a rerun
+records its wall time, the rows it processed and the bytes it downloaded from
+Firebase, and the last reruns are kept as rolling histograms that can be exported
+in the Prometheus text format. It has no dependency on Streamlit.
+
+Features:
+- Per-stage wall time, rows and downloaded bytes of each rerun
+- Download byte counting through a requests session hook
+- Rolling histograms of the last reruns in Prometheus text format
+"""
+
+import collections
+import gzip
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+# Number of recent observations per stage kept for the histograms
+HISTOGRAM_WINDOW = 1000
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+# Content-Encodings whose size before decompression can be counted without a Content-Length
+DECOMPRESSORS = {'gzip': gzip.decompress, 'deflate': zlib.decompress}
+
+# Stages of the calling thread that downloaded bytes are attributed to (outermost first)
+_local = threading.local()
+
+class Stage:
+    """Measurements of one stage of a rerun."""
+
+    def __init__(self, name, depth=0):
+        self.name = name
+        self.depth = depth         # number of enclosing stages
+        self.seconds = 0.0
+        self.rows = None
+        self.bytes = 0
+        self.sent_bytes = None     # data sent to the browser, e.g. by charts
+        self.lock = threading.Lock()
+
+    def add_bytes(self, num_bytes):
+        with self.lock:
+            self.bytes += num_bytes
+
+def active_stages():
+    """Return the stages the calling thread is currently running in."""
+    if not hasattr(_local, 'stages'):
+        _local.stages = []
+    return _local.stages
+
+def bind_stages(stages):
+    """Attribute downloads of the calling thread to the given stages, e.g. in worker threads."""
+    _local.stages = list(stages)
+
+class RerunProfile:
+    """Stages of one dashboard rerun, in the order they started."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        """Measure a stage; set ``rows`` on the yielded Stage to record the rows processed
+        and ``sent_bytes`` to record the data sent to the browser.
+
+        Bytes downloaded by the calling thread while the stage runs are added to it and
+        to any enclosing stages.
+        """
+        stages = active_stages()
+        stage = Stage(name, depth=len(stages))
+        self.stages.append(stage)
+        stages.append(stage)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds = time.perf_counter() - start
+            stages.remove(stage)
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+def transferred_bytes(response):
+    """Return the size of a requests response body as transferred, i.e. before decompression.
+
+    Firebase compresses responses with gzip, so the decoded body can be several times
+    larger than the download.
+    """
+    length = response.headers.get('Content-Length', '')
+    if length.isdigit():
+        return int(length)
+    decompress = DECOMPRESSORS.get(response.headers.get('Content-Encoding', '').strip().lower())
+    if decompress is not None and not response._content_consumed:
+        # urllib3 doesn't count the bytes of chunked responses, so read the compressed
+        # body here and hand requests the decompressed content
+        body = b''.join(response.raw.stream(decode_content=False))
+        response._content = decompress(body)
+        response._content_consumed = True
+        return len(body)
+    return len(response.content)
+
+def count_downloaded_bytes(response, *args, **kwargs):
+    """requests response hook adding the transferred size of each response body to the active stages."""
+    if kwargs.get('stream'):
+        # Streamed bodies are consumed later by the caller; count them there
+        return response
+    num_bytes = transferred_bytes(response)
+    for stage in active_stages():
+        stage.add_bytes(num_bytes)
+    return response
+
+def install_byte_counter(session):
+    """Count the bytes of every response received through a requests session."""
+    if count_downloaded_bytes not in session.hooks['response']:
+        session.hooks['response'].append(count_downloaded_bytes)
+
+class StageMetrics:
+    """Rolling histograms of stage measurements across reruns, shared by all sessions."""
+
+    def __init__(self, window=HISTOGRAM_WINDOW):
+        self.lock = threading.Lock()
+        self.window = window
+        self.seconds = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self.bytes = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self.reruns = 0
+        self.bytes_total = collections.Counter()  # all-time downloaded bytes per source
+
+    def observe(self, profile):
+        """Add the stages of a finished rerun."""
+        with self.lock:
+            self.reruns += 1
+            self.seconds['rerun'].append(profile.seconds)
+            for stage in profile.stages:
+                self.seconds[stage.name].append(stage.seconds)
+                self.bytes[stage.name].append(stage.bytes)
+                if stage.depth == 0:
+                    self.bytes_total['queries'] += stage.bytes
+
+    def add_bytes(self, source, num_bytes):
+        """Count bytes downloaded outside of a rerun, e.g. by a live feed."""
+        with self.lock:
+            self.bytes_total[source] += num_bytes
+
+    def summary(self):
+        """Return {stage: (observations, median seconds, 95th percentile seconds, mean bytes)}."""
+        with self.lock:
+            result = {}
+            for name, values in self.seconds.items():
+                ordered = sorted(values)
+                sizes = self.bytes.get(name) or [0]
+                result[name] = (
+                    len(ordered),
+                    ordered[len(ordered) // 2],
+                    ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    sum(sizes) / len(sizes),
+                )
+            return result
+
+    def to_prometheus(self):
+        """Render the histograms and counters in the Prometheus text exposition format."""
+        with self.lock:
+            lines = []
+            _histogram(lines, 'dashboard_stage_seconds',
+                       f"Wall time of dashboard stages over the last {self.window} reruns.",
+                       self.seconds, SECONDS_BUCKETS)
+            _histogram(lines, 'dashboard_stage_firebase_bytes',
+                       f"Bytes downloaded from Firebase per stage, before decompression, over the last {self.window} reruns.",
+                       self.bytes, BYTES_BUCKETS)
+
+            lines.append("# HELP dashboard_reruns_total Dashboard reruns measured.")
+            lines.append("# TYPE dashboard_reruns_total counter")
+            lines.append(f"dashboard_reruns_total {self.reruns}")
+
+            lines.append("# HELP dashboard_firebase_bytes_total Bytes downloaded from Firebase, before decompression.")
+            lines.append("# TYPE dashboard_firebase_bytes_total counter")
+            for source in sorted(self.bytes_total):
+                lines.append(f'dashboard_firebase_bytes_total{{source="{source}"}} {self.bytes_total[source]}')
+            return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, extra=""):
+        """Write the metrics to a file atomically, e.g. for the node exporter textfile collector.
+
+        extra is appended to the file, e.g. other metrics in the same text format.
+        """
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(self.to_prometheus() + extra)
+        os.replace(temp_path, path)
+
+def _histogram(lines, metric, help_text, observations, buckets):
+    """Append a histogram with one series per stage to lines."""
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} histogram")
+    for name in sorted(observations):
+        values = observations[name]
+        for bound in buckets:
+            count = sum(1 for value in values if value <= bound)
+            lines.append(f'{metric}_bucket{{stage="{name}",le="{bound:g}"}} {count}')
+        lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {len(values)}')
+        lines.append(f'{metric}_sum{{stage="{name}"}} {sum(values):g}')
+        lines.append(f'{metric}_count{{stage="{name}"}} {len(values)}')
@@ -0,0 +1,414 @@
+"""
+Local Firebase Realtime Database Stand-in
+
+This script serves an in-memory JSON tree over the subset of the Firebase Realtime
+Database REST API that the dashboard and the ESP32 firmware use, so the dashboard can
+be run, load tested and timed without network access or credentials.
+
+Supported:
+- GET, PUT, POST (push IDs), PATCH (multi-path updates) and DELETE on any path
+- Queries with orderBy ("$key", "$value" or a child path), startAt, endAt, equalTo,
+  limitToFirst and limitToLast
+- shallow=true reads
+- Event streams (Accept: text/event-stream) with put/patch events, also on queries
+- print=silent writes
+
+Usage:
+    python local_rtdb.py
+    python local_rtdb.py --port 9000 --data export.json --latency 0.05
+
+Point the dashboard at it with:
+    DASHBOARD_DATA_SOURCE="http://127.0.0.1:9000/?ns=microlab-data" streamlit run dashboard.py
+"""
+
+import argparse
+import json
+import queue
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+# Seconds between keep-alive events on idle event streams
+KEEP_ALIVE_INTERVAL = 30
+
+# Characters of Firebase push IDs, in sort order
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+def split_path(path):
+    """Split a database path into its keys, ignoring empty segments."""
+    return [unquote(key) for key in path.split('/') if key]
+
+def sort_key(value):
+    """Order values like Firebase: null, false, true, numbers, strings, objects."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    return (4, 0)
+
+def shallow_copy(node):
+    """Return the shallow version of a node: child objects are replaced by true."""
+    if not isinstance(node, dict):
+        return node
+    return {key: True if isinstance(child, dict) else child for key, child in node.items()}
+
+class Query:
+    """Ordering and filtering parameters of a REST request."""
+
+    def __init__(self, params):
+        self.order_by = params.get('orderBy')
+        self.start_at = params.get('startAt')
+        self.end_at = params.get('endAt')
+        self.equal_to = params.get('equalTo')
+        self.limit_to_first = params.get('limitToFirst')
+        self.limit_to_last = params.get('limitToLast')
+
+    @classmethod
+    def from_request(cls, query_string):
+        """Parse the JSON-encoded query parameters of a request; return None if there are none."""
+        params = {}
+        for name, values in parse_qs(query_string).items():
+            if name in ('orderBy', 'startAt', 'endAt', 'equalTo', 'limitToFirst', 'limitToLast'):
+                params[name] = json.loads(values[0])
+        return cls(params) if 'orderBy' in params else None
+
+    def order_value(self, key, child):
+        if self.order_by == '$key':
+            return key
+        if self.order_by == '$value':
+            return child
+        for name in split_path(self.order_by):
+            child = child.get(name) if isinstance(child, dict) else None
+        return child
+
+    def apply(self, node):
+        """Return the children of a node that match the query."""
+        if not isinstance(node, dict):
+            return {}
+        items = sorted(node.items(), key=lambda item: (sort_key(self.order_value(*item)), item[0]))
+        if self.equal_to is not None:
+            items = [item for item in items if self.order_value(*item) == self.equal_to]
+        if self.start_at is not None:
+            items = [item for item in items if sort_key(self.order_value(*item)) >= sort_key(self.start_at)]
+        if self.end_at is not None:
+            items = [item for item in items if sort_key(self.order_value(*item)) <= sort_key(self.end_at)]
+        if self.limit_to_first is not None:
+            items = items[:self.limit_to_first]
+        if self.limit_to_last is not None:
+            items = items[-self.limit_to_last:] if self.limit_to_last else []
+        return dict(items)
+
+class Subscription:
+    """An open event stream on a path, optionally filtered by a query."""
+
+    def __init__(self, keys, query):
+        self.keys = keys
+        self.query = query
+        self.events = queue.Queue()
+        self.visible = set()  # keys of the children currently matching the query
+
+    def send(self, event, path, data):
+        self.events.put((event, {'path': path, 'data': data}))
+
+class LocalDatabase:
+    """In-memory JSON tree with Firebase-style writes and change notifications."""
+
+    def __init__(self, data=None):
+        self.root = data if isinstance(data, dict) else {}
+        self.lock = threading.RLock()
+        self.subscriptions = []
+        self.last_push_time = 0
+        self.last_random = []
+
+    def get(self, keys):
+        node = self.root
+        for key in keys:
+            if not isinstance(node, dict) or key not in node:
+                return None
+            node = node[key]
+        return node
+
+    def _set(self, keys, value):
+        if not keys:
+            self.root = value if isinstance(value, dict) else {}
+            return
+        node = self.root
+        for key in keys[:-1]:
+            if not isinstance(node.get(key), dict):
+                node[key] = {}
+            node = node[key]
+        if value is None:
+            node.pop(keys[-1], None)
+        else:
+            node[keys[-1]] = value
+        self._prune(keys[:-1])
+
+    def _prune(self, keys):
+        """Remove objects left empty by a delete, as Firebase does."""
+        while keys:
+            parent = self.get(keys[:-1])
+            if isinstance(parent, dict) and parent.get(keys[-1]) == {}:
+                del parent[keys[-1]]
+            keys = keys[:-1]
+
+    def set(self, keys, value):
+        """Replace the value at a path; None deletes it."""
+        with self.lock:
+            self._set(keys, value)
+            self._notify(keys, 'put', value)
+
+    def update(self, keys, children):
+        """Update several children of a path at once; child keys may be paths."""
+        with self.lock:
+            for child_path, value in children.items():
+                self._set(keys + split_path(child_path), value)
+            self._notify(keys, 'patch', children)
+
+    def push(self, keys, value):
+        """Add a value under a new chronologically ordered push ID; return the ID."""
+        with self.lock:
+            push_id = self._push_id()
+            self.set(keys + [push_id], value)
+            return push_id
+
+    def _push_id(self):
+        """Generate a Firebase-style push ID: 8 timestamp characters and 12 random ones."""
+        now = int(time.time() * 1000)
+        if now == self.last_push_time:
+            # Same millisecond: increment the random part to keep IDs ordered
+            for i in range(11, -1, -1):
+                if self.last_random[i] < 63:
+                    self.last_random[i] += 1
+                    break
+                self.last_random[i] = 0
+        else:
+            self.last_random = [random.randrange(64) for _ in range(12)]
+        self.last_push_time = now
+
+        time_chars = []
+        for _ in range(8):
+            time_chars.append(PUSH_CHARS[now % 64])
+            now //= 64
+        return ''.join(reversed(time_chars)) + ''.join(PUSH_CHARS[i] for i in self.last_random)
+
+    def read(self, keys, query=None, shallow=False):
+        with self.lock:
+            node = self.get(keys)
+            if query is not None:
+                return query.apply(node)
+            return shallow_copy(node) if shallow else node
+
+    def subscribe(self, keys, query):
+        """Open an event stream; the first event holds the current data."""
+        subscription = Subscription(keys, query)
+        with self.lock:
+            data = self.read(keys, query)
+            if query is not None:
+                subscription.visible = set(data)
+            subscription.send('put', '/', data)
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.remove(subscription)
+
+    def _notify(self, keys, event, data):
+        """Send the events of a write at a path to the affected subscriptions."""
+        for subscription in self.subscriptions:
+            sub_keys = subscription.keys
+            if keys[:len(sub_keys)] == sub_keys:
+                relative = keys[len(sub_keys):]
+                if subscription.query is None:
+                    subscription.send(event, '/' + '/'.join(relative), data)
+                elif relative:
+                    self._notify_child(subscription, relative[0])
+                else:
+                    # The whole queried node changed
+                    changed = {split_path(path)[0] for path in data} if event == 'patch' else None
+                    self._notify_query(subscription, changed)
+            elif sub_keys[:len(keys)] == keys:
+                # A write above the stream's path
+                if subscription.query is None:
+                    subscription.send('put', '/', self.get(sub_keys))
+                else:
+                    self._notify_query(subscription, None)
+
+    def _notify_child(self, subscription, child_key):
+        """Send the new value of a child of a queried node, or null if it left the query."""
+        matching = subscription.query.apply(self.get(subscription.keys))
+        if child_key in matching:
+            subscription.visible.add(child_key)
+            subscription.send('put', f'/{child_key}', matching[child_key])
+        elif child_key in subscription.visible:
+            subscription.visible.discard(child_key)
+            subscription.send('put', f'/{child_key}', None)
+        # Limit queries can push another child out of the result
+        for key in subscription.visible - set(matching):
+            subscription.visible.discard(key)
+            subscription.send('put', f'/{key}', None)
+
+    def _notify_query(self, subscription, changed):
+        """Send the changes of a queried node after a write at or above it."""
+        matching = subscription.query.apply(self.get(subscription.keys))
+        keys = subscription.visible | set(matching) if changed is None else changed | subscription.visible
+        for key in sorted(keys):
+            if key in matching:
+                subscription.send('put', f'/{key}', matching[key])
+            elif key in subscription.visible:
+                subscription.send('put', f'/{key}', None)
+        subscription.visible = set(matching)
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Handles REST requests against the server's LocalDatabase."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _parse(self):
+        url = urlparse(self.path)
+        path = url.path[:-len('.json')] if url.path.endswith('.json') else url.path
+        params = parse_qs(url.query)
+        return split_path(path), url.query, params
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def _respond(self, status, data, params=None):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if params and params.get('print') == ['silent']:
+            self.send_response(204)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps(data, separators=(',', ':')).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        keys, query_string, params = self._parse()
+        database = self.server.database
+        try:
+            if method == 'GET':
+                query = Query.from_request(query_string)
+                if 'text/event-stream' in self.headers.get('Accept', ''):
+                    self._stream(keys, query)
+                    return
+                shallow = params.get('shallow') == ['true']
+                self._respond(200, database.read(keys, query, shallow), params)
+            elif method == 'PUT':
+                data = self._read_body()
+                database.set(keys, data)
+                self._respond(200, data, params)
+            elif method == 'POST':
+                self._respond(200, {'name': database.push(keys, self._read_body())}, params)
+            elif method == 'PATCH':
+                data = self._read_body()
+                if not isinstance(data, dict):
+                    raise ValueError("PATCH body must be an object")
+                database.update(keys, data)
+                self._respond(200, data, params)
+            elif method == 'DELETE':
+                database.set(keys, None)
+                self._respond(200, None, params)
+        except (ValueError, TypeError) as e:
+            self._respond(400, {'error': str(e)})
+
+    def _stream(self, keys, query):
+        """Send server-sent events for a path until the client disconnects."""
+        subscription = self.server.database.subscribe(keys, query)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            while True:
+                try:
+                    event, data = subscription.events.get(timeout=KEEP_ALIVE_INTERVAL)
+                    message = f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+                except queue.Empty:
+                    message = "event: keep-alive\ndata: null\n\n"
+                chunk = message.encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.database.unsubscribe(subscription)
+            self.close_connection = True
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def make_server(database, host='127.0.0.1', port=9000, latency=0, verbose=False):
+    """Create a threaded HTTP server for a LocalDatabase; call serve_forever() to run it."""
+    server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.daemon_threads = True
+    server.database = database
+    server.latency = latency
+    server.verbose = verbose
+    return server
+
+def main():
+    """Parse the command line and serve the database until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=9000, help="Port to listen on")
+    parser.add_argument('--data', help="JSON file (e.g. a Firebase export) to load, and to save to on exit")
+    parser.add_argument('--latency', type=float, default=0,
+                        help="Seconds to wait before each response, to simulate network latency")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args()
+
+    data = None
+    if args.data:
+        try:
+            with open(args.data) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            print(f"{args.data} not found, starting with an empty database")
+
+    database = LocalDatabase(data)
+    server = make_server(database, args.host, args.port, args.latency, args.verbose)
+    print(f"Serving on http://{args.host}:{args.port}/ (press Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.data:
+            with database.lock:
+                with open(args.data, 'w') as f:
+                    json.dump(database.root, f)
+            print(f"Saved database to {args.data}")
+
+if __name__ == "__main__":
+    main()
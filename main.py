@@ -24,13 +24,16 @@ import network
 import machine
 import dht
 import ujson
-import urequests
 import gc
 from machine import Pin, ADC, I2C
 import ntptime
+import uasyncio as asyncio
 
 # Import configuration
 import config
+from http_client import HTTPClient
+from reading_cache import MISSING, ReadingCache
+from telemetry import Telemetry
 
 # Optional: Import display library if enabled
 if config.DISPLAY_ENABLED:
@@ -51,27 +54,78 @@ oled = None
 
 # Network status
 wifi_connected = False
-last_reading_time = 0
-cached_readings = []
+
+# Latest reading, shown on the display
+latest_reading = None
+
+# Last reading queued for upload, which the deadband is measured from (see should_report)
+last_reported = None
+
+# Set when there are readings to upload (asyncio.Event, created by run)
+upload_wanted = None
+
+# Readings waiting to be uploaded (see reading_cache.py)
+reading_cache = None
+
+# Kept-alive connection to Firebase (see http_client.py)
+firebase = None
+
+# Stage timings, upload statistics and heap usage of the firmware (see telemetry.py)
+telemetry = None
+
+# Sensor fields of a reading. Each holds the mean of the samples taken during the
+# reading interval, accompanied by <field>_min, <field>_max and <field>_count.
+SENSOR_FIELDS = ("temperature", "humidity", "light_level", "soil_moisture")
+
+# Order and struct format of the values in cached reading records: the means (float32),
+# the minimums and maximums in hundredths (int16) and the sample counts (uint16)
+READING_FIELDS = (
+    SENSOR_FIELDS
+    + tuple(f"{field}_{stat}" for field in SENSOR_FIELDS for stat in ("min", "max"))
+    + tuple(f"{field}_count" for field in SENSOR_FIELDS)
+)
+READING_VALUE_FORMAT = "ffff" + "hh" * len(SENSOR_FIELDS) + "HHHH"
+
+# Largest sample count a cached record holds; 65535 marks a missing count. Longer
+# READING_INTERVALs over ADC_SAMPLE_INTERVAL_MS take more samples than that.
+MAX_SAMPLE_COUNT = MISSING["H"] - 1
+
+# Samples of the current reading interval (see SampleAccumulator)
+temperature_samples = None
+humidity_samples = None
+light_samples = None
+soil_samples = None
 
 #===============================================================================
 # INITIALIZATION FUNCTIONS
 #===============================================================================
-def initialize_system():
+async def initialize_system():
     """Initialize all system components."""
+    global reading_cache, firebase, telemetry
+    
     print("Initializing ESP32 Environmental Monitoring System...")
     
+    # Allocate the reading cache and the request buffers first, while the heap is still unfragmented
+    reading_cache = ReadingCache(
+        config.CACHE_CAPACITY, config.CACHE_SPILL_FILE, config.CACHE_SPILL_MAX_RECORDS, READING_VALUE_FORMAT
+    )
+    firebase = HTTPClient(
+        config.FIREBASE_URL,
+        query=f"auth={config.FIREBASE_SECRET}" if config.FIREBASE_SECRET else "",
+        timeout=config.HTTP_TIMEOUT,
+    )
+    
     # Initialize sensors
     initialize_sensors()
     
-    # Initialize WiFi
-    connect_wifi()
-    
     # Initialize display if enabled
     if config.DISPLAY_ENABLED:
         initialize_display()
     
-    # Sync time with NTP server if connected
+    # Initialize WiFi
+    await connect_wifi()
+    
+    # Sync time with NTP server if connected, before the first reading is timestamped
     if wifi_connected:
         try:
             ntptime.settime()
@@ -79,11 +133,20 @@ def initialize_system():
         except:
             print("Failed to sync time with NTP server")
     
+    # Uptime is measured with the clock, so start once it has been set
+    telemetry = Telemetry()
+    
     print("System initialization complete")
 
 def initialize_sensors():
     """Initialize all sensor hardware."""
     global dht_sensor, ldr_sensor, soil_sensor
+    global temperature_samples, humidity_samples, light_samples, soil_samples
+    
+    temperature_samples = SampleAccumulator()
+    humidity_samples = SampleAccumulator()
+    light_samples = SampleAccumulator()
+    soil_samples = SampleAccumulator()
     
     try:
         # Initialize DHT11 sensor
@@ -174,7 +237,7 @@ def initialize_display():
 #===============================================================================
 # NETWORK FUNCTIONS
 #===============================================================================
-def connect_wifi():
+async def connect_wifi():
     """Connect to WiFi network using credentials from config."""
     global wifi_connected
     
@@ -195,7 +258,7 @@ def connect_wifi():
                 break
             max_wait -= 1
             print("Waiting for connection...")
-            time.sleep(1)
+            await asyncio.sleep(1)
     
     # Check if connected
     if wlan.isconnected():
@@ -208,7 +271,7 @@ def connect_wifi():
     
     return wifi_connected
 
-def check_wifi_connection():
+async def check_wifi_connection():
     """Check if WiFi is still connected and attempt to reconnect if not."""
     global wifi_connected
     
@@ -218,146 +281,313 @@ def check_wifi_connection():
         print("WiFi connection lost. Attempting to reconnect...")
         wifi_connected = False
         
+        # The connection to Firebase did not survive
+        firebase.close()
+        
         # Try to reconnect
-        connect_wifi()
+        if await connect_wifi():
+            # Upload the readings cached while offline
+            upload_wanted.set()
     
     return wifi_connected
 
-def send_to_firebase(data):
-    """Send data to Firebase Realtime Database."""
-    if not wifi_connected:
-        print("Cannot send data: WiFi not connected")
-        return False
+def reading_key(timestamp):
+    """Return the database key a cached reading is uploaded under.
     
+    The key is derived from the timestamp, so a reading that is uploaded twice (e.g.
+    when the response to a batch was lost) overwrites itself instead of being duplicated.
+    """
+    return "r%010d" % int(timestamp)
+
+def cache_reading(data):
+    """Add a reading to the cache of readings waiting to be uploaded."""
+    readings = data["readings"]
+    values = []
+    for field, code in zip(READING_FIELDS, READING_VALUE_FORMAT):
+        value = readings.get(field)
+        if value is not None and code == "h":
+            value = round(value * 100)
+        elif value is not None and code == "H":
+            value = min(value, MAX_SAMPLE_COUNT)
+        values.append(value)
+    reading_cache.append(data["timestamp"], values)
+
+def cached_reading_data(timestamp, values):
+    """Rebuild the reading data of a cached record, as read_all_sensors returns it."""
+    readings = {}
+    for field, code, value in zip(READING_FIELDS, READING_VALUE_FORMAT, values):
+        if code == "f":
+            # Means are stored as 32-bit floats; round off the conversion error
+            readings[field] = None if value is None else round(value, 2)
+        elif value is not None:
+            readings[field] = value / 100 if code == "h" else value
+    data = {
+        "device_id": config.DEVICE_ID,
+        "timestamp": timestamp,
+        "readings": readings
+    }
+    if config.DEADBAND:
+        # Tell the dashboard how long each reading holds (see should_report)
+        data["interval"] = config.READING_INTERVAL
+        data["heartbeat"] = config.HEARTBEAT_INTERVAL
+    return data
+
+async def patch_to_firebase(body):
+    """Write several readings to Firebase in one PATCH request; returns True on success."""
+    started = time.ticks_ms()
     try:
-        # Construct the URL for the Firebase endpoint
-        url = f"{config.FIREBASE_URL}/readings/{config.DEVICE_ID}.json"
-        if config.FIREBASE_SECRET:
-            url += f"?auth={config.FIREBASE_SECRET}"
-        
-        # Send the data
-        print(f"Sending data to Firebase: {data}")
-        response = urequests.post(url, data=ujson.dumps(data))
-        
-        # Check response
-        if response.status_code == 200:
-            print("Data sent successfully")
-            response.close()
-            return True
-        else:
-            print(f"Failed to send data. Status code: {response.status_code}")
-            response.close()
-            return False
+        # print=silent makes Firebase answer with an empty 204 instead of echoing the data
+        path = f"/readings/{config.DEVICE_ID}.json?print=silent"
+        
+        response = await firebase.request("PATCH", path, body)
+        success = 200 <= response.status_code < 300
+        telemetry.record_upload(time.ticks_diff(time.ticks_ms(), started), success)
+        if not success:
+            print(f"Failed to send batch. Status code: {response.status_code}")
+        return success
     
     except Exception as e:
-        print(f"Error sending data to Firebase: {e}")
+        print(f"Error sending batch to Firebase: {e}")
+        telemetry.record_upload(time.ticks_diff(time.ticks_ms(), started), False)
         return False
 
-def send_cached_readings():
-    """Attempt to send any cached readings that failed to send previously."""
-    global cached_readings
-    
-    if not wifi_connected or not cached_readings:
+async def send_cached_readings():
+    """Upload the cached readings, oldest first, in batches of at most UPLOAD_BATCH_BYTES.
+    
+    Each batch is a single PATCH of the device's readings node with one key per reading.
+    Firebase applies a PATCH atomically, so a successful response confirms every reading
+    of its batch; only confirmed readings are removed from the cache. Uploading stops at
+    the first failed batch.
+    """
+    if not wifi_connected or not len(reading_cache):
         return
     
-    print(f"Attempting to send {len(cached_readings)} cached readings")
+    # Readings taken during the upload are left for the next one
+    pending = len(reading_cache)
+    print(f"Attempting to send {pending} cached readings")
     
-    # Try to send each cached reading
-    successful_indices = []
-    for i, reading in enumerate(cached_readings):
-        if send_to_firebase(reading):
-            successful_indices.append(i)
+    sent = 0
+    while sent < pending:
+        # Collect the oldest readings that fit into one request body
+        entries = []
+        size = 2  # braces
+        records = reading_cache.oldest()
+        try:
+            for timestamp, values in records:
+                entry = f'"{reading_key(timestamp)}":{ujson.dumps(cached_reading_data(timestamp, values))}'
+                if entries and size + len(entry) + 1 > config.UPLOAD_BATCH_BYTES:
+                    break
+                entries.append(entry)
+                size += len(entry) + 1
+                last_timestamp = timestamp
+        finally:
+            # Close the flash file before the cache changes
+            records.close()
+        
+        if not entries:
+            # The cache was emptied meanwhile
+            break
+        if not await patch_to_firebase("{" + ",".join(entries) + "}"):
+            break
+        
+        # Remove the confirmed readings. While the request was in flight, a full cache
+        # may have evicted some of them, so remove by timestamp instead of by count, and
+        # count only the readings that were still cached.
+        sent += reading_cache.drop_through(last_timestamp)
+        gc.collect()
+    
+    print(f"{sent} cached readings sent, {len(reading_cache)} remaining")
+
+def wifi_rssi():
+    """Return the signal strength of the WiFi connection in dBm, or None if unknown."""
+    try:
+        return network.WLAN(network.STA_IF).status("rssi")
+    except Exception:
+        return None
+
+async def send_health_record():
+    """Upload a health record of the firmware (see telemetry.py); returns True on success.
+    
+    Records are stored next to the readings under /health/<DEVICE_ID>, with keys derived
+    from their timestamps like readings. A new period starts once a record is uploaded.
+    """
+    gc.collect()
+    record = telemetry.health_record(gc.mem_free(), len(reading_cache), wifi_rssi())
+    try:
+        path = f"/health/{config.DEVICE_ID}/{reading_key(record['timestamp'])}.json?print=silent"
+        response = await firebase.request("PUT", path, ujson.dumps(record))
+        success = 200 <= response.status_code < 300
+        if not success:
+            print(f"Failed to send health record. Status code: {response.status_code}")
     
-    # Remove successfully sent readings (in reverse order to avoid index issues)
-    for i in sorted(successful_indices, reverse=True):
-        cached_readings.pop(i)
+    except Exception as e:
+        print(f"Error sending health record to Firebase: {e}")
+        success = False
     
-    print(f"{len(successful_indices)} cached readings sent, {len(cached_readings)} remaining")
+    if success:
+        telemetry.reset()
+    return success
 
 #===============================================================================
 # SENSOR READING FUNCTIONS
 #===============================================================================
-def read_temperature_humidity():
-    """Read temperature and humidity from DHT11 sensor."""
+class SampleAccumulator:
+    """Count, sum, minimum and maximum of the samples of one reading interval.
+    
+    Raw ADC values and DHT11 readings are small integers, so adding a sample doesn't
+    allocate memory.
+    """
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self.count = 0
+        self.total = 0
+        self.low = 0
+        self.high = 0
+    
+    def add(self, value):
+        if self.count == 0 or value < self.low:
+            self.low = value
+        if self.count == 0 or value > self.high:
+            self.high = value
+        self.total += value
+        self.count += 1
+    
+    def take(self):
+        """Return (mean, minimum, maximum, count) and start a new interval; None without samples."""
+        if self.count == 0:
+            return None
+        summary = (self.total / self.count, self.low, self.high, self.count)
+        self.reset()
+        return summary
+
+def convert_summary(summary, convert):
+    """Convert the values of a (mean, minimum, maximum, count) summary of raw samples."""
+    if summary is None:
+        return None
+    mean, low, high, count = summary
+    # The conversion may invert the scale, e.g. for soil moisture
+    low, high = sorted((convert(low), convert(high)))
+    return convert(mean), low, high, count
+
+def light_percent(raw_value):
+    """Convert a raw LDR ADC value to a light level in percent (0-100%)."""
+    light_percent = ((raw_value - config.LDR_MIN) * 100) / (config.LDR_MAX - config.LDR_MIN)
+    return max(0, min(100, light_percent))  # Clamp between 0-100%
+
+def soil_percent(raw_value):
+    """Convert a raw soil sensor ADC value to a soil moisture in percent (0-100%)."""
+    # Note: For most soil sensors, higher value means lower moisture
+    # So we invert the percentage calculation
+    moisture_percent = 100 - ((raw_value - config.SOIL_MIN) * 100) / (config.SOIL_MAX - config.SOIL_MIN)
+    return max(0, min(100, moisture_percent))  # Clamp between 0-100%
+
+def sample_dht():
+    """Measure temperature and humidity once and add them to the interval's samples."""
     if dht_sensor is None:
-        return None, None
+        return
     
     try:
-        # Measure from DHT sensor
         dht_sensor.measure()
-        temperature = dht_sensor.temperature()
-        humidity = dht_sensor.humidity()
-        
-        print(f"Temperature: {temperature}°C, Humidity: {humidity}%")
-        return temperature, humidity
+        temperature_samples.add(dht_sensor.temperature())
+        humidity_samples.add(dht_sensor.humidity())
     
     except Exception as e:
         print(f"Error reading DHT11 sensor: {e}")
-        return None, None
+
+def sample_adc():
+    """Read the analog sensors once and add the raw values to the interval's samples."""
+    if ldr_sensor is not None:
+        light_samples.add(ldr_sensor.read())
+    if soil_sensor is not None:
+        soil_samples.add(soil_sensor.read())
+
+def read_temperature_humidity():
+    """Return the temperature and humidity summaries of the interval."""
+    # Without samples (e.g. every measurement failed) measure once more now
+    if temperature_samples.count == 0:
+        sample_dht()
+    temperature = temperature_samples.take()
+    humidity = humidity_samples.take()
+    
+    if temperature is not None:
+        print(f"Temperature: {temperature[0]:.1f}°C, Humidity: {humidity[0]:.1f}% ({temperature[3]} samples)")
+    return temperature, humidity
 
 def read_light_level():
-    """Read light level from LDR sensor."""
-    if ldr_sensor is None:
-        return None
-    
-    try:
-        # Read raw ADC value
-        raw_value = ldr_sensor.read()
-        
-        # Convert to percentage (0-100%)
-        light_percent = ((raw_value - config.LDR_MIN) * 100) / (config.LDR_MAX - config.LDR_MIN)
-        light_percent = max(0, min(100, light_percent))  # Clamp between 0-100%
-        
-        print(f"Light level: {light_percent:.1f}% (raw: {raw_value})")
-        return light_percent
-    
-    except Exception as e:
-        print(f"Error reading LDR sensor: {e}")
-        return None
+    """Return the light level summary of the interval in percent."""
+    if light_samples.count == 0:
+        sample_adc()
+    light_level = convert_summary(light_samples.take(), light_percent)
+    
+    if light_level is not None:
+        mean, low, high, count = light_level
+        print(f"Light level: {mean:.1f}% ({low:.1f}-{high:.1f}%, {count} samples)")
+    return light_level
 
 def read_soil_moisture():
-    """Read soil moisture from soil moisture sensor."""
-    if soil_sensor is None:
-        return None
-    
-    try:
-        # Read raw ADC value
-        raw_value = soil_sensor.read()
-        
-        # Convert to percentage (0-100%)
-        # Note: For most soil sensors, higher value means lower moisture
-        # So we invert the percentage calculation
-        moisture_percent = 100 - ((raw_value - config.SOIL_MIN) * 100) / (config.SOIL_MAX - config.SOIL_MIN)
-        moisture_percent = max(0, min(100, moisture_percent))  # Clamp between 0-100%
-        
-        print(f"Soil moisture: {moisture_percent:.1f}% (raw: {raw_value})")
-        return moisture_percent
-    
-    except Exception as e:
-        print(f"Error reading soil moisture sensor: {e}")
-        return None
+    """Return the soil moisture summary of the interval in percent."""
+    if soil_samples.count == 0:
+        sample_adc()
+    soil_moisture = convert_summary(soil_samples.take(), soil_percent)
+    
+    if soil_moisture is not None:
+        mean, low, high, count = soil_moisture
+        print(f"Soil moisture: {mean:.1f}% ({low:.1f}-{high:.1f}%, {count} samples)")
+    return soil_moisture
 
 def read_all_sensors():
-    """Read data from all sensors and return as a dictionary."""
+    """Summarize the samples of the interval and return them as a dictionary."""
     # Read sensor values
     temperature, humidity = read_temperature_humidity()
     light_level = read_light_level()
     soil_moisture = read_soil_moisture()
     
-    # Create data dictionary
+    # Create data dictionary: the mean of each field plus its minimum, maximum and sample count
+    readings = {}
+    for field, summary in zip(SENSOR_FIELDS, (temperature, humidity, light_level, soil_moisture)):
+        if summary is None:
+            readings[field] = None
+            continue
+        mean, low, high, count = summary
+        readings[field] = mean
+        readings[f"{field}_min"] = low
+        readings[f"{field}_max"] = high
+        readings[f"{field}_count"] = count
+    
     data = {
         "device_id": config.DEVICE_ID,
         "timestamp": time.time(),
-        "readings": {
-            "temperature": temperature,
-            "humidity": humidity,
-            "light_level": light_level,
-            "soil_moisture": soil_moisture
-        }
+        "readings": readings
     }
     
     return data
 
+def should_report(data):
+    """Return True if a reading has to be uploaded under the DEADBAND settings.
+    
+    That is the case when a value moved further than its deadband from the last uploaded
+    reading, appeared or went missing, or when skipping the reading could leave more than
+    HEARTBEAT_INTERVAL seconds between two uploaded readings.
+    """
+    if not config.DEADBAND or last_reported is None:
+        return True
+    if data["timestamp"] - last_reported["timestamp"] + config.READING_INTERVAL > config.HEARTBEAT_INTERVAL:
+        return True
+    
+    readings = data["readings"]
+    reported = last_reported["readings"]
+    for field in SENSOR_FIELDS:
+        value = readings.get(field)
+        previous = reported.get(field)
+        if (value is None) != (previous is None):
+            return True
+        if value is not None and abs(value - previous) > config.DEADBAND.get(field, 0):
+            return True
+    return False
+
 #===============================================================================
 # DISPLAY FUNCTIONS
 #===============================================================================
@@ -407,10 +637,10 @@ def update_display(data):
         
         # Column 1 (left side) - readings with units
         if readings.get("temperature") is not None:
-            oled.text(f"{readings['temperature']}C", 10, 16)
+            oled.text(f"{readings['temperature']:.1f}C", 10, 16)
         
         if readings.get("humidity") is not None:
-            oled.text(f"{readings['humidity']}%", 10, 28)
+            oled.text(f"{readings['humidity']:.0f}%", 10, 28)
         
         # Column 2 (right side) - readings with units
         if readings.get("light_level") is not None:
@@ -512,68 +742,130 @@ def display_error(message):
         print(f"Error displaying error message: {e}")
 
 #===============================================================================
-# MAIN PROGRAM LOOP
+# TASKS
 #===============================================================================
-def main():
-    """Main program loop."""
-    global last_reading_time, cached_readings
+async def sample_readings():
+    """Take a reading every READING_INTERVAL seconds and queue it for upload if it has to be reported.
+    
+    Readings are due on a fixed ticks_ms schedule: each one a whole interval after the
+    previous one was due, not after it finished, so the time spent reading sensors
+    doesn't accumulate and clock changes (e.g. by NTP) don't shift the schedule. Readings
+    that are already overdue when the task gets to run are skipped, not taken in a burst.
+    """
+    global latest_reading, last_reported
+    
+    interval = config.READING_INTERVAL * 1000
+    due = time.ticks_ms()
+    while True:
+        with telemetry.stage("read_sensors"):
+            latest_reading = read_all_sensors()
+        
+        # Every reading to upload goes through the cache, so none is lost while the
+        # upload task is busy or offline
+        if should_report(latest_reading):
+            cache_reading(latest_reading)
+            last_reported = latest_reading
+            upload_wanted.set()
+        
+        # Run garbage collection to free memory
+        gc.collect()
+        telemetry.record_memory(gc.mem_free())
+        
+        due = time.ticks_add(due, interval)
+        late = time.ticks_diff(time.ticks_ms(), due)
+        if late >= 0:
+            skipped = late // interval + 1
+            print(f"Sampling fell behind, {skipped} readings skipped")
+            due = time.ticks_add(due, skipped * interval)
+        await asyncio.sleep_ms(time.ticks_diff(due, time.ticks_ms()))
+
+async def oversample_sensors():
+    """Sample the analog sensors every ADC_SAMPLE_INTERVAL_MS and the DHT11 every DHT_SAMPLE_INTERVAL_MS.
+    
+    The time the task wakes up after its sleep should have ended is recorded as the
+    loop lag, i.e. how long other tasks kept the event loop busy.
+    """
+    dht_due = time.ticks_ms()
+    loop_lag = telemetry.stage("loop_lag")
+    while True:
+        sample_adc()
+        if time.ticks_diff(time.ticks_ms(), dht_due) >= 0:
+            with telemetry.stage("sample_dht"):
+                sample_dht()
+            dht_due = time.ticks_add(time.ticks_ms(), config.DHT_SAMPLE_INTERVAL_MS)
+        
+        asleep = time.ticks_us()
+        await asyncio.sleep_ms(config.ADC_SAMPLE_INTERVAL_MS)
+        loop_lag.add(max(0, time.ticks_diff(time.ticks_us(), asleep) - config.ADC_SAMPLE_INTERVAL_MS * 1000))
+
+async def upload_readings():
+    """Upload the cached readings whenever there are new ones or WiFi has reconnected.
+    
+    A health record is uploaded along with the first upload after every TELEMETRY_INTERVAL
+    seconds.
+    """
+    while True:
+        await upload_wanted.wait()
+        upload_wanted.clear()
+        if wifi_connected:
+            with telemetry.stage("upload"):
+                await send_cached_readings()
+            if telemetry.due(config.TELEMETRY_INTERVAL):
+                await send_health_record()
+        else:
+            print(f"WiFi not connected. Cache size: {len(reading_cache)}")
+
+async def refresh_display():
+    """Redraw the display every DISPLAY_INTERVAL seconds, e.g. to update the clock and WiFi status."""
+    while True:
+        if latest_reading is not None:
+            with telemetry.stage("display"):
+                update_display(latest_reading)
+        await asyncio.sleep(config.DISPLAY_INTERVAL)
+
+async def supervise_wifi():
+    """Check the WiFi connection every WIFI_CHECK_INTERVAL seconds and reconnect when it is lost."""
+    while True:
+        await asyncio.sleep(config.WIFI_CHECK_INTERVAL)
+        await check_wifi_connection()
+
+#===============================================================================
+# MAIN PROGRAM
+#===============================================================================
+async def run():
+    """Initialize the system and run the tasks until one of them fails."""
+    global upload_wanted
+    
+    upload_wanted = asyncio.Event()
+    await initialize_system()
     
+    print("Starting tasks...")
+    tasks = [oversample_sensors(), sample_readings(), upload_readings(), supervise_wifi()]
+    if config.DISPLAY_ENABLED:
+        tasks.append(refresh_display())
+    await asyncio.gather(*tasks)
+
+def main():
+    """Run the firmware; on an unhandled error, save the cached readings and reset."""
     try:
-        # Initialize the system
-        initialize_system()
-        
-        print("Starting main loop...")
-        
-        while True:
-            current_time = time.time()
-            
-            # Check if it's time to take a reading
-            if current_time - last_reading_time >= config.READING_INTERVAL:
-                # Check WiFi connection
-                check_wifi_connection()
-                
-                # Read sensor data
-                data = read_all_sensors()
-                
-                # Update display
-                update_display(data)
-                
-                # Try to send data to Firebase
-                if wifi_connected:
-                    # First try to send any cached readings
-                    send_cached_readings()
-                    
-                    # Then send current reading
-                    if not send_to_firebase(data):
-                        # If failed, add to cache
-                        cached_readings.append(data)
-                        print(f"Data added to cache. Cache size: {len(cached_readings)}")
-                else:
-                    # If not connected, add to cache
-                    cached_readings.append(data)
-                    print(f"WiFi not connected. Data added to cache. Cache size: {len(cached_readings)}")
-                
-                # Limit cache size to prevent memory issues
-                if len(cached_readings) > 50:
-                    cached_readings = cached_readings[-50:]
-                    print("Cache size limited to 50 entries")
-                
-                # Update last reading time
-                last_reading_time = current_time
-                
-                # Run garbage collection to free memory
-                gc.collect()
-            
-            # Small delay to prevent busy waiting
-            time.sleep(1)
+        asyncio.run(run())
     
     except KeyboardInterrupt:
         print("Program terminated by user")
+        if reading_cache is not None:
+            reading_cache.spill()
     
     except Exception as e:
-        print(f"Unhandled exception in main loop: {e}")
+        print(f"Unhandled exception in a task: {e}")
         display_error(f"System error: {e}")
         
+        # Keep the cached readings across the reset
+        if reading_cache is not None:
+            try:
+                reading_cache.spill()
+            except Exception as spill_error:
+                print(f"Error saving cached readings: {spill_error}")
+        
         # Try to restart after a delay
         time.sleep(10)
         machine.reset()
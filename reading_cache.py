@@ -0,0 +1,278 @@
+"""
+ESP32 Environmental Monitoring System - Reading Cache
+
+This module keeps readings that could not be uploaded yet. Readings are stored as packed
+binary records in a fixed-size ring buffer allocated once at startup, so thousands of
+them fit in RAM without fragmenting the heap. When the ring buffer is full, or before
+the device resets, its records are appended to a file in flash that survives resets.
+Readings are handed out and removed oldest first, flash before RAM.
+
+The module only uses os and struct, so it also runs on a regular Python interpreter.
+"""
+
+import os
+import struct
+
+#===============================================================================
+# RECORD FORMAT
+#===============================================================================
+# A record is a timestamp (uint32 seconds) followed by the values in a struct format
+# chosen by the caller: "f" (float32), "h" (int16) or "H" (uint16) per value. By default
+# these are temperature, humidity, light level and soil moisture as float32.
+VALUE_FORMAT = "ffff"
+
+# Format of the records in flash files written before the format was stored with them
+LEGACY_RECORD_FORMAT = "<Iffff"
+
+# Bytes copied at a time when the flash file is compacted
+COPY_CHUNK_SIZE = 512
+
+NAN = float("nan")
+
+# Stored in place of missing values
+MISSING = {"f": NAN, "h": -32768, "H": 65535}
+
+def pack_values(value_format, values):
+    """Replace missing values with the MISSING value of their type."""
+    return [MISSING[code] if value is None else value for code, value in zip(value_format, values)]
+
+def unpack_values(value_format, values):
+    """Replace the MISSING values with None."""
+    return tuple(
+        None if value != value or (code != "f" and value == MISSING[code]) else value
+        for code, value in zip(value_format, values)
+    )
+
+#===============================================================================
+# READING CACHE
+#===============================================================================
+class ReadingCache:
+    """Ring buffer of packed reading records with an append-only flash spill file.
+
+    Every record in the flash file is older than every record in RAM. The file is read
+    from a position that is stored next to it (spill_path + ".pos"), together with the
+    record format, and advanced as readings are removed; once the whole file has been
+    read it is deleted.
+    """
+
+    def __init__(self, capacity, spill_path=None, spill_max_records=20000, value_format=VALUE_FORMAT):
+        self.value_format = value_format
+        self.record_format = "<I" + value_format
+        self.record_size = struct.calcsize(self.record_format)
+
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * self.record_size)
+        self.head = 0   # index of the oldest record in RAM
+        self.count = 0  # records in RAM
+
+        self.spill_path = spill_path
+        self.spill_max_records = spill_max_records
+        self.file_size = 0      # bytes in the flash file
+        self.file_position = 0  # offset of the oldest unread record in the flash file
+        if spill_path:
+            self._open_spill_file()
+
+    def __len__(self):
+        return self.flash_count + self.count
+
+    @property
+    def flash_count(self):
+        """Records waiting in the flash file."""
+        return (self.file_size - self.file_position) // self.record_size
+
+    def append(self, timestamp, values):
+        """Add a reading; values are in the order of the value format, None if missing."""
+        if self.count == self.capacity:
+            if self.spill_path:
+                self.spill()
+            else:
+                # No flash file: overwrite the oldest reading
+                self.head = (self.head + 1) % self.capacity
+                self.count -= 1
+
+        index = (self.head + self.count) % self.capacity
+        struct.pack_into(
+            self.record_format, self.buffer, index * self.record_size,
+            int(timestamp), *pack_values(self.value_format, values)
+        )
+        self.count += 1
+
+    def oldest(self):
+        """Yield (timestamp, values) of the cached readings, oldest first.
+
+        The cache must not be changed while the generator is in use.
+        """
+        if self.flash_count:
+            record = bytearray(self.record_size)
+            with open(self.spill_path, "rb") as f:
+                f.seek(self.file_position)
+                for _ in range(self.flash_count):
+                    f.readinto(record)
+                    fields = struct.unpack(self.record_format, record)
+                    yield fields[0], unpack_values(self.value_format, fields[1:])
+
+        for i in range(self.count):
+            offset = (self.head + i) % self.capacity * self.record_size
+            fields = struct.unpack_from(self.record_format, self.buffer, offset)
+            yield fields[0], unpack_values(self.value_format, fields[1:])
+
+    def drop(self, num_records):
+        """Remove the given number of oldest readings, e.g. once they have been uploaded."""
+        from_flash = min(num_records, self.flash_count)
+        if from_flash:
+            self.file_position += from_flash * self.record_size
+            if self.file_position >= self.file_size:
+                self._remove_spill_file()
+            else:
+                self._save_position()
+
+        from_ram = min(num_records - from_flash, self.count)
+        self.head = (self.head + from_ram) % self.capacity
+        self.count -= from_ram
+        if self.count == 0:
+            self.head = 0
+
+    def drop_through(self, timestamp):
+        """Remove the oldest readings up to and including the given timestamp.
+
+        Unlike drop, this is safe when the oldest readings may have been evicted since
+        they were read, e.g. while a batch was being uploaded: readings added since are
+        newer and stay. Returns the number of readings removed.
+        """
+        count = 0
+        records = self.oldest()
+        try:
+            for record_timestamp, _ in records:
+                if record_timestamp > timestamp:
+                    break
+                count += 1
+        finally:
+            records.close()
+        self.drop(count)
+        return count
+
+    def spill(self):
+        """Move the readings in RAM to the flash file, e.g. before the device resets."""
+        if not self.spill_path or self.count == 0:
+            return
+
+        # The records in RAM as at most two contiguous slices of the ring buffer
+        size = self.record_size
+        view = memoryview(self.buffer)
+        end = self.head + self.count
+        if end <= self.capacity:
+            chunks = [view[self.head * size:end * size]]
+        else:
+            chunks = [view[self.head * size:], view[:(end - self.capacity) * size]]
+        new_bytes = self.count * size
+
+        # Keep the newest readings within the size limit of the file
+        limit = self.spill_max_records * size
+        overflow = (self.file_size - self.file_position) + new_bytes - limit
+        if overflow > 0:
+            print(f"Reading cache full, {overflow // size} oldest readings dropped")
+            dropped = min(overflow, self.file_size - self.file_position)
+            self.file_position += dropped
+            if overflow > dropped:
+                # More new readings than fit into the file at all
+                chunks = [memoryview(b"".join(bytes(chunk) for chunk in chunks))[overflow - dropped:]]
+                new_bytes -= overflow - dropped
+        if self.file_size + new_bytes > limit and self.file_position > 0:
+            self._compact()
+
+        with open(self.spill_path, "ab") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        self.file_size += new_bytes
+        self._save_position()
+
+        self.head = 0
+        self.count = 0
+        print(f"{new_bytes // size} cached readings moved to flash ({self.flash_count} in flash)")
+
+    #===========================================================================
+    # FLASH FILE
+    #===========================================================================
+    def _open_spill_file(self):
+        """Pick up the readings left in the flash file by an earlier run."""
+        try:
+            self.file_size = os.stat(self.spill_path)[6]
+        except OSError:
+            return
+
+        file_format = LEGACY_RECORD_FORMAT
+        try:
+            with open(self.spill_path + ".pos") as f:
+                position, _, stored_format = f.read().partition(" ")
+            self.file_position = int(position)
+            file_format = stored_format.strip() or file_format
+        except (OSError, ValueError):
+            self.file_position = 0
+
+        if self.file_position >= self.file_size:
+            self._remove_spill_file()
+        elif file_format != self.record_format:
+            # Written by firmware with a different record format
+            self._convert(file_format)
+        elif self.file_size % self.record_size or self.file_position % self.record_size:
+            # A write was cut short by a reset; keep the whole records only
+            self.file_position -= self.file_position % self.record_size
+            self._compact()
+        print(f"{self.flash_count} cached readings found in flash")
+
+    def _save_position(self):
+        with open(self.spill_path + ".pos", "w") as f:
+            f.write(f"{self.file_position} {self.record_format}")
+
+    def _remove_spill_file(self):
+        for path in (self.spill_path, self.spill_path + ".pos"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.file_size = 0
+        self.file_position = 0
+
+    def _compact(self):
+        """Rewrite the flash file without the records that have been read."""
+        temp_path = self.spill_path + ".tmp"
+        remaining = self.flash_count * self.record_size
+        chunk = bytearray(COPY_CHUNK_SIZE)
+        with open(self.spill_path, "rb") as source, open(temp_path, "wb") as target:
+            source.seek(self.file_position)
+            while remaining > 0:
+                num_bytes = source.readinto(chunk)
+                if not num_bytes:
+                    break
+                num_bytes = min(num_bytes, remaining)
+                target.write(memoryview(chunk)[:num_bytes])
+                remaining -= num_bytes
+
+        self._replace_spill_file(temp_path)
+
+    def _convert(self, file_format):
+        """Rewrite the unread records of a file in another record format in this cache's format.
+
+        Values are matched by position; values the old records lack are missing.
+        """
+        temp_path = self.spill_path + ".tmp"
+        old_size = struct.calcsize(file_format)
+        old_value_format = file_format[2:]
+        missing = [None] * len(self.value_format)
+        record = bytearray(old_size)
+        with open(self.spill_path, "rb") as source, open(temp_path, "wb") as target:
+            source.seek(self.file_position - self.file_position % old_size)
+            while source.readinto(record) == old_size:
+                fields = struct.unpack(file_format, record)
+                values = (list(unpack_values(old_value_format, fields[1:])) + missing)[:len(self.value_format)]
+                target.write(struct.pack(self.record_format, fields[0], *pack_values(self.value_format, values)))
+
+        print("Cached readings in flash converted to the current record format")
+        self._replace_spill_file(temp_path)
+
+    def _replace_spill_file(self, temp_path):
+        os.remove(self.spill_path)
+        os.rename(temp_path, self.spill_path)
+        self.file_size = os.stat(self.spill_path)[6]
+        self.file_position = 0
+        self._save_position()
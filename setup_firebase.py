@@ -165,7 +165,17 @@ def guide_database_rules():
 {
   "rules": {
     ".read": true,
-    ".write": true
+    ".write": true,
+    "readings": {
+      "$device_id": {
+        ".indexOn": ["timestamp"]
+      }
+    },
+    "health": {
+      "$device_id": {
+        ".indexOn": ["timestamp"]
+      }
+    }
   }
 }
 """)
@@ -176,12 +186,23 @@ def guide_database_rules():
     "readings": {
       "$device_id": {
         ".read": true,
-        ".write": "auth != null"
+        ".write": "auth != null",
+        ".indexOn": ["timestamp"]
+      }
+    },
+    "health": {
+      "$device_id": {
+        ".read": true,
+        ".write": "auth != null",
+        ".indexOn": ["timestamp"]
       }
     }
   }
 }
 """)
+    print("The \".indexOn\" rule lets the dashboard download only the selected time range")
+    print("instead of every reading a device has ever sent; devices upload health records")
+    print("(see telemetry.py) to the \"health\" node, which is queried the same way.")
     
     print("\nTo set these rules:")
     print("1. In the Firebase Console, go to your project")
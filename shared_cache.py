@@ -0,0 +1,189 @@
+"""
+ESP32 Environmental Monitoring Dashboard - Shared Cache
+
+This module contains the process-wide cache of query results shared by all browser
+sessions. Concurrent requests for the same key wait for a single in-flight computation
+instead of each querying Firebase, and the cache keeps the most recently used results
+within a memory budget. It has no dependency on Streamlit.
+
+Features:
+- Single-flight computation: one fetch per key, however many sessions ask at once
+- LRU eviction by estimated result size in bytes, with per-entry expiry
+- Hit, miss, coalesced-request and eviction counters per kind of result
+"""
+
+import collections
+import sys
+import threading
+import time
+
+import numpy as np
+
+from startup import lazy_import
+
+pd = lazy_import('pandas')
+
+# Default memory budget of the cached results (bytes)
+DEFAULT_MAX_BYTES = 250_000_000
+
+# Events counted per kind of result
+CACHE_EVENTS = ('hits', 'coalesced', 'misses', 'errors', 'expirations', 'evictions', 'oversized')
+
+def estimate_size(value):
+    """Estimate the memory used by a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+class _Flight:
+    """A computation in progress that other requests for the same key wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.finished = False  # True once the value is set
+        self.value = None
+        self.error = None
+
+class SharedCache:
+    """Memory-bounded LRU cache with single-flight computation of missing values.
+
+    Keys are tuples whose first element names the kind of result (e.g. 'device_data'),
+    which the counters are kept by. Cached values are shared by all callers, so they
+    must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()  # key -> (value, size, expires), least recent first
+        self.flights = {}                         # key -> _Flight
+        self.bytes = 0
+        self.counts = collections.defaultdict(collections.Counter)  # kind -> event -> count
+
+    def get(self, key, compute, ttl=None):
+        """Return the cached value of key, computing it with compute() if it is missing.
+
+        While a value is being computed, other requests for the same key wait for it
+        and share the result, or the exception it raised. Values expire ttl seconds
+        after they are computed (never if ttl is None).
+        """
+        kind = key[0]
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    value, _, expires = entry
+                    if expires is None or time.monotonic() < expires:
+                        self.entries.move_to_end(key)
+                        self.counts[kind]['hits'] += 1
+                        return value
+                    self._remove(key)
+                    self.counts[kind]['expirations'] += 1
+
+                flight = self.flights.get(key)
+                if flight is None:
+                    flight = self.flights[key] = _Flight()
+                    self.counts[kind]['misses'] += 1
+                    break
+                self.counts[kind]['coalesced'] += 1
+
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.finished:
+                return flight.value
+            # The computing thread was interrupted (e.g. its script run was stopped): try again
+
+        try:
+            flight.value = compute()
+            flight.finished = True
+        except Exception as e:
+            flight.error = e
+            with self.lock:
+                self.counts[kind]['errors'] += 1
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+                if flight.finished:
+                    self._store(key, flight.value, ttl)
+            flight.done.set()
+        return flight.value
+
+    def _store(self, key, value, ttl):
+        """Add a computed value and evict the least recently used values over the budget."""
+        kind = key[0]
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            self.counts[kind]['oversized'] += 1
+            return
+
+        expires = time.monotonic() + ttl if ttl is not None else None
+        self.entries[key] = (value, size, expires)
+        self.bytes += size
+
+        while self.bytes > self.max_bytes:
+            evicted_key, (_, evicted_size, _) = next(iter(self.entries.items()))
+            self._remove(evicted_key)
+            self.counts[evicted_key[0]]['evictions'] += 1
+            self.counts[evicted_key[0]]['evicted_bytes'] += evicted_size
+
+    def _remove(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def invalidate(self, predicate):
+        """Drop the cached values whose key matches predicate(key); returns how many were dropped."""
+        with self.lock:
+            keys = [key for key in self.entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def summary(self):
+        """Return ({kind: {event: count}}, entries, bytes used, flights in progress).
+
+        Besides CACHE_EVENTS, the counts include 'evicted_bytes', the total size of the
+        evicted values.
+        """
+        with self.lock:
+            counts = {
+                kind: {event: counter[event] for event in CACHE_EVENTS + ('evicted_bytes',)}
+                for kind, counter in self.counts.items()
+            }
+            return counts, len(self.entries), self.bytes, len(self.flights)
+
+    def to_prometheus(self):
+        """Render the cache counters and memory use in the Prometheus text exposition format."""
+        counts, entries, used_bytes, flights = self.summary()
+        lines = [
+            "# HELP dashboard_cache_events_total Shared cache requests and evictions by kind of result.",
+            "# TYPE dashboard_cache_events_total counter",
+        ]
+        for kind in sorted(counts):
+            for event in CACHE_EVENTS:
+                lines.append(f'dashboard_cache_events_total{{kind="{kind}",event="{event}"}} {counts[kind][event]}')
+
+        lines.append("# HELP dashboard_cache_evicted_bytes_total Estimated size of the evicted results.")
+        lines.append("# TYPE dashboard_cache_evicted_bytes_total counter")
+        for kind in sorted(counts):
+            lines.append(f'dashboard_cache_evicted_bytes_total{{kind="{kind}"}} {counts[kind]["evicted_bytes"]}')
+
+        for metric, help_text, value in (
+            ('dashboard_cache_bytes', "Estimated memory used by cached results.", used_bytes),
+            ('dashboard_cache_max_bytes', "Memory budget of the cached results.", self.max_bytes),
+            ('dashboard_cache_entries', "Cached results.", entries),
+            ('dashboard_cache_inflight', "Results being computed.", flights),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,102 @@
+"""
+ESP32 Environmental Monitoring Dashboard - Startup
+
+This module keeps the dashboard's cold start short and measurable. Heavy libraries are
+imported when they are first used instead of when the dashboard loads, and the imports
+and initialization steps of the first run are timed so their costs can be reported.
+It has no dependency on Streamlit.
+
+Features:
+- Thread-safe lazily imported modules
+- Timings of imports and initialization steps until the first run finishes
+- Plain text startup report
+"""
+
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Startup timings are relative to the first import of this module, early in the first run
+STARTED = time.perf_counter()
+
+# (step, thread name, start in seconds since STARTED, duration in seconds)
+_timings = []
+_lock = threading.Lock()
+_finished = None  # seconds from STARTED to the end of the first run
+
+@contextmanager
+def startup_step(name):
+    """Time a step of the startup; does nothing once the first run has finished."""
+    if _finished is not None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _timings.append((name, threading.current_thread().name, start - STARTED, time.perf_counter() - start))
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    The import goes through importlib, whose module locks make threads that first use
+    the module at the same time wait for a single import.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._load()
+        return getattr(module, attr)
+
+    def _load(self):
+        if self._name in sys.modules:
+            module = importlib.import_module(self._name)
+        else:
+            with startup_step(f"import {self._name}"):
+                module = importlib.import_module(self._name)
+        self._module = module
+        return module
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+def lazy_import(name):
+    """Return a stand-in for a module that imports it when it is first used."""
+    return LazyModule(name)
+
+def preload(*names):
+    """Import modules now, e.g. in a background thread before they are needed."""
+    for name in names:
+        LazyModule(name)._load()
+
+def finish_startup():
+    """Mark the first run as finished; returns True for the call that did so."""
+    global _finished
+    with _lock:
+        if _finished is not None:
+            return False
+        _finished = time.perf_counter() - STARTED
+        return True
+
+def startup_timings():
+    """Return the recorded steps as (step, thread, start, seconds), in the order they started."""
+    with _lock:
+        return sorted(_timings, key=lambda timing: timing[2])
+
+def startup_report():
+    """Return the startup timings as a plain text table."""
+    lines = [f"{'step':<32} {'thread':<16} {'start (s)':>9} {'time (s)':>9}"]
+    for name, thread, start, seconds in startup_timings():
+        lines.append(f"{name:<32} {thread[:16]:<16} {start:>9.3f} {seconds:>9.3f}")
+    if _finished is not None:
+        lines.append(f"{'first run finished':<32} {'':<16} {_finished:>9.3f}")
+    return "\n".join(lines)
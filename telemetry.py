@@ -0,0 +1,155 @@
+"""
+ESP32 Environmental Monitoring System - Telemetry
+
+This module keeps statistics about the firmware itself: how long each stage of the
+program takes (measured with ticks_us), how late the event loop wakes up tasks, how long
+uploads take and how often they fail. Together with the free heap, the number of cached
+readings and the WiFi signal strength they are summarized in a compact health record,
+which is uploaded next to the readings. Recording a measurement doesn't allocate memory.
+
+The module runs on MicroPython and on a regular Python interpreter.
+"""
+
+import time
+from array import array
+
+try:
+    ticks_us = time.ticks_us
+    ticks_diff = time.ticks_diff
+except AttributeError:
+    # Regular Python
+    def ticks_us():
+        return time.perf_counter_ns() // 1000
+
+    def ticks_diff(end, start):
+        return end - start
+
+# Stages of the firmware that are timed, in the order they appear in health records
+STAGES = ("read_sensors", "sample_dht", "display", "upload", "loop_lag")
+
+# Number of recent upload latencies the percentiles are taken over
+LATENCY_WINDOW = 64
+
+# Upload latency percentiles in health records
+LATENCY_PERCENTILES = (50, 90)
+
+#===============================================================================
+# STAGE TIMING
+#===============================================================================
+class Stage:
+    """Count, total and maximum duration of one stage of the program, in microseconds.
+
+    Used as a context manager around the code of the stage, e.g.
+    ``with telemetry.stage("display"): ...``; durations can also be added directly.
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def add(self, duration_us):
+        self.count += 1
+        self.total_us += duration_us
+        if duration_us > self.max_us:
+            self.max_us = duration_us
+
+    def __enter__(self):
+        self.started = ticks_us()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.add(ticks_diff(ticks_us(), self.started))
+
+#===============================================================================
+# TELEMETRY
+#===============================================================================
+class Telemetry:
+    """Health statistics of the firmware since the last health record was uploaded.
+
+    Stage timings, upload and failure counts and the lowest free heap cover the period
+    since reset was last called, so no period is lost when a health record can't be
+    uploaded. Upload latencies are kept for the last LATENCY_WINDOW uploads.
+
+    Uptime and periods are measured with time.time(), which unlike the ticks counters
+    doesn't wrap around, so create it once the clock has been set.
+    """
+
+    def __init__(self):
+        self.stages = {name: Stage() for name in STAGES}
+        self.latencies = array("I", [0] * LATENCY_WINDOW)  # milliseconds
+        self.latency_count = 0  # latencies recorded since startup
+        self.started = time.time()
+        self.reset()
+
+    def reset(self):
+        """Start a new period, e.g. after its health record has been uploaded."""
+        for stage in self.stages.values():
+            stage.reset()
+        self.period_start = time.time()
+        self.uploads = 0
+        self.upload_failures = 0
+        self.min_mem_free = None
+
+    def stage(self, name):
+        """Return the Stage of the given name."""
+        return self.stages[name]
+
+    def due(self, interval):
+        """Return True if a health record is due, i.e. the period lasted interval seconds."""
+        return bool(interval) and time.time() - self.period_start >= interval
+
+    def record_upload(self, latency_ms, success):
+        """Add an upload request that took latency_ms milliseconds."""
+        self.uploads += 1
+        if not success:
+            self.upload_failures += 1
+        self.latencies[self.latency_count % LATENCY_WINDOW] = latency_ms
+        self.latency_count += 1
+
+    def record_memory(self, mem_free):
+        """Add a measurement of the free heap, e.g. after a garbage collection."""
+        if self.min_mem_free is None or mem_free < self.min_mem_free:
+            self.min_mem_free = mem_free
+
+    def latency_percentiles(self):
+        """Return the LATENCY_PERCENTILES and the maximum of the recent upload latencies (ms)."""
+        count = min(self.latency_count, LATENCY_WINDOW)
+        if count == 0:
+            return [None] * (len(LATENCY_PERCENTILES) + 1)
+        latencies = sorted(self.latencies[:count])
+        # Nearest-rank percentiles
+        return [latencies[max(0, (p * count + 99) // 100 - 1)] for p in LATENCY_PERCENTILES] + [latencies[-1]]
+
+    def health_record(self, mem_free, cache_depth, rssi):
+        """Return the health record of the current period as a dictionary.
+
+        Stage timings are given as the mean and maximum duration in microseconds
+        (<stage>_us and <stage>_max_us), upload latencies in milliseconds.
+        """
+        self.record_memory(mem_free)
+        now = time.time()
+        record = {
+            "timestamp": now,
+            "uptime": int(now - self.started),
+            "period": int(now - self.period_start),
+            "mem_free": mem_free,
+            "mem_min_free": self.min_mem_free,
+            "cache": cache_depth,
+            "rssi": rssi,
+            "uploads": self.uploads,
+            "upload_failures": self.upload_failures,
+        }
+        percentiles = self.latency_percentiles()
+        for p, latency in zip(LATENCY_PERCENTILES, percentiles):
+            record[f"upload_p{p}_ms"] = latency
+        record["upload_max_ms"] = percentiles[-1]
+        for name, stage in self.stages.items():
+            if stage.count:
+                record[f"{name}_us"] = stage.total_us // stage.count
+                record[f"{name}_max_us"] = stage.max_us
+        return record
@@ -0,0 +1,33 @@
+"""
+Shared fixtures of the tests.
+
+The tests run on a regular Python interpreter with pytest, from the repository root:
+
+    python -m pytest
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+# Make the modules of the repository importable when run from any directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_rtdb import LocalDatabase, make_server
+
+@pytest.fixture
+def rtdb_server():
+    """A local_rtdb server on a free port, running in a background thread."""
+    server = make_server(LocalDatabase(), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def server_url(server):
+    """Return the base URL of a server created by make_server."""
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/"
@@ -0,0 +1,171 @@
+"""
+Tests of the dashboard's numeric code against straightforward reference implementations
+on seeded data: LTTB downsampling, rollups and the incremental statistics.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing import (
+    PARAMETERS,
+    RollupPyramid,
+    StatisticsAccumulator,
+    calculate_statistics,
+    generate_sample_data,
+    lttb_indices,
+)
+
+START = 1_700_000_000
+
+def sample_frame(days=3, seed=1, missing=0.05):
+    """Seeded sample readings every 5 minutes, with some values missing."""
+    df = generate_sample_data('device', START, START + days * 86400, seed=seed)
+    rng = np.random.default_rng(seed)
+    for param in PARAMETERS:
+        df.loc[rng.random(len(df)) < missing, param] = np.nan
+    return df
+
+def chunks_of(df, size):
+    return [df.iloc[i:i + size] for i in range(0, len(df), size)]
+
+#===============================================================================
+# LTTB
+#===============================================================================
+def reference_lttb(x, y, max_points):
+    """Largest-Triangle-Three-Buckets, one point and one triangle at a time."""
+    n = len(x)
+    edges = [int(edge) for edge in np.linspace(1, n - 1, max_points - 1)]
+    selected = [0]
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = sum(x[end:next_end]) / (next_end - end)
+        avg_y = sum(y[end:next_end]) / (next_end - end)
+        a = selected[-1]
+        best, best_area = start, -1
+        for j in range(start, end):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+    return selected + [n - 1]
+
+@pytest.mark.parametrize('n, max_points', [(1000, 100), (1001, 37), (5000, 500), (10, 3)])
+def test_lttb_matches_reference(n, max_points):
+    rng = np.random.default_rng(n)
+    x = np.sort(rng.uniform(0, 1e6, n))
+    y = np.cumsum(rng.normal(size=n))
+    assert lttb_indices(x, y, max_points).tolist() == reference_lttb(x.tolist(), y.tolist(), max_points)
+
+def test_lttb_preserves_peaks_and_troughs():
+    rng = np.random.default_rng(7)
+    n = 20_000
+    x = np.arange(n, dtype=float) * 60
+    y = rng.normal(size=n)
+    spikes = rng.choice(np.arange(1, n - 1), 20, replace=False)
+    y[spikes] = np.where(np.arange(20) % 2, 50.0, -50.0)
+
+    indices = lttb_indices(x, y, 500)
+    assert set(spikes) <= set(indices.tolist())
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert np.all(np.diff(indices) > 0)
+
+def test_lttb_keeps_short_series():
+    assert lttb_indices(np.arange(5.0), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+#===============================================================================
+# ROLLUPS
+#===============================================================================
+def reference_buckets(df, bucket_seconds):
+    """Mean, standard deviation, minimum, maximum and count of every bucket with pandas."""
+    buckets = df['timestamp'] // bucket_seconds * bucket_seconds
+    return df[PARAMETERS].groupby(buckets).agg(['mean', 'std', 'min', 'max', 'count'])
+
+@pytest.mark.parametrize('tier, bucket_seconds', [('1min', 60), ('1hour', 3600), ('1day', 86400)])
+def test_rollup_buckets_match_reference(tier, bucket_seconds):
+    df = sample_frame()
+    pyramid = RollupPyramid()
+    for chunk in chunks_of(df, 97):
+        pyramid.ingest(chunk)
+    frame = pyramid.frame(tier, START, START + 3 * 86400).set_index('timestamp')
+    reference = reference_buckets(df, bucket_seconds)
+
+    assert frame.index.tolist() == reference.index.astype(float).tolist()
+    for param in PARAMETERS:
+        np.testing.assert_allclose(frame[param], reference[(param, 'mean')])
+        np.testing.assert_allclose(frame[f'{param}_std'], reference[(param, 'std')], atol=1e-9)
+        np.testing.assert_array_equal(frame[f'{param}_min'], reference[(param, 'min')])
+        np.testing.assert_array_equal(frame[f'{param}_max'], reference[(param, 'max')])
+        np.testing.assert_array_equal(frame[f'{param}_count'], reference[(param, 'count')])
+
+def test_rollup_statistics_match_raw_statistics():
+    df = sample_frame()
+    pyramid = RollupPyramid()
+    pyramid.ingest(df)
+    raw = calculate_statistics(df)
+    for tier in ('1min', '1hour', '1day'):
+        rollup = calculate_statistics(pyramid.frame(tier, START, START + 3 * 86400))
+        for param in PARAMETERS:
+            assert rollup[param]['count'] == raw[param]['count']
+            assert rollup[param]['min'] == raw[param]['min']
+            assert rollup[param]['max'] == raw[param]['max']
+            assert rollup[param]['avg'] == pytest.approx(raw[param]['avg'], rel=1e-12)
+            assert rollup[param]['std'] == pytest.approx(raw[param]['std'], rel=1e-9)
+
+#===============================================================================
+# STATISTICS
+#===============================================================================
+def test_statistics_match_reference():
+    df = sample_frame()
+    stats = calculate_statistics(df)
+    hours = df['timestamp'].to_numpy() / 3600
+    for param in PARAMETERS:
+        values = df[param].to_numpy()
+        present = ~np.isnan(values)
+        slope = np.polyfit(hours[present], values[present], 1)[0]
+        assert stats[param]['count'] == present.sum()
+        assert stats[param]['min'] == np.nanmin(values)
+        assert stats[param]['max'] == np.nanmax(values)
+        assert stats[param]['avg'] == pytest.approx(np.nanmean(values), rel=1e-12)
+        assert stats[param]['std'] == pytest.approx(np.nanstd(values, ddof=1), rel=1e-9)
+        assert stats[param]['slope'] == pytest.approx(slope, rel=1e-6, abs=1e-12)
+
+@pytest.mark.parametrize('chunk_size', [1, 50, 333])
+def test_incremental_statistics_match_full_recompute(chunk_size):
+    df = sample_frame(days=2)
+    accumulator = StatisticsAccumulator()
+    for chunk in chunks_of(df, chunk_size):
+        accumulator.update(chunk)
+    incremental = accumulator.result()
+    full = calculate_statistics(df)
+    for param in PARAMETERS:
+        for key in ('count', 'min', 'max'):
+            assert incremental[param][key] == full[param][key]
+        for key in ('avg', 'std', 'slope', 'trend'):
+            assert incremental[param][key] == pytest.approx(full[param][key], rel=1e-9, abs=1e-12)
+
+def test_incremental_rollup_statistics_match_full_recompute():
+    pyramid = RollupPyramid()
+    pyramid.ingest(sample_frame())
+    frame = pyramid.frame('1hour', START, START + 3 * 86400)
+    accumulator = StatisticsAccumulator()
+    for chunk in chunks_of(frame, 10):
+        accumulator.update(chunk)
+    incremental = accumulator.result()
+    full = calculate_statistics(frame)
+    for param in PARAMETERS:
+        assert incremental[param]['count'] == full[param]['count']
+        for key in ('avg', 'std', 'slope'):
+            assert incremental[param][key] == pytest.approx(full[param][key], rel=1e-9, abs=1e-12)
+
+def test_statistics_of_empty_and_constant_data():
+    empty = calculate_statistics(pd.DataFrame(columns=['timestamp'] + PARAMETERS))
+    assert all(stats['count'] == 0 and stats['slope'] == 0.0 for stats in empty.values())
+
+    df = pd.DataFrame({'timestamp': [START, START + 60, START + 120]})
+    for param in PARAMETERS:
+        df[param] = 5.0
+    stats = calculate_statistics(df)
+    assert stats['temperature']['std'] == 0.0
+    assert stats['temperature']['slope'] == 0.0
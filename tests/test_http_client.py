@@ -0,0 +1,103 @@
+"""
+Tests of the firmware's keep-alive HTTP client against local_rtdb.py.
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from conftest import server_url
+from http_client import HTTPClient
+from local_rtdb import RequestHandler
+
+class IdleClosingHandler(RequestHandler):
+    """Closes connections that are idle for longer than timeout, like Firebase does."""
+    timeout = 0.2
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_connection_is_kept_alive(rtdb_server):
+    client = HTTPClient(server_url(rtdb_server))
+
+    async def requests():
+        put = await client.request("PUT", "/readings/dev/r1.json", json.dumps({"timestamp": 1}))
+        get = await client.request("GET", "/readings/dev.json")
+        missing = await client.request("GET", "/readings/other.json")
+        client.close()
+        return put, get, missing
+
+    put, get, missing = run(requests())
+    assert put.status_code == 200
+    assert json.loads(get.text) == {"r1": {"timestamp": 1}}
+    assert missing.text == "null"
+    assert client.connections == 1
+
+def test_reconnects_after_server_closed_connection(rtdb_server):
+    rtdb_server.RequestHandlerClass = IdleClosingHandler
+    client = HTTPClient(server_url(rtdb_server))
+
+    async def requests():
+        first = await client.request("PUT", "/a.json", "1")
+        await asyncio.sleep(IdleClosingHandler.timeout * 3)
+        # Sent on the closed connection first, then again on a new one
+        second = await client.request("GET", "/a.json")
+        client.close()
+        return first, second
+
+    first, second = run(requests())
+    assert first.status_code == 200
+    assert (second.status_code, second.text) == (200, "1")
+    assert client.connections == 2
+
+def test_silent_patch(rtdb_server):
+    client = HTTPClient(server_url(rtdb_server))
+
+    async def requests():
+        patch = await client.request(
+            "PATCH", "/readings/dev.json?print=silent",
+            json.dumps({"r1": {"timestamp": 1}, "r2": {"timestamp": 2}}),
+        )
+        # The empty 204 response must not desynchronize the kept-alive connection
+        get = await client.request("GET", "/readings/dev/r2.json")
+        client.close()
+        return patch, get
+
+    patch, get = run(requests())
+    assert (patch.status_code, patch.body) == (204, b"")
+    assert json.loads(get.text) == {"timestamp": 2}
+    assert client.connections == 1
+
+def test_query_is_appended_to_requests(rtdb_server):
+    client = HTTPClient(server_url(rtdb_server) + "readings", query="print=silent")
+
+    async def requests():
+        response = await client.request("PUT", "/dev/r1.json", json.dumps({"timestamp": 1}))
+        client.close()
+        return response
+
+    assert run(requests()).status_code == 204
+    assert rtdb_server.database.get(["readings", "dev", "r1"]) == {"timestamp": 1}
+
+def test_timeout(rtdb_server):
+    rtdb_server.latency = 0.5
+    client = HTTPClient(server_url(rtdb_server), timeout=0.1)
+
+    async def requests():
+        started = time.monotonic()
+        with pytest.raises(OSError, match="timed out"):
+            await client.request("GET", "/a.json")
+        elapsed = time.monotonic() - started
+
+        # The connection is in an unknown state after a timeout, so a new one is opened
+        rtdb_server.latency = 0
+        response = await client.request("GET", "/a.json", timeout=5)
+        client.close()
+        return elapsed, response
+
+    elapsed, response = run(requests())
+    assert elapsed < 0.4
+    assert response.status_code == 200
+    assert client.connections == 2
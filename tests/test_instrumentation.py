@@ -0,0 +1,78 @@
+"""
+Tests of counting the bytes the dashboard downloads.
+"""
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from conftest import server_url
+from instrumentation import RerunProfile, install_byte_counter
+
+BODY = json.dumps({f"r{i}": {"timestamp": i, "readings": {"temperature": 21.5}} for i in range(500)}).encode()
+COMPRESSED = gzip.compress(BODY)
+
+class GzipHandler(BaseHTTPRequestHandler):
+    """Serves BODY gzip-compressed, with a Content-Length or chunked."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Encoding', 'gzip')
+        if self.path == '/chunked':
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for start in range(0, len(COMPRESSED), 1000):
+                chunk = COMPRESSED[start:start + 1000]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header('Content-Length', str(len(COMPRESSED)))
+            self.end_headers()
+            self.wfile.write(COMPRESSED)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def gzip_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), GzipHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def downloaded_bytes(url):
+    """Return the bytes counted for a GET request in a profile stage, and the response."""
+    session = requests.Session()
+    install_byte_counter(session)
+    profile = RerunProfile()
+    with profile.stage('outer'):
+        with profile.stage('query'):
+            response = session.get(url)
+    assert profile.stages[0].bytes == profile.stages[1].bytes
+    return profile.stages[1].bytes, response
+
+@pytest.mark.parametrize('path', ['/', '/chunked'])
+def test_compressed_responses_count_transferred_bytes(gzip_server, path):
+    num_bytes, response = downloaded_bytes(server_url(gzip_server) + path.lstrip('/'))
+    assert response.content == BODY
+    assert num_bytes == len(COMPRESSED) < len(BODY) / 4
+
+def test_uncompressed_responses_count_the_body(rtdb_server):
+    rtdb_server.database.set(['readings'], json.loads(BODY))
+    num_bytes, response = downloaded_bytes(server_url(rtdb_server) + 'readings.json')
+    assert num_bytes == len(response.content) > 0
+
+def test_counter_is_installed_once():
+    session = requests.Session()
+    install_byte_counter(session)
+    install_byte_counter(session)
+    assert len(session.hooks['response']) == 1
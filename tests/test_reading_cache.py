@@ -0,0 +1,216 @@
+"""
+Tests of the firmware's reading cache and of uploading the cached readings.
+
+The flash spill file is a file in a temporary directory.
+"""
+
+import asyncio
+import importlib
+import json
+import struct
+import sys
+import types
+
+import pytest
+
+from reading_cache import LEGACY_RECORD_FORMAT, ReadingCache
+
+FORMAT = "fhH"
+
+def fill(cache, timestamps):
+    for timestamp in timestamps:
+        cache.append(timestamp, (timestamp / 2, -timestamp, timestamp))
+
+def timestamps(cache):
+    return [timestamp for timestamp, _ in cache.oldest()]
+
+#===============================================================================
+# RING BUFFER
+#===============================================================================
+def test_values_round_trip_with_missing_values():
+    cache = ReadingCache(4, value_format=FORMAT)
+    cache.append(100, (21.5, -40, 7))
+    cache.append(101, (None, None, None))
+    assert list(cache.oldest()) == [(100, (21.5, -40, 7)), (101, (None, None, None))]
+
+def test_ring_buffer_overwrites_oldest_without_flash():
+    cache = ReadingCache(3, value_format=FORMAT)
+    fill(cache, range(1, 6))
+    assert len(cache) == 3
+    assert timestamps(cache) == [3, 4, 5]
+
+    cache.drop(2)
+    fill(cache, [6, 7])
+    assert timestamps(cache) == [5, 6, 7]
+    assert list(cache.oldest())[0] == (5, (2.5, -5, 5))
+
+#===============================================================================
+# FLASH SPILL FILE
+#===============================================================================
+def test_full_ring_buffer_spills_to_flash(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    cache = ReadingCache(2, path, value_format=FORMAT)
+    fill(cache, range(1, 6))
+    assert (cache.flash_count, cache.count) == (4, 1)
+    assert timestamps(cache) == [1, 2, 3, 4, 5]
+
+    # Dropping reads past the flash file into RAM
+    cache.drop(5)
+    assert len(cache) == 0
+    assert not (tmp_path / "cache.bin").exists()
+
+def test_readings_survive_a_reset(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    cache = ReadingCache(4, path, value_format=FORMAT)
+    fill(cache, range(1, 8))
+    cache.drop(2)
+    cache.spill()
+
+    reloaded = ReadingCache(4, path, value_format=FORMAT)
+    assert timestamps(reloaded) == [3, 4, 5, 6, 7]
+    assert list(reloaded.oldest()) == list(cache.oldest())
+
+def test_flash_file_keeps_the_newest_readings(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    cache = ReadingCache(2, path, spill_max_records=3, value_format=FORMAT)
+    fill(cache, range(1, 10))
+    assert cache.flash_count <= 3
+    assert timestamps(cache) == list(range(10 - len(cache), 10))
+
+def test_legacy_flash_file_is_converted(tmp_path):
+    path = tmp_path / "cache.bin"
+    size = struct.calcsize(LEGACY_RECORD_FORMAT)
+    with open(path, "wb") as f:
+        for timestamp in range(1000, 1005):
+            f.write(struct.pack(LEGACY_RECORD_FORMAT, timestamp, 20.5, 50, float("nan"), 30))
+        f.write(b"\x01\x02")  # cut short by a reset
+    # Legacy position files hold the position only; the first record has been uploaded
+    (tmp_path / "cache.bin.pos").write_text(str(size))
+
+    cache = ReadingCache(4, str(path), value_format="ffffhH")
+    assert list(cache.oldest()) == [
+        (timestamp, (20.5, 50.0, None, 30.0, None, None)) for timestamp in range(1001, 1005)
+    ]
+    position, record_format = (tmp_path / "cache.bin.pos").read_text().split()
+    assert (position, record_format) == ("0", "<IffffhH")
+
+def test_torn_write_keeps_whole_records(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    cache = ReadingCache(2, path, value_format=FORMAT)
+    fill(cache, range(1, 4))
+    cache.spill()
+    with open(path, "ab") as f:
+        f.write(b"\x00" * (cache.record_size - 1))
+
+    assert timestamps(ReadingCache(2, path, value_format=FORMAT)) == [1, 2, 3]
+
+#===============================================================================
+# DROP THROUGH
+#===============================================================================
+def test_drop_through_keeps_newer_readings_after_eviction():
+    cache = ReadingCache(3, value_format=FORMAT)
+    fill(cache, [1, 2, 3])
+    uploaded = timestamps(cache)
+
+    # Readings taken while the batch was uploaded evict the oldest ones
+    fill(cache, [4, 5])
+    assert cache.drop_through(uploaded[-1]) == 1
+    assert timestamps(cache) == [4, 5]
+
+def test_drop_through_spans_flash_and_ram(tmp_path):
+    cache = ReadingCache(2, str(tmp_path / "cache.bin"), value_format=FORMAT)
+    fill(cache, range(1, 6))
+    assert cache.drop_through(4) == 4
+    assert timestamps(cache) == [5]
+    assert cache.drop_through(4) == 0
+
+#===============================================================================
+# UPLOADING CACHED READINGS
+#===============================================================================
+@pytest.fixture
+def firmware(monkeypatch):
+    """The firmware's main module, imported with stand-ins for the MicroPython modules."""
+    for name in ("network", "machine", "dht", "ntptime"):
+        monkeypatch.setitem(sys.modules, name, types.ModuleType(name))
+    sys.modules["machine"].Pin = sys.modules["machine"].ADC = sys.modules["machine"].I2C = object
+    monkeypatch.setitem(sys.modules, "ujson", json)
+    monkeypatch.setitem(sys.modules, "uasyncio", asyncio)
+
+    import config
+    monkeypatch.setattr(config, "DISPLAY_ENABLED", False)
+    monkeypatch.setattr(config, "UPLOAD_BATCH_BYTES", 1024)
+    sys.modules.pop("main", None)
+    main = importlib.import_module("main")
+    main.wifi_connected = True
+    yield main
+    sys.modules.pop("main", None)
+
+def cache_readings(main, cache, timestamps):
+    for timestamp in timestamps:
+        main.cache_reading({"timestamp": timestamp, "readings": {"temperature": 21.5, "humidity": 40}})
+
+def uploaded_timestamps(bodies):
+    return [reading["timestamp"] for body in bodies for reading in json.loads(body).values()]
+
+def test_cached_readings_are_uploaded_in_batches(firmware, capsys):
+    firmware.reading_cache = ReadingCache(100, value_format=firmware.READING_VALUE_FORMAT)
+    cache_readings(firmware, firmware.reading_cache, range(1000, 1020))
+    bodies = []
+
+    async def patch(body):
+        bodies.append(body)
+        return True
+
+    firmware.patch_to_firebase = patch
+    asyncio.run(firmware.send_cached_readings())
+    assert len(bodies) > 1
+    assert all(len(body) <= 1024 for body in bodies)
+    assert uploaded_timestamps(bodies) == list(range(1000, 1020))
+    assert len(firmware.reading_cache) == 0
+    assert "20 cached readings sent, 0 remaining" in capsys.readouterr().out
+
+def test_failed_upload_keeps_the_readings(firmware):
+    firmware.reading_cache = ReadingCache(100, value_format=firmware.READING_VALUE_FORMAT)
+    cache_readings(firmware, firmware.reading_cache, range(1000, 1005))
+
+    async def patch(body):
+        return False
+
+    firmware.patch_to_firebase = patch
+    asyncio.run(firmware.send_cached_readings())
+    assert timestamps(firmware.reading_cache) == list(range(1000, 1005))
+
+def test_readings_evicted_during_upload_are_not_counted(firmware, capsys):
+    cache = firmware.reading_cache = ReadingCache(5, value_format=firmware.READING_VALUE_FORMAT)
+    cache_readings(firmware, cache, range(1000, 1005))
+    bodies = []
+
+    async def patch(body):
+        if not bodies:
+            # New readings evict three readings of the batch in flight
+            cache_readings(firmware, cache, range(2000, 2003))
+        bodies.append(body)
+        return True
+
+    firmware.patch_to_firebase = patch
+    asyncio.run(firmware.send_cached_readings())
+    assert uploaded_timestamps(bodies) == [1000, 1001, 1002, 1003, 1004, 2000, 2001, 2002]
+    assert len(cache) == 0
+    # 2 readings of the first batch were still cached, then the 3 new ones
+    assert "5 cached readings sent" in capsys.readouterr().out
+
+def test_no_empty_batch_is_sent(firmware):
+    cache = firmware.reading_cache = ReadingCache(5, value_format=firmware.READING_VALUE_FORMAT)
+    cache_readings(firmware, cache, range(1000, 1003))
+    bodies = []
+
+    async def patch(body):
+        # Another task empties the cache, and the batch confirms nothing still cached
+        bodies.append(body)
+        cache.drop(len(cache))
+        return True
+
+    firmware.patch_to_firebase = patch
+    asyncio.run(firmware.send_cached_readings())
+    assert len(bodies) == 1
+    assert "{}" not in bodies
@@ -0,0 +1,173 @@
+"""
+Tests of the dashboard's shared query cache: single-flight computation and LRU eviction.
+"""
+
+import random
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from shared_cache import SharedCache
+
+THREADS = 16
+
+def array_of(num_bytes):
+    return np.zeros(num_bytes // 8)
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+def run_threads(target, count=THREADS):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+#===============================================================================
+# SINGLE FLIGHT
+#===============================================================================
+def test_concurrent_requests_compute_once():
+    cache = SharedCache()
+    release = threading.Event()
+    calls = []
+    results = [None] * THREADS
+
+    def compute():
+        calls.append(threading.current_thread().name)
+        release.wait()
+        return array_of(800)
+
+    def request(i):
+        results[i] = cache.get(('device_data', 'dev'), compute)
+
+    threads = run_threads(request)
+    # Hold the computation until every other request waits for it
+    wait_until(lambda: cache.summary()[0].get('device_data', {}).get('coalesced') == THREADS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    counts, entries, used_bytes, flights = cache.summary()
+    assert counts['device_data']['misses'] == 1
+    assert (entries, used_bytes, flights) == (1, 800, 0)
+
+    # Later requests are hits
+    assert cache.get(('device_data', 'dev'), compute) is results[0]
+    assert len(calls) == 1
+
+def test_waiting_requests_share_the_error():
+    cache = SharedCache()
+    release = threading.Event()
+    calls = []
+    errors = [None] * THREADS
+
+    def compute():
+        calls.append(1)
+        release.wait()
+        raise ValueError("query failed")
+
+    def request(i):
+        try:
+            cache.get(('device_data', 'dev'), compute)
+        except ValueError as e:
+            errors[i] = e
+
+    threads = run_threads(request)
+    wait_until(lambda: cache.summary()[0].get('device_data', {}).get('coalesced') == THREADS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(isinstance(error, ValueError) for error in errors)
+    # Errors aren't cached
+    assert cache.get(('device_data', 'dev'), lambda: 'ok') == 'ok'
+
+def test_different_keys_are_computed_concurrently():
+    cache = SharedCache()
+    barrier = threading.Barrier(4, timeout=5)
+
+    def compute():
+        # Deadlocks (and times out) unless all four computations run at the same time
+        barrier.wait()
+        return threading.current_thread().name
+
+    threads = run_threads(lambda i: cache.get(('device_data', i), compute), count=4)
+    for thread in threads:
+        thread.join()
+    assert cache.summary()[1] == 4
+
+#===============================================================================
+# EVICTION
+#===============================================================================
+def test_least_recently_used_values_are_evicted_over_the_budget():
+    cache = SharedCache(max_bytes=3000)
+    for key in 'abc':
+        cache.get(('device_data', key), lambda: array_of(1000))
+    cache.get(('device_data', 'a'), pytest.fail)  # a is now the most recently used
+
+    cache.get(('device_data', 'd'), lambda: array_of(1000))
+    assert list(key for _, key in cache.entries) == ['c', 'a', 'd']
+    counts, entries, used_bytes, _ = cache.summary()
+    assert (entries, used_bytes) == (3, 3000)
+    assert (counts['device_data']['evictions'], counts['device_data']['evicted_bytes']) == (1, 1000)
+
+    # A larger value evicts as many values as it needs room for
+    cache.get(('device_data', 'e'), lambda: array_of(2500))
+    assert list(key for _, key in cache.entries) == ['e']
+
+def test_values_over_the_budget_are_not_cached():
+    cache = SharedCache(max_bytes=1000)
+    cache.get(('device_data', 'a'), lambda: array_of(800))
+    value = cache.get(('device_data', 'big'), lambda: array_of(2000))
+    assert len(value) == 250
+    counts, entries, used_bytes, _ = cache.summary()
+    assert counts['device_data']['oversized'] == 1
+    assert (entries, used_bytes) == (1, 800)
+
+def test_expired_values_are_computed_again():
+    cache = SharedCache()
+    cache.get(('device_data', 'a'), lambda: 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get(('device_data', 'a'), lambda: 2, ttl=0.01) == 2
+    assert cache.summary()[0]['device_data']['expirations'] == 1
+
+def test_budget_holds_under_concurrent_use():
+    cache = SharedCache(max_bytes=20_000)
+    sizes = {key: 8 * random.Random(key).randint(10, 500) for key in range(50)}
+    computed = []
+    wrong_values = []
+    lock = threading.Lock()
+
+    def compute(key):
+        with lock:
+            computed.append(key)
+        time.sleep(0.001)
+        return array_of(sizes[key])
+
+    def request(i):
+        rng = random.Random(i)
+        for _ in range(200):
+            key = rng.randrange(50)
+            value = cache.get(('device_data', key), lambda: compute(key))
+            if value.nbytes != sizes[key]:
+                wrong_values.append(key)
+
+    for thread in run_threads(request):
+        thread.join()
+
+    assert not wrong_values
+    counts, entries, used_bytes, flights = cache.summary()
+    assert used_bytes <= 20_000
+    assert used_bytes == sum(sizes[key] for _, key in cache.entries)
+    assert entries == len(cache.entries) and flights == 0
+    # Every computation was a miss; all other requests were hits or waited for one
+    assert counts['device_data']['misses'] == len(computed)
+    assert sum(counts['device_data'][event] for event in ('hits', 'coalesced', 'misses')) == THREADS * 200